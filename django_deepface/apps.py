@@ -14,6 +14,10 @@ class DjangoDeepfaceConfig(AppConfig):
         """Initialize app settings when Django starts."""
         from django.conf import settings
 
+        # Registers system checks, the face template signal receivers and
+        # the metrics receiver
+        from . import checks, metrics, signals  # noqa: F401
+
         # Set default settings if not provided
         if not hasattr(settings, "DEEPFACE_MAX_FACES"):
             settings.DEEPFACE_MAX_FACES = 4
@@ -21,24 +25,167 @@ class DjangoDeepfaceConfig(AppConfig):
         if not hasattr(settings, "DEEPFACE_MODEL"):
             settings.DEEPFACE_MODEL = "VGG-Face"
 
+        # Embedding length; None derives it from DEEPFACE_MODEL
+        if not hasattr(settings, "DEEPFACE_EMBEDDING_DIMENSIONS"):
+            settings.DEEPFACE_EMBEDDING_DIMENSIONS = None
+
         if not hasattr(settings, "DEEPFACE_DETECTOR"):
             settings.DEEPFACE_DETECTOR = "retinaface"
 
         if not hasattr(settings, "DEEPFACE_THRESHOLD"):
             settings.DEEPFACE_THRESHOLD = 0.3
 
+        # Cheap detectors first, e.g. ["yunet", "retinaface"]; None uses
+        # DEEPFACE_DETECTOR alone
+        if not hasattr(settings, "DEEPFACE_DETECTOR_CASCADE"):
+            settings.DEEPFACE_DETECTOR_CASCADE = None
+
+        # A float, or a dict per backend (confidence scales differ)
+        if not hasattr(settings, "DEEPFACE_CASCADE_MIN_CONFIDENCE"):
+            settings.DEEPFACE_CASCADE_MIN_CONFIDENCE = 0.9
+
         if not hasattr(settings, "DEEPFACE_ENFORCE_DETECTION"):
             settings.DEEPFACE_ENFORCE_DETECTION = True
 
         if not hasattr(settings, "DEEPFACE_ALIGN"):
             settings.DEEPFACE_ALIGN = True
 
+        # Images are downscaled to this long edge before detection (None: off)
+        if not hasattr(settings, "DEEPFACE_MAX_IMAGE_EDGE"):
+            settings.DEEPFACE_MAX_IMAGE_EDGE = 1280
+
+        # Face image uploads over these budgets are refused while they stream
+        # in, before they are buffered or decoded (None: no limit)
+        if not hasattr(settings, "DEEPFACE_MAX_UPLOAD_BYTES"):
+            settings.DEEPFACE_MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+        if not hasattr(settings, "DEEPFACE_MAX_UPLOAD_PIXELS"):
+            settings.DEEPFACE_MAX_UPLOAD_PIXELS = 25_000_000
+
         if not hasattr(settings, "DEEPFACE_NORMALIZATION"):
             settings.DEEPFACE_NORMALIZATION = "base"
 
+        # Store embeddings as "vector" (float32) or "halfvec" (float16)
+        if not hasattr(settings, "DEEPFACE_EMBEDDING_STORAGE"):
+            settings.DEEPFACE_EMBEDDING_STORAGE = "vector"
+
+        # Where embeddings are compared: "pgvector", "numpy", or None to pick
+        # by database vendor
+        if not hasattr(settings, "DEEPFACE_VECTOR_STORE"):
+            settings.DEEPFACE_VECTOR_STORE = None
+
+        # Vector search: distance metric and ANN index parameters
+        if not hasattr(settings, "DEEPFACE_DISTANCE"):
+            settings.DEEPFACE_DISTANCE = "cosine"
+
+        if not hasattr(settings, "DEEPFACE_INDEX_TYPE"):
+            settings.DEEPFACE_INDEX_TYPE = "hnsw"
+
+        if not hasattr(settings, "DEEPFACE_INDEX_M"):
+            settings.DEEPFACE_INDEX_M = 16
+
+        if not hasattr(settings, "DEEPFACE_INDEX_EF_CONSTRUCTION"):
+            settings.DEEPFACE_INDEX_EF_CONSTRUCTION = 64
+
+        if not hasattr(settings, "DEEPFACE_INDEX_LISTS"):
+            settings.DEEPFACE_INDEX_LISTS = 100
+
+        if not hasattr(settings, "DEEPFACE_HNSW_EF_SEARCH"):
+            settings.DEEPFACE_HNSW_EF_SEARCH = 40
+
+        if not hasattr(settings, "DEEPFACE_IVFFLAT_PROBES"):
+            settings.DEEPFACE_IVFFLAT_PROBES = 10
+
+        # Gallery-wide search: shortlist by Hamming distance of the sign
+        # bits, then rerank this many candidates at full precision
+        if not hasattr(settings, "DEEPFACE_BINARY_PREFILTER"):
+            settings.DEEPFACE_BINARY_PREFILTER = False
+
+        if not hasattr(settings, "DEEPFACE_RERANK_CANDIDATES"):
+            settings.DEEPFACE_RERANK_CANDIDATES = 100
+
+        # Username-less face login that searches the whole gallery
+        if not hasattr(settings, "DEEPFACE_IDENTIFICATION"):
+            settings.DEEPFACE_IDENTIFICATION = False
+
+        if not hasattr(settings, "DEEPFACE_IDENTIFICATION_TOP_K"):
+            settings.DEEPFACE_IDENTIFICATION_TOP_K = 5
+
+        if not hasattr(settings, "DEEPFACE_IDENTIFICATION_MARGIN"):
+            settings.DEEPFACE_IDENTIFICATION_MARGIN = 0.05
+
+        # Per-user face templates for 1:1 verification: None, "mean" or "packed"
+        if not hasattr(settings, "DEEPFACE_TEMPLATES"):
+            settings.DEEPFACE_TEMPLATES = None
+
+        # Threads running inference, and requests allowed to wait for one
+        # before face login is shed to password login
+        if not hasattr(settings, "DEEPFACE_INFERENCE_WORKERS"):
+            settings.DEEPFACE_INFERENCE_WORKERS = 1
+
+        if not hasattr(settings, "DEEPFACE_INFERENCE_QUEUE"):
+            settings.DEEPFACE_INFERENCE_QUEUE = 4
+
+        # Embed uploads in the deepface_worker command instead of the request
+        if not hasattr(settings, "DEEPFACE_ASYNC_ENROLLMENT"):
+            settings.DEEPFACE_ASYNC_ENROLLMENT = False
+
+        if not hasattr(settings, "DEEPFACE_ENROLLMENT_MAX_ATTEMPTS"):
+            settings.DEEPFACE_ENROLLMENT_MAX_ATTEMPTS = 3
+
+        if not hasattr(settings, "DEEPFACE_ENROLLMENT_RETRY_DELAY"):
+            settings.DEEPFACE_ENROLLMENT_RETRY_DELAY = 10  # seconds, doubled per retry
+
+        if not hasattr(settings, "DEEPFACE_ENROLLMENT_LOCK_TIMEOUT"):
+            settings.DEEPFACE_ENROLLMENT_LOCK_TIMEOUT = 300  # seconds
+
+        # Embedding backend: "deepface" (TensorFlow) or "onnx" (ONNX Runtime,
+        # with a model converted by deepface_onnx)
+        if not hasattr(settings, "DEEPFACE_EMBEDDER"):
+            settings.DEEPFACE_EMBEDDER = "deepface"
+
+        if not hasattr(settings, "DEEPFACE_ONNX_MODEL"):
+            settings.DEEPFACE_ONNX_MODEL = None
+
+        # Intra-op threads per ONNX session; None lets ONNX Runtime decide
+        if not hasattr(settings, "DEEPFACE_ONNX_THREADS"):
+            settings.DEEPFACE_ONNX_THREADS = None
+
+        # False keeps DeepFace and TensorFlow out of this process: faces are
+        # embedded by the daemon if configured, enrollments by deepface_worker
+        if not hasattr(settings, "DEEPFACE_LOCAL_INFERENCE"):
+            settings.DEEPFACE_LOCAL_INFERENCE = True
+
+        # Shared inference daemon (deepface_daemon); None loads the model in-process
+        if not hasattr(settings, "DEEPFACE_DAEMON_SOCKET"):
+            settings.DEEPFACE_DAEMON_SOCKET = None
+
+        if not hasattr(settings, "DEEPFACE_DAEMON_MAX_BATCH"):
+            settings.DEEPFACE_DAEMON_MAX_BATCH = 16
+
+        if not hasattr(settings, "DEEPFACE_DAEMON_MAX_WAIT_MS"):
+            settings.DEEPFACE_DAEMON_MAX_WAIT_MS = 5
+
+        if not hasattr(settings, "DEEPFACE_DAEMON_TIMEOUT"):
+            settings.DEEPFACE_DAEMON_TIMEOUT = 30  # seconds
+
+        # Serve Prometheus metrics at metrics/
+        if not hasattr(settings, "DEEPFACE_METRICS"):
+            settings.DEEPFACE_METRICS = False
+
+        # Load the model and detector at startup instead of on first login
+        if not hasattr(settings, "DEEPFACE_WARMUP"):
+            settings.DEEPFACE_WARMUP = False
+
         # Authentication redirect settings
         if not hasattr(settings, "DEEPFACE_LOGIN_REDIRECT_URL"):
             settings.DEEPFACE_LOGIN_REDIRECT_URL = "index"
 
         if not hasattr(settings, "DEEPFACE_LOGOUT_REDIRECT_URL"):
             settings.DEEPFACE_LOGOUT_REDIRECT_URL = "django_deepface:login"
+
+        if settings.DEEPFACE_WARMUP:
+            from .embedder import is_serving_process, warm_up_in_background
+
+            if is_serving_process():
+                warm_up_in_background()
@@ -0,0 +1,539 @@
+"""Latency benchmarks for face login and bulk import.
+
+Times each stage of the ``face_login`` view (upload parsing, decode,
+detection, embedding, vector query, session login) against synthetic
+galleries, and
+each stage of ``add_image_tree``. A deterministic CPU stub stands in for the
+model by default, so runs measure this app rather than TensorFlow and can be
+compared over time. Used by the ``deepface_bench`` command and the
+``benchmark`` pytest marker.
+"""
+
+import io
+import os
+import platform
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import django
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .embedder import embedder_class, get_embedder, set_embedder
+from .face_templates import get_template_mode, rebuild_templates
+from .models import FaceTemplate, Identity
+from .search import get_distance_metric, get_index_settings
+from .signals import face_image_processed
+from .timing import StageTimer
+from .utils import decode_image, get_deepface_settings, get_max_image_edge
+from .vector_store import (
+    current_embedding,
+    get_vector_store,
+    get_vector_store_name,
+    has_current_embedding,
+)
+
+# Every user the benchmark creates starts with this, so it can clean up
+BENCH_USER_PREFIX = "deepface-bench-"
+
+
+class StubEmbedder:
+    """
+    Deterministic CPU stand-in for the DeepFace model and detector.
+
+    Detection is a centre crop and embedding a fixed random projection of
+    the pooled crop: repeatable, cheap, and still proportional to the image
+    size like the real detector.
+    """
+
+    FACE_SIZE = 160
+    POOL = 16
+
+    def __init__(self, dimensions: int, seed: int = 0):
+        self.dimensions = dimensions
+        rng = np.random.default_rng(seed)
+        self.projection = rng.standard_normal(
+            (self.POOL * self.POOL * 3, dimensions), dtype=np.float32
+        )
+        self.loaded = True
+        self.warmup_seconds = 0.0
+
+    @property
+    def is_ready(self) -> bool:
+        return True
+
+    def load(self) -> float:
+        return 0.0
+
+    def extract_face(self, img) -> np.ndarray:
+        if isinstance(img, str):
+            img = decode_image(img)
+        height, width = img.shape[:2]
+        side = min(height, width)
+        top, left = (height - side) // 2, (width - side) // 2
+        pick = np.linspace(0, side - 1, self.FACE_SIZE).astype(int)
+        crop = img[top : top + side, left : left + side][pick][:, pick]
+        return crop.astype(np.float32) / 255
+
+    def embed_faces(self, faces: list[np.ndarray]) -> list[list[float]]:
+        step = self.FACE_SIZE // self.POOL
+        embeddings = []
+        for face in faces:
+            pooled = face.reshape(self.POOL, step, self.POOL, step, 3).mean(axis=(1, 3))
+            vector = pooled.reshape(-1) @ self.projection
+            vector /= max(float(np.linalg.norm(vector)), 1e-12)
+            embeddings.append(vector.tolist())
+        return embeddings
+
+    def represent(self, img, timer: StageTimer | None = None) -> list[float]:
+        timer = timer if timer is not None else StageTimer()
+        with timer.stage("detection"):
+            face = self.extract_face(img)
+        with timer.stage("embedding"):
+            return self.embed_faces([face])[0]
+
+    def readiness(self) -> dict[str, Any]:
+        return {"ready": True, "model": "stub", "detector": "stub"}
+
+
+def synthetic_image(seed: int, size: tuple[int, int] = (640, 480)) -> bytes:
+    """A JPEG with smooth structure, so it compresses and decodes like a photo."""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, (size[1] // 16, size[0] // 16, 3), dtype=np.uint8)
+    image = Image.fromarray(coarse).resize(size, Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def summarize(seconds: list[float]) -> dict[str, float]:
+    """Latency summary in milliseconds."""
+    values = np.array(seconds) * 1000
+    return {
+        "count": len(values),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def populate_gallery(rows: int, batch_size: int = 1000, seed: int = 0) -> list[str]:
+    """
+    Insert ``rows`` synthetic users, each with one random unit embedding.
+
+    Args:
+        rows: Number of users (and Identity rows) to create
+        batch_size: Rows per insert
+        seed: Seed for the embeddings
+
+    Returns:
+        Usernames of up to 100 of the created users, for login queries
+    """
+    dimensions = Identity.vector_dimensions
+    rng = np.random.default_rng(seed)
+    password = make_password(None)
+    sample = []
+    for offset in range(0, rows, batch_size):
+        count = min(batch_size, rows - offset)
+        vectors = rng.standard_normal((count, dimensions), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                [
+                    User(username=f"{BENCH_USER_PREFIX}{offset + i}", password=password)
+                    for i in range(count)
+                ]
+            )
+            Identity.objects.bulk_create(
+                [
+                    Identity(
+                        user=user,
+                        image_number=1,
+                        image=f"bench/{user.username}.jpg",
+                        embedding=vector,
+                    )
+                    for user, vector in zip(users, vectors)
+                ]
+            )
+        sample.extend(user.username for user in users[: 100 - len(sample)])
+    get_vector_store().invalidate()
+    if get_template_mode() is not None:
+        rebuild_templates(
+            User.objects.filter(username__in=sample).values_list("id", flat=True)
+        )
+    return sample
+
+
+def clear_gallery() -> None:
+    """Delete every benchmark user and their rows (without loading them)."""
+    users = f'SELECT id FROM "{User._meta.db_table}" WHERE username LIKE %s'
+    pattern = [f"{BENCH_USER_PREFIX}%"]
+    with connection.cursor() as cursor:
+        for model in (FaceTemplate, Identity):
+            cursor.execute(
+                f'DELETE FROM "{model._meta.db_table}" WHERE user_id IN ({users})',
+                pattern,
+            )
+        cursor.execute(
+            f'DELETE FROM "{User._meta.db_table}" WHERE username LIKE %s', pattern
+        )
+    get_vector_store().invalidate()
+
+
+@contextmanager
+def collect_stage_timings():
+    """Collect the stage timings sent with ``face_image_processed``."""
+    samples: dict[str, dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+    lock = threading.Lock()
+
+    def record(sender, stage, timings=None, **kwargs):
+        with lock:
+            for name, seconds in (timings or {}).items():
+                samples[stage][name].append(seconds)
+
+    face_image_processed.connect(
+        record, weak=False, dispatch_uid="django_deepface.benchmark"
+    )
+    try:
+        yield samples
+    finally:
+        face_image_processed.disconnect(dispatch_uid="django_deepface.benchmark")
+
+
+def bench_login(iterations: int, usernames: list[str], seed: int = 0) -> dict:
+    """
+    Time each stage of a face login through the ``face_login`` view.
+
+    The users logging in get the embedding of the image they send first, so
+    every login takes the view's successful path. Stage timings are the ones
+    the view sends with ``face_image_processed``; ``total`` is the whole
+    request, form, session and messages included.
+
+    Returns:
+        Latency summary per stage, plus ``total``
+    """
+    images = [synthetic_image(seed + i) for i in range(min(iterations, 8))]
+    users = usernames[:iterations]
+    embedder = get_embedder()
+    for i, username in enumerate(users):
+        Identity.objects.filter(user__username=username).update(
+            embedding=embedder.represent(decode_image(images[i % len(images)]))
+        )
+    # update() sends no signals
+    get_vector_store().invalidate()
+    if get_template_mode() is not None:
+        rebuild_templates(
+            User.objects.filter(username__in=users).values_list("id", flat=True)
+        )
+
+    path = reverse("django_deepface:login")
+    totals = []
+    with collect_stage_timings() as samples:
+        for i in range(iterations):
+            index = i % len(users)
+            data = {
+                "username": users[index],
+                "use_face_login": "on",
+                "face_image": SimpleUploadedFile(
+                    "face.jpg", images[index % len(images)], content_type="image/jpeg"
+                ),
+            }
+            start = time.perf_counter()
+            response = Client().post(path, data)
+            totals.append(time.perf_counter() - start)
+            if response.status_code != 302:
+                raise RuntimeError(f"Benchmark face login for {users[index]} failed")
+    results = {stage: summarize(values) for stage, values in samples["login"].items()}
+    results["total"] = summarize(totals)
+    return results
+
+
+def bench_import(
+    images: int,
+    batch_size: int = 16,
+    image_size: tuple[int, int] = (1920, 1080),
+    seed: int = 0,
+) -> dict:
+    """
+    Time the stages of ``add_image_tree`` on a tree of synthetic photos.
+
+    Decode, detection and embedding are timed on their own; the command is
+    then run end to end, and whatever it spends beyond those stages (file
+    copies, inserts) is reported as ``write_and_overhead``.
+    """
+    embedder = get_embedder()
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as media:
+        paths = []
+        for i in range(images):
+            user_dir = Path(root) / f"{BENCH_USER_PREFIX}import-{i // 4}"
+            user_dir.mkdir(exist_ok=True)
+            path = user_dir / f"face_{i % 4}.jpg"
+            path.write_bytes(synthetic_image(seed + i, image_size))
+            paths.append(path)
+
+        timer = StageTimer()
+        with timer.stage("decode"):
+            arrays = [decode_image(path) for path in paths]
+        with timer.stage("detection"):
+            faces = [embedder.extract_face(array) for array in arrays]
+        with timer.stage("embedding"):
+            for start in range(0, len(faces), batch_size):
+                embedder.embed_faces(faces[start : start + batch_size])
+
+        with override_settings(MEDIA_ROOT=media):
+            end_to_end = StageTimer()
+            with end_to_end.stage("add_image_tree"):
+                call_command(
+                    "add_image_tree", root, batch_size=batch_size, stdout=io.StringIO()
+                )
+
+    elapsed = end_to_end.total
+    stages = {
+        **timer.timings,
+        "write_and_overhead": max(elapsed - timer.total, 0.0),
+    }
+    return {
+        "images": images,
+        "image_size": list(image_size),
+        "batch_size": batch_size,
+        "stages": {
+            stage: {
+                "total_ms": seconds * 1000,
+                "per_image_ms": seconds * 1000 / images,
+            }
+            for stage, seconds in stages.items()
+        },
+        "end_to_end_seconds": elapsed,
+        "images_per_second": images / elapsed if elapsed else 0.0,
+    }
+
+
+def measure_recall(
+    candidates: list[int],
+    k: int = 10,
+    queries: int = 50,
+    noise: float = 0.1,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """
+    Compare the binary prefilter with exact search on the current gallery.
+
+    Queries are stored embeddings with Gaussian noise added, like a new
+    photo of an enrolled user. Each is searched exactly and then with the
+    prefilter at every candidate count.
+
+    Args:
+        candidates: Rerank candidate counts to measure
+        k: Users returned per search
+        queries: Number of queries
+        noise: Noise added to each query, relative to its norm
+        seed: Seed for the sampled rows and the noise
+
+    Returns:
+        Recall@k of each candidate count (the fraction of the exact top-k
+        users it also returns) and latency summaries
+    """
+    store = get_vector_store()
+    rng = np.random.default_rng(seed)
+    pks = list(
+        Identity.objects.filter(has_current_embedding()).values_list("pk", flat=True)
+    )
+    if not pks:
+        return {"k": k, "queries": 0, "exact": None, "candidates": {}}
+    sample = rng.choice(pks, size=min(queries, len(pks)), replace=False)
+    vectors = []
+    for embedding in Identity.objects.filter(pk__in=sample.tolist()).values_list(
+        current_embedding(), flat=True
+    ):
+        vector = np.asarray(embedding, dtype=np.float32)
+        scale = noise * np.linalg.norm(vector) / np.sqrt(len(vector))
+        vectors.append(vector + rng.normal(0, scale, len(vector)).astype(np.float32))
+
+    def timed_search(vector, **kwargs):
+        start = time.perf_counter()
+        users = store.nearest_users(vector, k, **kwargs)
+        return {user_id for user_id, _ in users}, time.perf_counter() - start
+
+    exact, exact_seconds = zip(
+        *(timed_search(vector, exact=True) for vector in vectors)
+    )
+    samples = defaultdict(list)
+    found = defaultdict(int)
+    for count in candidates:
+        for vector, expected in zip(vectors, exact):
+            users, seconds = timed_search(vector, candidates=count)
+            samples[count].append(seconds)
+            found[count] += len(expected & users)
+    total = sum(len(expected) for expected in exact)
+    return {
+        "k": k,
+        "queries": len(vectors),
+        "exact": summarize(list(exact_seconds)),
+        "candidates": {
+            count: {
+                "recall": found[count] / total,
+                "latency": summarize(samples[count]),
+            }
+            for count in candidates
+        },
+    }
+
+
+def compare_embedders(
+    backends: list[str], faces: int = 32, batch_size: int = 16, seed: int = 0
+) -> dict[str, Any]:
+    """
+    Compare embedding backends on the same synthetic face crops.
+
+    Detection is left out: every backend uses the same DeepFace detectors,
+    so only the recognition model is compared.
+
+    Args:
+        backends: ``DEEPFACE_EMBEDDER`` values, e.g. ``["deepface", "onnx"]``
+        faces: Number of face crops
+        batch_size: Crops per call when measuring batched throughput
+        seed: Seed for the synthetic crops
+
+    Returns:
+        Per backend: load time, single-face latency, batched throughput and
+        the largest difference from the first backend's embeddings
+    """
+    crops = [
+        decode_image(synthetic_image(seed + i, size=(160, 160))).astype(np.float32)
+        / 255
+        for i in range(faces)
+    ]
+    results: dict[str, Any] = {}
+    reference = None
+    for backend in backends:
+        embedder = embedder_class(backend).from_settings()
+        load_seconds = embedder.load()
+        single = []
+        for crop in crops:
+            start = time.perf_counter()
+            embedder.embed_faces([crop])
+            single.append(time.perf_counter() - start)
+        embeddings = []
+        start = time.perf_counter()
+        for offset in range(0, faces, batch_size):
+            embeddings.extend(embedder.embed_faces(crops[offset : offset + batch_size]))
+        batched_seconds = time.perf_counter() - start
+        result = {
+            "load_seconds": load_seconds,
+            "single": summarize(single),
+            "batch_size": batch_size,
+            "faces_per_second": faces / batched_seconds,
+        }
+        if reference is None:
+            reference = np.asarray(embeddings)
+        else:
+            result["max_difference"] = float(
+                np.abs(np.asarray(embeddings) - reference).max()
+            )
+        results[backend] = result
+    return results
+
+
+def environment() -> dict[str, Any]:
+    """Describe what the numbers were measured on."""
+    from .checks import pgvector_version
+
+    version = (
+        pgvector_version(connection) if connection.vendor == "postgresql" else None
+    )
+    return {
+        "timestamp": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "database": connection.vendor,
+        "vector_store": get_vector_store_name(),
+        "pgvector": ".".join(map(str, version)) if version else None,
+        "embedder": get_embedder().readiness().get("model"),
+        "embedder_backend": getattr(settings, "DEEPFACE_EMBEDDER", "deepface"),
+        "deepface": get_deepface_settings(),
+        "embedding_dimensions": Identity.vector_dimensions,
+        "distance": get_distance_metric(),
+        "index": get_index_settings(),
+        "templates": get_template_mode(),
+        "max_image_edge": get_max_image_edge(),
+    }
+
+
+def run_benchmark(
+    rows: list[int],
+    logins: int = 50,
+    images: int = 32,
+    batch_size: int = 16,
+    stub: bool = True,
+    keep: bool = False,
+    recall: list[int] | None = None,
+    recall_k: int = 10,
+) -> dict[str, Any]:
+    """
+    Benchmark login against each gallery size, then bulk import.
+
+    Args:
+        rows: Gallery sizes to measure, e.g. ``[1000, 100_000, 1_000_000]``
+        logins: Timed logins per gallery size
+        images: Images in the synthetic import tree (0 skips the import)
+        batch_size: Forward pass size for the import
+        stub: Use ``StubEmbedder`` instead of the configured model
+        keep: Leave the last synthetic gallery in the database
+        recall: Rerank candidate counts to measure the binary prefilter's
+            recall@``recall_k`` for, against each gallery size
+        recall_k: Users searched for when measuring recall
+
+    Returns:
+        JSON-serializable results
+    """
+    if stub:
+        previous_embedder = set_embedder(StubEmbedder(Identity.vector_dimensions))
+    try:
+        results: dict[str, Any] = {"environment": environment(), "populations": []}
+        for size in sorted(rows):
+            clear_gallery()
+            populate = StageTimer()
+            with populate.stage("populate"):
+                sample = populate_gallery(size)
+            population = {
+                "rows": size,
+                "populate_seconds": populate.total,
+                "login": bench_login(logins, sample),
+            }
+            if recall:
+                population["recall"] = measure_recall(recall, k=recall_k)
+            results["populations"].append(population)
+        if images:
+            results["import"] = bench_import(images, batch_size=batch_size)
+        results["login_stage_means_ms"] = {
+            population["rows"]: {
+                stage: summary["mean_ms"]
+                for stage, summary in population["login"].items()
+            }
+            for population in results["populations"]
+        }
+        return results
+    finally:
+        if not keep:
+            clear_gallery()
+        if stub:
+            set_embedder(previous_embedder)
@@ -0,0 +1,181 @@
+"""Bulk writes of Identity rows and their image files for imports.
+
+On PostgreSQL with psycopg 3, rows are streamed with a binary ``COPY``: each
+embedding travels as packed floats instead of a 4096-number text literal, and
+a whole buffer of rows costs one statement. Other setups fall back to
+``bulk_create``, which the caller wraps in a transaction.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import connections
+
+from .fields import get_embedding_storage
+from .models import Identity
+from .vector_store import get_vector_store
+
+# Columns written by COPY; the primary key comes from its sequence
+COPY_FIELDS = (
+    "user",
+    "image_number",
+    "image",
+    "embedding",
+    "embedding_version",
+    "next_embedding_version",
+    "created_at",
+)
+
+
+def can_copy(connection) -> bool:
+    """Whether binary COPY is available on a database connection."""
+    if connection.vendor != "postgresql":
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    return is_psycopg3
+
+
+def copy_identities(identities: list[Identity], using: str = "default") -> None:
+    """
+    Insert Identity rows with a single binary ``COPY``.
+
+    Like ``bulk_create``, no signals are sent and primary keys are not set
+    on the instances.
+
+    Args:
+        identities: Unsaved identities whose image files are already stored
+        using: Database alias
+    """
+    from pgvector import HalfVector
+    from pgvector.psycopg.halfvec import register_halfvec_info
+    from pgvector.psycopg.vector import register_vector_info
+    from psycopg.types import TypeInfo
+
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = Identity._meta.db_table
+    fields = [Identity._meta.get_field(name) for name in COPY_FIELDS]
+    created_at = Identity._meta.get_field("created_at")
+    storage = get_embedding_storage()
+    halfvec = storage == "halfvec"
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT attname, atttypid FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped",
+            [table],
+        )
+        type_oids = dict(cursor.fetchall())
+        raw = cursor.cursor
+        # Registered on this cursor only, so Django's queries are unaffected
+        info = TypeInfo.fetch(raw.connection, storage)
+        register = register_halfvec_info if halfvec else register_vector_info
+        register(raw, info)
+        columns = ", ".join(quote(field.column) for field in fields)
+        statement = f"COPY {quote(table)} ({columns}) FROM STDIN (FORMAT BINARY)"
+        with raw.copy(statement) as copy:
+            copy.set_types([type_oids[field.column] for field in fields])
+            for identity in identities:
+                embedding = np.asarray(identity.embedding, dtype=np.float32)
+                copy.write_row(
+                    (
+                        identity.user_id,
+                        identity.image_number,
+                        identity.image.name,
+                        HalfVector(embedding) if halfvec else embedding,
+                        identity.embedding_version,
+                        identity.next_embedding_version,
+                        created_at.pre_save(identity, add=True),
+                    )
+                )
+
+
+def insert_identities(identities: list[Identity], using: str = "default") -> str:
+    """
+    Insert Identity rows with COPY where possible, else ``bulk_create``.
+
+    Call inside a transaction so that a failed buffer is not half written.
+
+    Returns:
+        ``"copy"`` or ``"bulk_create"``, whichever was used
+    """
+    if not identities:
+        return "copy"
+    # Neither path sends post_save, so the vector store is told here
+    get_vector_store().invalidate()
+    if can_copy(connections[using]) and all(
+        identity.embedding is not None for identity in identities
+    ):
+        copy_identities(identities, using=using)
+        return "copy"
+    Identity.objects.using(using).bulk_create(identities, batch_size=1000)
+    return "bulk_create"
+
+
+def media_relative_name(path: Path) -> str:
+    """
+    Name under which a file already inside the media storage is referenced.
+
+    Raises:
+        ImproperlyConfigured: If images are not stored on the local filesystem
+        ValueError: If the file is outside the storage location
+    """
+    storage = Identity._meta.get_field("image").storage
+    if not isinstance(storage, FileSystemStorage):
+        raise ImproperlyConfigured(
+            "Referencing images in place needs a FileSystemStorage for Identity.image"
+        )
+    location = Path(storage.location).resolve()
+    try:
+        return Path(path).resolve().relative_to(location).as_posix()
+    except ValueError:
+        raise ValueError(f"{path} is not inside the media root {location}") from None
+
+
+def store_images(
+    items: list[tuple[Identity, Path]], in_place: bool = False, threads: int = 8
+) -> None:
+    """
+    Attach image files to unsaved identities, copying them in parallel.
+
+    Args:
+        items: ``(identity, image_path)`` pairs
+        in_place: Reference the files where they are (they must be inside
+            the media root) instead of copying them into storage
+        threads: Number of files copied at once
+    """
+    if in_place:
+        for identity, image_path in items:
+            identity.image = media_relative_name(image_path)
+        return
+
+    def store(item):
+        identity, image_path = item
+        with open(image_path, "rb") as f:
+            identity.image.save(os.path.basename(image_path), File(f), save=False)
+
+    try:
+        if threads <= 1 or len(items) <= 1:
+            for item in items:
+                store(item)
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                # list() re-raises the first copy error
+                list(pool.map(store, items))
+    except BaseException:
+        # None of these rows will be written; do not leave their copies behind
+        delete_images(identity for identity, _ in items)
+        raise
+
+
+def delete_images(identities) -> None:
+    """Delete the stored files of identities whose rows were never written."""
+    for identity in identities:
+        if identity.image:
+            identity.image.delete(save=False)
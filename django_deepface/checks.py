@@ -0,0 +1,212 @@
+"""System checks for django-deepface."""
+
+import re
+
+from django.apps import apps
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, Warning, register
+from django.db import connections
+
+from .face_templates import get_template_mode
+from .fields import EmbeddingField
+from .utils import (
+    MODEL_DIMENSIONS,
+    get_deepface_settings,
+    get_embedding_dimensions,
+    get_embedding_version,
+)
+from .vector_store import get_vector_store_name
+
+
+def embedding_fields():
+    """Yield (model, field) for every EmbeddingField in the app."""
+    for model in apps.get_app_config("django_deepface").get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, EmbeddingField):
+                yield model, field
+
+
+def column_type(connection, table: str, column: str) -> str | None:
+    """
+    Get the declared type of a column, e.g. ``vector(4096)``.
+
+    Returns:
+        The type, or None if the table or column does not exist yet
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT format_type(a.atttypid, a.atttypmod)
+            FROM pg_attribute a
+            WHERE a.attrelid = to_regclass(%s) AND a.attname = %s
+              AND NOT a.attisdropped
+            """,
+            [table, column],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def type_dimensions(db_type: str | None) -> int | None:
+    """Get the dimensions of a column type, e.g. 4096 for ``vector(4096)``."""
+    match = re.search(r"\((\d+)\)", db_type or "")
+    return int(match.group(1)) if match else None
+
+
+def pgvector_version(connection) -> tuple[int, ...] | None:
+    """Get the installed pgvector extension version, e.g. ``(0, 7, 0)``."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return tuple(int(part) for part in row[0].split(".") if part.isdigit())
+
+
+@register()
+def check_embedding_dimensions(app_configs, **kwargs):
+    """Check that the embedding length of DEEPFACE_MODEL is known."""
+    model_name = get_deepface_settings()["model_name"]
+    try:
+        dimensions = get_embedding_dimensions()
+    except ValueError as e:
+        return [
+            Error(
+                str(e),
+                hint="Set it to the length of the vectors the model returns.",
+                id="django_deepface.E002",
+            )
+        ]
+    known = MODEL_DIMENSIONS.get(model_name)
+    if known is not None and known != dimensions:
+        return [
+            Error(
+                f"DEEPFACE_EMBEDDING_DIMENSIONS is {dimensions} but {model_name} "
+                f"embeddings have {known} dimensions.",
+                hint="Remove DEEPFACE_EMBEDDING_DIMENSIONS.",
+                id="django_deepface.E003",
+            )
+        ]
+    return []
+
+
+@register()
+def check_template_mode(app_configs, **kwargs):
+    """Check that DEEPFACE_TEMPLATES is valid for the configured distance."""
+    try:
+        get_template_mode()
+    except ValueError as e:
+        return [
+            Error(
+                str(e),
+                hint=(
+                    'Use DEEPFACE_TEMPLATES = "packed", which compares every '
+                    "embedding with any distance, or None."
+                ),
+                id="django_deepface.E005",
+            )
+        ]
+    return []
+
+
+def dimension_mismatch(model, field, actual: int | None) -> Error:
+    """The error for a column sized for embeddings of another length."""
+    model_name = get_deepface_settings()["model_name"]
+    return Error(
+        f"{model._meta.label}.{field.name} holds {actual or 'any'}-dimensional "
+        f"embeddings but DEEPFACE_MODEL {model_name} produces {field.dimensions}.",
+        hint=(
+            "Switch models with manage.py reembed, which resizes the column on "
+            "--promote, or restore the previous DEEPFACE_MODEL. An empty table "
+            "is resized by manage.py deepface_storage --convert."
+        ),
+        obj=model,
+        id="django_deepface.E004",
+    )
+
+
+def stored_dimensions(connection, model, field) -> int | None:
+    """Length of a stored embedding of the current configuration, if any."""
+    if model._meta.db_table not in connection.introspection.table_names():
+        return None
+    embedding = (
+        model._default_manager.using(connection.alias)
+        .filter(embedding_version=get_embedding_version())
+        .exclude(**{field.name: None})
+        .values_list(field.name, flat=True)
+        .first()
+    )
+    return None if embedding is None else len(embedding)
+
+
+@register(Tags.database)
+def check_embedding_storage(app_configs, databases=None, **kwargs):
+    """
+    Check that embedding columns fit the configured model and storage.
+
+    A column sized for another model is an error, as no embedding of the
+    configured model could be saved in it.
+    """
+    if check_embedding_dimensions(None):
+        # Reported by check_embedding_dimensions
+        return []
+    messages = []
+    for alias in databases or []:
+        connection = connections[alias]
+        for model, field in embedding_fields():
+            if connection.vendor != "postgresql":
+                # Binary columns have no type to compare; look at the data
+                if field.fixed_dimensions:
+                    actual = stored_dimensions(connection, model, field)
+                    if actual is not None and actual != field.dimensions:
+                        messages.append(dimension_mismatch(model, field, actual))
+                continue
+            actual = column_type(connection, model._meta.db_table, field.column)
+            expected = field.db_type(connection)
+            if actual is None or actual == expected:
+                continue
+            if type_dimensions(actual) != field.dimensions:
+                messages.append(
+                    dimension_mismatch(model, field, type_dimensions(actual))
+                )
+            else:
+                messages.append(
+                    Warning(
+                        f"{model._meta.label}.{field.name} is stored as {actual} "
+                        f"but settings expect {expected}.",
+                        hint="Run manage.py deepface_storage --convert.",
+                        obj=model,
+                        id="django_deepface.W001",
+                    )
+                )
+    return messages
+
+
+@register()
+def check_vector_store_cache(app_configs, **kwargs):
+    """
+    Check that the numpy vector store can hear about changes in other processes.
+
+    Each process keeps its own gallery matrix and reloads it when the
+    generation counter in the default cache moves, which a per-process cache
+    never shows to other processes.
+    """
+    cache = caches[DEFAULT_CACHE_ALIAS]
+    if get_vector_store_name() != "numpy" or not isinstance(
+        cache, (LocMemCache, DummyCache)
+    ):
+        return []
+    return [
+        Warning(
+            f"The numpy vector store relies on the default cache to reload its "
+            f"gallery, but {type(cache).__name__} is not shared between processes.",
+            hint=(
+                "Configure a shared default cache (Redis, Memcached or the "
+                "database cache) in CACHES, or silence this warning if a single "
+                "process serves logins."
+            ),
+            id="django_deepface.W002",
+        )
+    ]
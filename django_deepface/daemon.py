@@ -0,0 +1,306 @@
+"""Shared inference daemon and the client web workers use to reach it.
+
+One ``deepface_daemon`` process per node holds the only copy of the model and
+listens on a Unix socket. Represent requests that arrive within
+``DEEPFACE_DAEMON_MAX_WAIT_MS`` of each other are detected one by one and
+embedded in a single forward pass of up to ``DEEPFACE_DAEMON_MAX_BATCH``
+faces. Setting ``DEEPFACE_DAEMON_SOCKET`` makes ``get_embedder()`` return a
+``RemoteEmbedder``, so views and commands use the daemon transparently.
+"""
+
+import contextlib
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+from .timing import StageTimer
+from .utils import decode_image
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteInferenceError(Exception):
+    """Raised by the client when the daemon could not process a request."""
+
+
+def get_daemon_settings() -> dict[str, Any]:
+    """Get the daemon socket and micro-batching settings."""
+    return {
+        "socket": getattr(settings, "DEEPFACE_DAEMON_SOCKET", None),
+        "max_batch_size": getattr(settings, "DEEPFACE_DAEMON_MAX_BATCH", 16),
+        "max_wait_ms": getattr(settings, "DEEPFACE_DAEMON_MAX_WAIT_MS", 5),
+        "timeout": getattr(settings, "DEEPFACE_DAEMON_TIMEOUT", 30),
+    }
+
+
+def get_authkey() -> bytes:
+    """Shared secret for the socket handshake, derived from SECRET_KEY."""
+    return salted_hmac("django_deepface.daemon", "authkey").digest()
+
+
+def image_payload(img) -> bytes | np.ndarray:
+    """Turn an image path into its bytes so the daemon never reads client files."""
+    if isinstance(img, np.ndarray):
+        return img
+    with open(img, "rb") as f:
+        return f.read()
+
+
+def payload_image(payload) -> np.ndarray:
+    return payload if isinstance(payload, np.ndarray) else decode_image(payload)
+
+
+class InferenceServer:
+    """
+    Serves represent requests from many processes with micro-batching.
+
+    Each connection gets a thread that forwards its requests to a single
+    model thread. The model thread waits up to ``max_wait_ms`` after the
+    first request for more to arrive, then embeds them together.
+    """
+
+    def __init__(self, embedder, address: str, max_batch_size: int, max_wait_ms: float):
+        self.embedder = embedder
+        self.address = address
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.requests: queue.Queue = queue.Queue()
+        self.listener: Listener | None = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self.represented = 0
+        self.batches = 0
+
+    def listen(self) -> None:
+        """Bind the socket; only the daemon's user and group may connect."""
+        self.listener = Listener(self.address, family="AF_UNIX", authkey=get_authkey())
+        os.chmod(self.address, 0o660)
+
+    def serve_forever(self) -> None:
+        if self.listener is None:
+            self.listen()
+        threading.Thread(
+            target=self.batch_loop, name="deepface-batcher", daemon=True
+        ).start()
+        while not self._stopped.is_set():
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                if self._stopped.is_set():
+                    break
+                # Failed handshakes (wrong authkey) only drop that client
+                logger.warning("Rejected a DeepFace daemon connection", exc_info=True)
+                continue
+            threading.Thread(
+                target=self.handle_connection, args=(conn,), daemon=True
+            ).start()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        if self.listener is not None:
+            # Closing the socket does not interrupt a blocked accept(), so
+            # wake it up with a bare connection first
+            with contextlib.suppress(OSError):
+                with socket.socket(socket.AF_UNIX) as wake:
+                    wake.connect(self.address)
+            self.listener.close()
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def handle_connection(self, conn) -> None:
+        """Answer one client's requests in order until it disconnects."""
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                future: Future = Future()
+                self.requests.put((op, payload, future))
+                try:
+                    response = ("ok", future.result())
+                except Exception as e:
+                    response = ("error", str(e))
+                try:
+                    conn.send(response)
+                except OSError:
+                    return
+
+    def batch_loop(self) -> None:
+        """Gather requests into micro-batches and run them on the model."""
+        while not self._stopped.is_set():
+            try:
+                items = [self.requests.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.max_wait
+            while sum(op == "represent" for op, _, _ in items) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.run_items(items)
+
+    def run_items(self, items) -> None:
+        faces, waiting = [], []
+        for op, payload, future in items:
+            if op != "represent":
+                continue
+            try:
+                faces.append(self.embedder.extract_face(payload_image(payload)))
+                waiting.append(future)
+            except Exception as e:
+                future.set_exception(e)
+
+        if faces:
+            try:
+                embeddings = self.embedder.embed_faces(faces)
+            except Exception as e:
+                for future in waiting:
+                    future.set_exception(e)
+            else:
+                for future, embedding in zip(waiting, embeddings):
+                    future.set_result(list(embedding))
+            with self._lock:
+                self.batches += 1
+                self.represented += len(faces)
+
+        for op, payload, future in items:
+            if op == "represent":
+                continue
+            try:
+                future.set_result(self.run_op(op, payload))
+            except Exception as e:
+                future.set_exception(e)
+
+    def run_op(self, op: str, payload) -> Any:
+        if op == "status":
+            return self.status()
+        if op == "extract_face":
+            return self.embedder.extract_face(payload_image(payload))
+        if op == "embed_faces":
+            return self.embedder.embed_faces(payload)
+        raise ValueError(f"Unknown daemon operation {op!r}")
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            mean_batch = self.represented / self.batches if self.batches else 0.0
+            return {
+                **self.embedder.readiness(),
+                "daemon": {
+                    "socket": self.address,
+                    "max_batch_size": self.max_batch_size,
+                    "max_wait_ms": self.max_wait * 1000,
+                    "represented": self.represented,
+                    "batches": self.batches,
+                    "mean_batch_size": mean_batch,
+                    "queued": self.requests.qsize(),
+                },
+            }
+
+
+class RemoteEmbedder:
+    """
+    Drop-in replacement for ``FaceEmbedder`` that calls the daemon.
+
+    Keeps one connection per thread, so concurrent requests from the
+    inference executor reach the daemon together and can share a batch.
+    """
+
+    def __init__(self, address: str, timeout: float = 30):
+        self.address = address
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._local = threading.local()
+
+    @classmethod
+    def from_settings(cls) -> "RemoteEmbedder":
+        options = get_daemon_settings()
+        return cls(options["socket"], timeout=options["timeout"])
+
+    def _connection(self):
+        # Connections inherited across a fork would be shared with the parent
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self._local = threading.local()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family="AF_UNIX", authkey=get_authkey())
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def call(self, op: str, payload=None) -> Any:
+        """Send one request and wait for its answer."""
+        for attempt in range(2):
+            reused = getattr(self._local, "conn", None) is not None
+            try:
+                conn = self._connection()
+                conn.send((op, payload))
+                if not conn.poll(self.timeout):
+                    raise TimeoutError(
+                        f"DeepFace daemon did not answer within {self.timeout}s"
+                    )
+                status, result = conn.recv()
+                break
+            except TimeoutError:
+                # The late answer would be read by the next request
+                self._drop_connection()
+                raise
+            except (OSError, EOFError):
+                self._drop_connection()
+                # A kept-alive connection may predate a daemon restart
+                if attempt or not reused:
+                    raise
+        if status == "error":
+            raise RemoteInferenceError(result)
+        return result
+
+    @property
+    def is_ready(self) -> bool:
+        return self.readiness()["ready"]
+
+    def load(self) -> float:
+        """Check that the daemon is up; it loads the model itself."""
+        self.call("status")
+        return 0.0
+
+    def represent(self, img, timer: StageTimer | None = None) -> list[float]:
+        # Detection and embedding happen together in the daemon's batch
+        timer = timer if timer is not None else StageTimer()
+        with timer.stage("inference"):
+            return self.call("represent", image_payload(img))
+
+    def extract_face(self, img) -> np.ndarray:
+        return self.call("extract_face", image_payload(img))
+
+    def embed_faces(self, faces: list[np.ndarray]) -> list[list[float]]:
+        if not faces:
+            return []
+        return self.call("embed_faces", list(faces))
+
+    def readiness(self) -> dict[str, Any]:
+        try:
+            return self.call("status")
+        except Exception as e:
+            self._drop_connection()
+            return {"ready": False, "daemon": {"socket": self.address}, "error": str(e)}
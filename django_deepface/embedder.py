@@ -0,0 +1,456 @@
+"""Process-wide face embedding service for django-deepface."""
+
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .timing import StageTimer
+from .utils import (
+    decode_image,
+    get_deepface_settings,
+    get_detector_cascade,
+    get_embedding_dimensions,
+)
+
+logger = logging.getLogger(__name__)
+
+# Management commands that serve requests; the rest load the model themselves
+# if they need it, so warming up there only slows them down
+SERVING_COMMANDS = frozenset({"runserver", "runserver_plus"})
+
+
+def load_deepface():
+    """
+    Import DeepFace on first use.
+
+    Importing it loads TensorFlow, which takes seconds and hundreds of MB,
+    so only processes that actually run inference pay for it.
+    """
+    from deepface import DeepFace
+
+    return DeepFace
+
+
+class InferenceUnavailableError(Exception):
+    """Raised when this process is configured not to run face inference."""
+
+
+def is_local_inference_enabled() -> bool:
+    """Whether this process may load the model itself."""
+    return getattr(settings, "DEEPFACE_LOCAL_INFERENCE", True)
+
+
+def is_inference_available() -> bool:
+    """Whether faces can be embedded here, locally or through the daemon."""
+    return is_local_inference_enabled() or bool(
+        getattr(settings, "DEEPFACE_DAEMON_SOCKET", None)
+    )
+
+
+class FaceEmbedder:
+    """
+    Builds the configured DeepFace model and detector once and reuses them.
+
+    DeepFace caches models internally, but only after the first call has paid
+    for loading them. The embedder makes that cost explicit: ``load()`` warms
+    the model and detector up front and records how long it took, so callers
+    (and load balancers) can tell whether this process is ready to serve.
+
+    With a detector cascade, faces are detected by the cheapest backend that
+    finds one confidently, and how often each stage is used is recorded.
+    """
+
+    backend = "deepface"
+
+    def __init__(
+        self,
+        detector_cascade: list[tuple[str, float]] | None = None,
+        **deepface_settings: Any,
+    ):
+        self.deepface_settings = deepface_settings
+        self.detector_cascade = detector_cascade
+        self.cascade_stats = {
+            backend: {"attempts": 0, "hits": 0} for backend, _ in detector_cascade or []
+        }
+        self.pid = os.getpid()
+        self.loaded = False
+        self.loading = False
+        self.warmup_seconds: float | None = None
+        self.error: str | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "FaceEmbedder":
+        """Create an embedder for the current Django settings."""
+        return cls(detector_cascade=get_detector_cascade(), **get_deepface_settings())
+
+    @property
+    def is_ready(self) -> bool:
+        return self.loaded and self.pid == os.getpid()
+
+    def load(self) -> float:
+        """
+        Build the model and detector if this process has not done so yet.
+
+        Returns:
+            Seconds spent warming up (0.0 if already warm)
+        """
+        if self.is_ready:
+            return 0.0
+        with self._lock:
+            if self.is_ready:
+                return 0.0
+            self.loading = True
+            self.pid = os.getpid()
+            start = time.perf_counter()
+            try:
+                self.build()
+            except Exception as e:
+                self.error = str(e)
+                raise
+            finally:
+                self.loading = False
+            self.warmup_seconds = time.perf_counter() - start
+            self.loaded = True
+            self.error = None
+            logger.info(
+                "%s %s/%s warmed up in %.2fs (pid %s)",
+                self.backend,
+                self.deepface_settings.get("model_name"),
+                self.deepface_settings.get("detector_backend"),
+                self.warmup_seconds,
+                self.pid,
+            )
+            return self.warmup_seconds
+
+    def build(self) -> None:
+        """Build the recognition model and every detector this embedder uses."""
+        # Running a tiny blank frame through the public API builds both
+        # the recognition model and the detector, whatever the version.
+        blank = np.zeros((64, 64, 3), dtype=np.uint8)
+        results = load_deepface().represent(
+            blank, **{**self.deepface_settings, "enforce_detection": False}
+        )
+        self.check_dimensions(len(results[0]["embedding"]))
+        for backend, _ in self.detector_cascade or []:
+            load_deepface().extract_faces(
+                blank, detector_backend=backend, enforce_detection=False
+            )
+
+    def check_dimensions(self, dimensions: int) -> None:
+        """
+        Check the model's embeddings fit the columns they are stored in.
+
+        Raises:
+            ImproperlyConfigured: If their length is not the one expected
+                for the model
+        """
+        model_name = self.deepface_settings["model_name"]
+        expected = get_embedding_dimensions(model_name)
+        if dimensions != expected:
+            raise ImproperlyConfigured(
+                f"{model_name} returned {dimensions}-dimensional embeddings, "
+                f"expected {expected}; check DEEPFACE_EMBEDDING_DIMENSIONS"
+            )
+
+    def represent(self, img, timer: StageTimer | None = None) -> list[float]:
+        """
+        Return the embedding of the first face found in an image.
+
+        Args:
+            img: Path to an image file or a BGR numpy array
+            timer: Records ``detection`` and ``embedding`` when a cascade
+                runs them separately, otherwise one ``inference`` stage
+
+        Returns:
+            The embedding vector
+        """
+        timer = timer if timer is not None else StageTimer()
+        self.load()
+        if self.detector_cascade:
+            with timer.stage("detection"):
+                face = self.extract_face(img)
+            with timer.stage("embedding"):
+                return self.embed_faces([face])[0]
+        with timer.stage("inference"):
+            return load_deepface().represent(img, **self.deepface_settings)[0][
+                "embedding"
+            ]
+
+    def extract_face(self, img) -> np.ndarray:
+        """
+        Detect and align the first face in an image.
+
+        Args:
+            img: Path to an image file or a BGR numpy array
+
+        Returns:
+            The aligned face crop as a BGR float array, ready for ``embed_faces``
+        """
+        self.load()
+        if self.detector_cascade:
+            return self.detect_with_cascade(img)
+        face_objs = load_deepface().extract_faces(
+            img,
+            detector_backend=self.deepface_settings["detector_backend"],
+            enforce_detection=self.deepface_settings["enforce_detection"],
+            align=self.deepface_settings["align"],
+        )
+        # extract_faces returns RGB; represent expects BGR input
+        return face_objs[0]["face"][:, :, ::-1]
+
+    def detect_with_cascade(self, img) -> np.ndarray:
+        """
+        Run the detector cascade, stopping at the first confident detection.
+
+        Cheap stages never raise for a missing face; only the last stage
+        applies ``DEEPFACE_ENFORCE_DETECTION``.
+
+        Args:
+            img: Path to an image file or a BGR numpy array
+
+        Returns:
+            The aligned face crop as a BGR float array
+        """
+        if isinstance(img, str):
+            # Decode once rather than once per stage
+            img = decode_image(img)
+        last = len(self.detector_cascade) - 1
+        for stage, (backend, min_confidence) in enumerate(self.detector_cascade):
+            with self._lock:
+                self.cascade_stats[backend]["attempts"] += 1
+            face_objs = load_deepface().extract_faces(
+                img,
+                detector_backend=backend,
+                enforce_detection=(
+                    self.deepface_settings["enforce_detection"]
+                    if stage == last
+                    else False
+                ),
+                align=self.deepface_settings["align"],
+            )
+            face = face_objs[0]
+            if stage == last or face["confidence"] >= min_confidence:
+                with self._lock:
+                    self.cascade_stats[backend]["hits"] += 1
+                return face["face"][:, :, ::-1]
+            logger.debug(
+                "%s found no confident face (%.2f), falling back",
+                backend,
+                face["confidence"],
+            )
+
+    def embed_faces(self, faces: list[np.ndarray]) -> list[list[float]]:
+        """
+        Embed already detected face crops in a single forward pass.
+
+        Args:
+            faces: Face crops as returned by ``extract_face``
+
+        Returns:
+            One embedding per face, in the same order
+        """
+        if not faces:
+            return []
+        self.load()
+        results = load_deepface().represent(
+            list(faces),
+            model_name=self.deepface_settings["model_name"],
+            detector_backend="skip",
+            enforce_detection=False,
+            normalization=self.deepface_settings["normalization"],
+        )
+        # DeepFace unwraps the outer list when it is given a single image
+        if len(faces) == 1:
+            results = [results]
+        return [face_objs[0]["embedding"] for face_objs in results]
+
+    def cascade_hit_rates(self) -> dict[str, dict[str, Any]]:
+        """Attempts, hits and hit rate of each detector cascade stage."""
+        with self._lock:
+            return {
+                backend: {
+                    **counts,
+                    "hit_rate": (
+                        counts["hits"] / counts["attempts"]
+                        if counts["attempts"]
+                        else None
+                    ),
+                }
+                for backend, counts in self.cascade_stats.items()
+            }
+
+    def readiness(self) -> dict[str, Any]:
+        """Describe the warm-up state of this process."""
+        state = {
+            "ready": self.is_ready,
+            "backend": self.backend,
+            "loading": self.loading,
+            "pid": os.getpid(),
+            "model": self.deepface_settings.get("model_name"),
+            "detector": self.deepface_settings.get("detector_backend"),
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
+        if self.detector_cascade:
+            state["detector"] = [backend for backend, _ in self.detector_cascade]
+            state["detector_cascade"] = self.cascade_hit_rates()
+        return state
+
+
+EMBEDDERS = ("deepface", "onnx")
+
+
+def get_embedder_name() -> str:
+    """Get the configured embedding backend."""
+    name = getattr(settings, "DEEPFACE_EMBEDDER", "deepface")
+    if name not in EMBEDDERS:
+        raise ValueError(
+            f"DEEPFACE_EMBEDDER must be one of {', '.join(EMBEDDERS)}, not {name!r}"
+        )
+    return name
+
+
+def embedder_class(name: str | None = None) -> type[FaceEmbedder]:
+    """
+    The local embedder class of a backend, the configured one by default.
+
+    The ONNX backend is imported on demand, since it needs onnxruntime.
+    """
+    if (name or get_embedder_name()) == "onnx":
+        from .onnx_embedder import OnnxEmbedder
+
+        return OnnxEmbedder
+    return FaceEmbedder
+
+
+class DisabledEmbedder:
+    """
+    Embedder of inference-free processes: refuses every face.
+
+    Used when ``DEEPFACE_LOCAL_INFERENCE`` is False and no daemon is
+    configured. Such a process never imports DeepFace, serves password
+    logins and queues enrollments for ``deepface_worker`` on another host.
+    """
+
+    is_ready = True
+
+    def load(self) -> float:
+        return 0.0
+
+    def _refuse(self, *args, **kwargs):
+        raise InferenceUnavailableError(
+            "Face recognition is not available on this server"
+        )
+
+    represent = extract_face = embed_faces = _refuse
+
+    def readiness(self) -> dict[str, Any]:
+        # Ready: the process serves everything it is configured to serve
+        return {
+            "ready": True,
+            "loading": False,
+            "pid": os.getpid(),
+            "model": None,
+            "detector": None,
+            "local_inference": False,
+        }
+
+
+_embedder: FaceEmbedder | None = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder() -> FaceEmbedder:
+    """
+    Return the embedder shared by every thread in this process.
+
+    With ``DEEPFACE_DAEMON_SOCKET`` set this is a client for the shared
+    inference daemon instead of a local model. With
+    ``DEEPFACE_LOCAL_INFERENCE = False`` and no daemon it refuses to embed.
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                if getattr(settings, "DEEPFACE_DAEMON_SOCKET", None):
+                    from .daemon import RemoteEmbedder
+
+                    _embedder = RemoteEmbedder.from_settings()
+                elif not is_local_inference_enabled():
+                    _embedder = DisabledEmbedder()
+                else:
+                    _embedder = embedder_class().from_settings()
+    return _embedder
+
+
+def set_embedder(embedder) -> FaceEmbedder | None:
+    """
+    Use another embedder in this process, e.g. a stub in benchmarks.
+
+    Returns:
+        The embedder used until now, or None if none was built yet, so it
+        can be put back with ``set_embedder`` afterwards
+    """
+    global _embedder
+    with _embedder_lock:
+        previous, _embedder = _embedder, embedder
+    return previous
+
+
+def reset_embedder() -> None:
+    """Forget the shared embedder, e.g. after the DeepFace settings changed."""
+    global _embedder
+    with _embedder_lock:
+        _embedder = None
+
+
+def warm_up() -> float:
+    """
+    Eagerly load the model and detector for this process.
+
+    Call this from a gunicorn ``post_worker_init`` hook so that every worker
+    is warm before it accepts traffic.
+    """
+    return get_embedder().load()
+
+
+def is_serving_process(argv: list[str] | None = None) -> bool:
+    """
+    Whether this process serves requests rather than running a management command.
+
+    ``migrate``, ``collectstatic``, ``deepface_worker`` and other commands
+    run through ``manage.py``, ``django-admin`` or ``python -m django`` are
+    not serving processes; ``runserver`` and application servers such as
+    gunicorn or uvicorn are.
+    """
+    argv = sys.argv if argv is None else argv
+    if not argv:
+        return True
+    program = os.path.basename(argv[0])
+    is_command = program in ("manage.py", "django-admin", "django-admin.py") or (
+        program == "__main__.py"
+        and os.path.basename(os.path.dirname(argv[0])) == "django"
+    )
+    return not is_command or (len(argv) > 1 and argv[1] in SERVING_COMMANDS)
+
+
+def warm_up_in_background() -> threading.Thread:
+    """Start warming up in a daemon thread and return the thread."""
+
+    def run():
+        try:
+            warm_up()
+        except Exception as e:
+            logger.error(f"DeepFace warm-up failed: {e!s}")
+
+    thread = threading.Thread(target=run, name="deepface-warmup", daemon=True)
+    thread.start()
+    return thread
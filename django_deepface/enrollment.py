@@ -0,0 +1,217 @@
+"""Database-backed enrollment queue, drained by the deepface_worker command.
+
+Uploads are stored straight away with no embedding and an ``EnrollmentJob``;
+workers claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` so that several
+can run side by side without a message broker.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .embedder import get_embedder, is_inference_available
+from .face_templates import get_template_mode, rebuild_template
+from .models import EnrollmentJob, Identity
+from .signals import face_image_processed
+from .timing import StageTimer
+from .utils import decode_image, get_embedding_version
+from .vector_store import get_vector_store
+
+
+def is_async_enrollment_enabled() -> bool:
+    """
+    Whether uploads are embedded by deepface_worker instead of in the request.
+
+    Always the case in processes that cannot embed faces themselves.
+    """
+    return (
+        getattr(settings, "DEEPFACE_ASYNC_ENROLLMENT", False)
+        or not is_inference_available()
+    )
+
+
+def get_enrollment_settings() -> dict[str, int]:
+    """Get retry and lock settings for enrollment jobs."""
+    return {
+        "max_attempts": getattr(settings, "DEEPFACE_ENROLLMENT_MAX_ATTEMPTS", 3),
+        "retry_delay": getattr(settings, "DEEPFACE_ENROLLMENT_RETRY_DELAY", 10),
+        "lock_timeout": getattr(settings, "DEEPFACE_ENROLLMENT_LOCK_TIMEOUT", 300),
+    }
+
+
+def enqueue_enrollment(identity: Identity) -> EnrollmentJob:
+    """
+    Save an Identity without an embedding and queue it for the worker.
+
+    Args:
+        identity: Unsaved Identity with its user, number and image set
+
+    Returns:
+        The pending job
+    """
+    with transaction.atomic():
+        identity.embedding = None
+        identity.save()
+        return EnrollmentJob.objects.create(identity=identity, run_after=timezone.now())
+
+
+def claim_jobs(limit: int) -> list[EnrollmentJob]:
+    """
+    Claim up to ``limit`` due jobs for this worker.
+
+    Jobs left in processing by a worker that died are picked up again once
+    their lock is older than ``DEEPFACE_ENROLLMENT_LOCK_TIMEOUT`` seconds,
+    unless they have used up their attempts: an image that keeps killing its
+    worker (out of memory, a crash in the detector) is marked failed instead.
+
+    Args:
+        limit: Most jobs to claim
+
+    Returns:
+        Claimed jobs with their identities loaded
+    """
+    options = get_enrollment_settings()
+    now = timezone.now()
+    stale = now - timedelta(seconds=options["lock_timeout"])
+    with transaction.atomic():
+        EnrollmentJob.objects.filter(
+            status=EnrollmentJob.Status.PROCESSING,
+            locked_at__lt=stale,
+            attempts__gte=options["max_attempts"],
+        ).update(
+            status=EnrollmentJob.Status.FAILED,
+            error="The worker died while processing this image",
+            locked_at=None,
+            updated_at=now,
+        )
+        jobs = list(
+            EnrollmentJob.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("identity")
+            .filter(
+                Q(status=EnrollmentJob.Status.PENDING, run_after__lte=now)
+                | Q(
+                    status=EnrollmentJob.Status.PROCESSING,
+                    locked_at__lt=stale,
+                    attempts__lt=options["max_attempts"],
+                )
+            )
+            .order_by("run_after")[:limit]
+        )
+        EnrollmentJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=EnrollmentJob.Status.PROCESSING,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+            updated_at=now,
+        )
+    for job in jobs:
+        job.status = EnrollmentJob.Status.PROCESSING
+        job.locked_at = now
+        job.attempts += 1
+    return jobs
+
+
+def process_jobs(jobs: list[EnrollmentJob]) -> tuple[int, int]:
+    """
+    Detect and embed the images of claimed jobs in one forward pass.
+
+    The forward pass is shared, so each job's ``embedding`` timing is its
+    share of the batch.
+
+    Args:
+        jobs: Jobs returned by ``claim_jobs``
+
+    Returns:
+        Number of jobs completed and failed
+    """
+    embedder = get_embedder()
+    faces, detected, timers = [], [], []
+    failed = 0
+    for job in jobs:
+        timer = StageTimer()
+        try:
+            with timer.stage("decode"), job.identity.image.open("rb") as f:
+                img = decode_image(f)
+            with timer.stage("detection"):
+                faces.append(embedder.extract_face(img))
+            detected.append(job)
+            timers.append(timer)
+        except Exception as e:
+            fail_job(job, e)
+            failed += 1
+
+    batch = StageTimer()
+    try:
+        with batch.stage("embedding"):
+            embeddings = embedder.embed_faces(faces)
+    except Exception as e:
+        for job in detected:
+            fail_job(job, e)
+        return 0, failed + len(detected)
+
+    for job, embedding, timer in zip(detected, embeddings, timers):
+        timer.timings["embedding"] = batch.total / len(detected)
+        complete_job(job, embedding, timer)
+    return len(detected), failed
+
+
+def complete_job(
+    job: EnrollmentJob, embedding: list[float], timer: StageTimer | None = None
+) -> None:
+    """Store the embedding and mark the job done."""
+    timer = timer if timer is not None else StageTimer()
+    identity = job.identity
+    with timer.stage("save"), transaction.atomic():
+        # The user may have deleted the image while it was being processed
+        if not Identity.objects.filter(pk=identity.pk).update(
+            embedding=embedding, embedding_version=get_embedding_version()
+        ):
+            return
+        EnrollmentJob.objects.filter(pk=job.pk).update(
+            status=EnrollmentJob.Status.DONE,
+            error="",
+            locked_at=None,
+            updated_at=timezone.now(),
+        )
+        # update() sends no post_save, so refresh the template and the
+        # vector store here
+        if get_template_mode() is not None:
+            rebuild_template(identity.user_id)
+        get_vector_store().invalidate()
+    identity.embedding = embedding
+    face_image_processed.send(
+        "deepface_worker",
+        request=None,
+        stage="enroll",
+        identity=identity,
+        was_successful=True,
+        timings=dict(timer.timings),
+    )
+
+
+def fail_job(job: EnrollmentJob, error: Exception) -> None:
+    """Schedule a retry with exponential backoff, or give up after the last attempt."""
+    options = get_enrollment_settings()
+    now = timezone.now()
+    if job.attempts >= options["max_attempts"]:
+        status, run_after = EnrollmentJob.Status.FAILED, job.run_after
+    else:
+        delay = options["retry_delay"] * 2 ** (job.attempts - 1)
+        status, run_after = EnrollmentJob.Status.PENDING, now + timedelta(seconds=delay)
+    EnrollmentJob.objects.filter(pk=job.pk).update(
+        status=status,
+        error=str(error),
+        run_after=run_after,
+        locked_at=None,
+        updated_at=now,
+    )
+    job.status = status
+    face_image_processed.send(
+        "deepface_worker",
+        request=None,
+        stage="enroll",
+        identity=job.identity,
+        was_successful=False,
+    )
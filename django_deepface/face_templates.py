@@ -0,0 +1,134 @@
+"""Per-user face templates for single-compare verification."""
+
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+
+from .models import FaceTemplate, Identity
+from .search import get_distance_metric, numpy_distances
+from .utils import get_embedding_version
+from .vector_store import current_embedding, get_vector_store, has_current_embedding
+
+TEMPLATE_MODES = ("mean", "packed")
+
+
+def get_template_mode() -> str | None:
+    """
+    Get how verification uses face templates, or None if it does not.
+
+    A ``"mean"`` template is a unit-length direction, so it is only comparable
+    with raw query embeddings under the cosine distance.
+    """
+    mode = getattr(settings, "DEEPFACE_TEMPLATES", None)
+    if mode is not None and mode not in TEMPLATE_MODES:
+        raise ValueError(
+            f"DEEPFACE_TEMPLATES must be None or one of {', '.join(TEMPLATE_MODES)}, not {mode!r}"
+        )
+    if mode == "mean" and get_distance_metric() != "cosine":
+        raise ValueError(
+            'DEEPFACE_TEMPLATES = "mean" needs DEEPFACE_DISTANCE = "cosine", '
+            f"not {get_distance_metric()!r}"
+        )
+    return mode
+
+
+def pack_embeddings(embeddings: np.ndarray) -> bytes:
+    return np.ascontiguousarray(embeddings, dtype=np.float32).tobytes()
+
+
+def unpack_embeddings(packed: bytes, dimensions: int) -> np.ndarray:
+    return np.frombuffer(bytes(packed), dtype=np.float32).reshape(-1, dimensions)
+
+
+def rebuild_template(user_id: int) -> FaceTemplate | None:
+    """
+    Recompute a user's template from their current Identity rows.
+
+    Args:
+        user_id: Primary key of the user
+
+    Returns:
+        The saved template, or None if the user has no embeddings left
+    """
+    rows = list(
+        Identity.objects.filter(has_current_embedding(), user_id=user_id)
+        .order_by("image_number")
+        .values_list(current_embedding(), flat=True)
+    )
+    if not rows:
+        FaceTemplate.objects.filter(user_id=user_id).delete()
+        return None
+
+    embeddings = np.asarray(rows, dtype=np.float32)
+    unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True).clip(1e-12)
+    mean = unit.mean(axis=0)
+    mean /= max(float(np.linalg.norm(mean)), 1e-12)
+
+    template, _ = FaceTemplate.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "embedding": mean.tolist(),
+            "packed_embeddings": pack_embeddings(embeddings),
+            "image_count": len(rows),
+            "embedding_version": get_embedding_version(),
+        },
+    )
+    return template
+
+
+def rebuild_templates(user_ids) -> int:
+    """Rebuild the templates of several users, returning how many exist."""
+    return sum(rebuild_template(user_id) is not None for user_id in set(user_ids))
+
+
+def verify(username: str, embedding) -> tuple[Any, float] | None:
+    """
+    Compare an embedding with the enrolled faces of one user (1:1).
+
+    With ``DEEPFACE_TEMPLATES`` set this is a single primary-key lookup of
+    the user's template that returns the user in the same query; without it,
+    or while the template is of another configuration, every image of the
+    user is ranked by distance in the vector store.
+
+    Args:
+        username: User claimed by the login attempt
+        embedding: Query embedding
+
+    Returns:
+        ``(user, distance)`` for the closest match, or None if the user has
+        no enrolled faces
+    """
+    mode = get_template_mode()
+    store = get_vector_store()
+    if mode is not None:
+        templates = FaceTemplate.objects.filter(
+            user__username=username, embedding_version=get_embedding_version()
+        ).select_related("user")
+        if mode == "packed":
+            template = templates.first()
+            if template is not None:
+                dimensions = Identity._meta.get_field("embedding").dimensions
+                distances = numpy_distances(
+                    unpack_embeddings(template.packed_embeddings, dimensions),
+                    embedding,
+                )
+                return template.user, float(distances.min())
+        else:
+            match = store.closest(templates, embedding)
+            if match is not None:
+                template, distance = match
+                return template.user, distance
+        # No template for this configuration (yet): compare every image
+
+    match = store.closest(
+        Identity.objects.filter(
+            has_current_embedding(), user__username=username
+        ).select_related("user"),
+        embedding,
+        current_embedding(),
+    )
+    if match is None:
+        return None
+    identity, distance = match
+    return identity.user, distance
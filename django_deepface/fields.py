@@ -0,0 +1,85 @@
+"""Model fields for django-deepface."""
+
+import numpy as np
+from django.conf import settings
+from pgvector.django import VectorField
+
+from .utils import get_embedding_dimensions
+
+STORAGE_TYPES = ("vector", "halfvec")
+
+
+def get_embedding_storage() -> str:
+    """Get the pgvector type embeddings are stored as."""
+    storage = getattr(settings, "DEEPFACE_EMBEDDING_STORAGE", "vector")
+    if storage not in STORAGE_TYPES:
+        raise ValueError(
+            f"DEEPFACE_EMBEDDING_STORAGE must be one of {', '.join(STORAGE_TYPES)}, not {storage!r}"
+        )
+    return storage
+
+
+class EmbeddingField(VectorField):
+    """
+    Vector column stored as ``vector`` or ``halfvec`` depending on settings.
+
+    ``halfvec`` keeps each dimension in 2 bytes instead of 4, halving the
+    table, index and transfer size. Both types use the same text format, so
+    values read back as float32 arrays either way.
+
+    Unless ``dimensions`` is given, the column is sized for the embeddings of
+    ``DEEPFACE_MODEL``, so migrations do not pin a model. With
+    ``fixed_dimensions=False`` it holds vectors of any length (no ANN index
+    can be built on it), e.g. to stage embeddings of another model.
+
+    On databases other than PostgreSQL the column is a binary column holding
+    the packed float32 values, which the NumPy vector store searches.
+    """
+
+    description = "Face embedding"
+
+    def __init__(self, *args, dimensions=None, fixed_dimensions=True, **kwargs):
+        self.fixed_dimensions = fixed_dimensions
+        super().__init__(*args, dimensions=dimensions, **kwargs)
+
+    @property
+    def dimensions(self) -> int | None:
+        if self._dimensions is None and self.fixed_dimensions:
+            return get_embedding_dimensions()
+        return self._dimensions
+
+    @dimensions.setter
+    def dimensions(self, value):
+        self._dimensions = value
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        # Only explicit dimensions belong in migrations
+        kwargs.pop("dimensions", None)
+        if self._dimensions is not None:
+            kwargs["dimensions"] = self._dimensions
+        if not self.fixed_dimensions:
+            kwargs["fixed_dimensions"] = False
+        return name, path, args, kwargs
+
+    def db_type(self, connection):
+        storage = get_embedding_storage()
+        if connection.vendor != "postgresql":
+            return connection.data_types["BinaryField"]
+        if self.dimensions is None:
+            return storage
+        return f"{storage}({self.dimensions:d})"
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if connection.vendor == "postgresql":
+            return super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = self.to_python(value)
+        return np.asarray(value, dtype=np.float32).tobytes()
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, (bytes, memoryview)):
+            return np.frombuffer(value, dtype=np.float32).copy()
+        return super().from_db_value(value, expression, connection)
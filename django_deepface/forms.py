@@ -6,11 +6,40 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.core.validators import FileExtensionValidator
 
 from .models import Identity
+from .utils import get_max_upload_bytes, is_identification_enabled
+
+
+class FaceUploadFieldMixin:
+    """Reports uploads refused by ``FaceUploadHandler`` or over the byte budget.
+
+    The byte check also covers views that do not stream through the handler.
+    Both run before the image is opened.
+    """
+
+    def to_python(self, data):
+        error = getattr(data, "error", None)
+        if error:
+            raise forms.ValidationError(error, code="upload_rejected")
+        max_bytes = get_max_upload_bytes()
+        if max_bytes and getattr(data, "size", 0) > max_bytes:
+            raise forms.ValidationError(
+                f"Image is larger than {max_bytes / 1024 / 1024:.1f} MB",
+                code="upload_rejected",
+            )
+        return super().to_python(data)
+
+
+class FaceFileField(FaceUploadFieldMixin, forms.FileField):
+    """File field for face images decoded later, e.g. by the login view."""
+
+
+class FaceImageField(FaceUploadFieldMixin, forms.ImageField):
+    """Image field for face images validated by Pillow on submission."""
 
 
 class FaceLoginForm(AuthenticationForm):
     use_face_login = forms.BooleanField(required=False)
-    face_image = forms.FileField(required=False)
+    face_image = FaceFileField(required=False)
     password = forms.CharField(
         label="Password",
         strip=False,
@@ -18,9 +47,17 @@ class FaceLoginForm(AuthenticationForm):
         required=False,  # Make password optional
     )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Face login without a username searches the whole gallery
+        if is_identification_enabled():
+            self.fields["username"].required = False
+
     def clean_username(self):
         username = self.cleaned_data.get("username")
-        if not username:
+        if not username and not (
+            is_identification_enabled() and self.data.get("use_face_login")
+        ):
             raise forms.ValidationError("Please provide a username.")
         return username
 
@@ -80,7 +117,7 @@ class FaceLoginForm(AuthenticationForm):
 
 
 class FaceImageUploadForm(forms.ModelForm):
-    image = forms.ImageField(
+    image = FaceImageField(
         validators=[
             FileExtensionValidator(allowed_extensions=["jpg", "jpeg", "png", "webp"])
         ],
@@ -0,0 +1,231 @@
+"""Export and import of the embedding gallery without recomputing it.
+
+An export is a directory holding:
+
+- ``header.json``: format version, row count, matrix dtype and the
+  embedding version (model configuration) the embeddings were computed with
+- ``embeddings.npy``: a contiguous ``(rows, dimensions)`` float32 or float16
+  matrix in NumPy's ``.npy`` format, so it can be memory-mapped
+- ``identities.jsonl``: one line of Identity metadata per matrix row
+
+Both directions stream in chunks, so galleries with millions of rows never
+sit in memory at once.
+"""
+
+import itertools
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .bulk import insert_identities
+from .face_templates import get_template_mode, rebuild_templates
+from .models import Identity
+from .utils import get_embedding_version
+from .vector_store import current_embedding, has_current_embedding
+
+FORMAT = "django-deepface-embeddings"
+FORMAT_VERSION = 1
+HEADER_FILE = "header.json"
+MATRIX_FILE = "embeddings.npy"
+ROWS_FILE = "identities.jsonl"
+DTYPES = ("float32", "float16")
+
+
+class GalleryMismatchError(Exception):
+    """Raised when an export was made with an incompatible model configuration."""
+
+
+def export_gallery(
+    directory: str | Path, dtype: str = "float32", chunk_size: int = 10_000
+) -> int:
+    """
+    Write every Identity embedded with the current configuration to a directory.
+
+    Args:
+        directory: Directory to create (must not contain an export already)
+        dtype: ``float32`` or ``float16`` for the matrix
+        chunk_size: Rows fetched and written at a time
+
+    Returns:
+        Number of rows exported
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(DTYPES)}, not {dtype!r}")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    if (directory / HEADER_FILE).exists():
+        raise FileExistsError(f"{directory} already contains an export")
+
+    # Only a new transaction can change its isolation level
+    snapshot = connection.vendor == "postgresql" and not connection.in_atomic_block
+    with transaction.atomic():
+        if snapshot:
+            # The count and the rows must come from the same snapshot
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        identities = Identity.objects.filter(has_current_embedding()).order_by("pk")
+        rows = identities.count()
+        matrix = np.lib.format.open_memmap(
+            directory / MATRIX_FILE,
+            mode="w+",
+            dtype=dtype,
+            shape=(rows, Identity.vector_dimensions),
+        )
+        values = identities.values_list(
+            "user__username", "image_number", "image", current_embedding()
+        ).iterator(chunk_size=chunk_size)
+        start = 0
+        with open(directory / ROWS_FILE, "w") as f:
+            while chunk := list(itertools.islice(values, chunk_size)):
+                matrix[start : start + len(chunk)] = np.stack(
+                    [embedding for *_, embedding in chunk]
+                )
+                for username, image_number, image, _ in chunk:
+                    f.write(
+                        json.dumps(
+                            {
+                                "username": username,
+                                "image_number": image_number,
+                                "image": image,
+                            }
+                        )
+                        + "\n"
+                    )
+                start += len(chunk)
+        matrix.flush()
+        del matrix
+
+    header = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "rows": rows,
+        "dtype": dtype,
+        "exported_at": timezone.now().isoformat(),
+        "embedding_version": get_embedding_version(),
+        "dimensions": Identity.vector_dimensions,
+    }
+    # Written last, so an interrupted export is never mistaken for a complete one
+    (directory / HEADER_FILE).write_text(json.dumps(header, indent=2) + "\n")
+    return rows
+
+
+def read_header(directory: str | Path) -> dict[str, Any]:
+    """
+    Read an export's header and check it against this installation.
+
+    Raises:
+        GalleryMismatchError: If the format or model configuration differs
+    """
+    header = json.loads((Path(directory) / HEADER_FILE).read_text())
+    if header.get("format") != FORMAT or header.get("version") != FORMAT_VERSION:
+        raise GalleryMismatchError(
+            f"Not a version {FORMAT_VERSION} {FORMAT} export: "
+            f"{header.get('format')!r} version {header.get('version')!r}"
+        )
+    version = get_embedding_version()
+    if header.get("embedding_version") != version:
+        raise GalleryMismatchError(
+            "Embeddings were computed with a different configuration: "
+            f"{header.get('embedding_version')!r} in the export but {version!r} here"
+        )
+    # Only the .npy header is read here
+    shape = np.load(Path(directory) / MATRIX_FILE, mmap_mode="r").shape
+    if shape != (header["rows"], Identity.vector_dimensions):
+        raise GalleryMismatchError(
+            f"{MATRIX_FILE} has shape {shape}, expected "
+            f"{(header['rows'], Identity.vector_dimensions)}"
+        )
+    return header
+
+
+def read_rows(
+    directory: str | Path, chunk_size: int
+) -> Iterator[tuple[list[dict[str, Any]], np.ndarray]]:
+    """Yield metadata and embeddings of an export, ``chunk_size`` rows at a time."""
+    directory = Path(directory)
+    matrix = np.load(directory / MATRIX_FILE, mmap_mode="r")
+    start = 0
+    with open(directory / ROWS_FILE) as f:
+        lines = (json.loads(line) for line in f)
+        while chunk := list(itertools.islice(lines, chunk_size)):
+            yield chunk, np.asarray(matrix[start : start + len(chunk)], np.float32)
+            start += len(chunk)
+    if start != len(matrix):
+        raise GalleryMismatchError(
+            f"{ROWS_FILE} has {start} rows but {MATRIX_FILE} has {len(matrix)}"
+        )
+
+
+def import_gallery(
+    directory: str | Path, create_users: bool = False, chunk_size: int = 10_000
+) -> dict[str, int]:
+    """
+    Insert the rows of an export, skipping images that already exist.
+
+    Each chunk is committed on its own with ``insert_identities`` (binary
+    COPY where available). Image files are not copied; the stored names are
+    kept, so sync the media files separately if they are needed.
+
+    Args:
+        directory: Export directory
+        create_users: Create users missing from this database (with unusable
+            passwords) instead of skipping their rows
+        chunk_size: Rows read and inserted at a time
+
+    Returns:
+        Counts of ``imported`` rows, rows ``skipped`` because the image
+        number is taken, and rows of ``missing_users``
+
+    Raises:
+        GalleryMismatchError: If the export is incompatible
+    """
+    read_header(directory)
+    counts = {"imported": 0, "skipped": 0, "missing_users": 0}
+    password = make_password(None)
+    for rows, embeddings in read_rows(directory, chunk_size):
+        usernames = {row["username"] for row in rows}
+        with transaction.atomic():
+            users = {u.username: u for u in User.objects.filter(username__in=usernames)}
+            if create_users:
+                missing = usernames - users.keys()
+                User.objects.bulk_create(
+                    [User(username=name, password=password) for name in missing],
+                    ignore_conflicts=True,
+                )
+                users = {
+                    u.username: u for u in User.objects.filter(username__in=usernames)
+                }
+            taken = set(
+                Identity.objects.filter(user__in=users.values()).values_list(
+                    "user_id", "image_number"
+                )
+            )
+            identities = []
+            for row, embedding in zip(rows, embeddings):
+                user = users.get(row["username"])
+                if user is None:
+                    counts["missing_users"] += 1
+                elif (user.id, row["image_number"]) in taken:
+                    counts["skipped"] += 1
+                else:
+                    identities.append(
+                        Identity(
+                            user=user,
+                            image_number=row["image_number"],
+                            image=row["image"],
+                            embedding=embedding,
+                        )
+                    )
+            insert_identities(identities)
+            # Bulk inserts send no post_save, so refresh templates here
+            if get_template_mode() is not None:
+                rebuild_templates({identity.user_id for identity in identities})
+        counts["imported"] += len(identities)
+    return counts
@@ -0,0 +1,192 @@
+"""Bounded executor that keeps face inference off request threads."""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from django.conf import settings
+
+from .embedder import get_embedder
+from .timing import StageTimer
+from .utils import load_upload
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceOverloadedError(Exception):
+    """Raised when the inference queue is full and a request is shed."""
+
+
+class InferenceExecutor:
+    """
+    Runs blocking detection and embedding on a fixed number of threads.
+
+    At most ``workers + max_queue`` jobs are admitted at once. Anything beyond
+    that is refused immediately with ``InferenceOverloadedError`` instead of
+    queueing, so a burst of face logins degrades to password login rather
+    than to ever-growing latency for everyone.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        if workers < 1:
+            raise ValueError("DEEPFACE_INFERENCE_WORKERS must be at least 1")
+        if max_queue < 0:
+            raise ValueError("DEEPFACE_INFERENCE_QUEUE must not be negative")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pid = os.getpid()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="deepface-inference"
+        )
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "InferenceExecutor":
+        """Create an executor sized by the DEEPFACE_INFERENCE_* settings."""
+        return cls(
+            workers=getattr(settings, "DEEPFACE_INFERENCE_WORKERS", 1),
+            max_queue=getattr(settings, "DEEPFACE_INFERENCE_QUEUE", 4),
+        )
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Queue a blocking call, or refuse it if the queue is full.
+
+        Args:
+            fn: Function to run on an inference thread
+            *args: Arguments for ``fn``
+
+        Returns:
+            A future for the result of ``fn``
+
+        Raises:
+            InferenceOverloadedError: If every worker is busy and the queue is full
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            logger.warning(
+                "DeepFace inference queue full (%s queued, %s running); shedding request",
+                self.queued,
+                self.running,
+            )
+            raise InferenceOverloadedError("Face recognition is busy")
+
+        submitted = time.perf_counter()
+        started = False
+        with self._lock:
+            self.queued += 1
+
+        def run():
+            nonlocal started
+            waited = time.perf_counter() - submitted
+            with self._lock:
+                started = True
+                self.queued -= 1
+                self.running += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            try:
+                return fn(*args)
+            finally:
+                # Released before the result is set, so callers that see it
+                # can submit again straight away
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                self._slots.release()
+
+        def release_if_cancelled(future: Future) -> None:
+            # A job cancelled while queued (its caller went away, or the
+            # executor shut down) never runs, so give its slot back here
+            with self._lock:
+                if started:
+                    return
+                self.queued -= 1
+                self.cancelled += 1
+            self._slots.release()
+
+        try:
+            future = self._executor.submit(run)
+        except Exception:
+            with self._lock:
+                self.queued -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(release_if_cancelled)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking call on the executor and await its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict[str, Any]:
+        """Describe queue depth and wait times for monitoring."""
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "rejected": self.rejected,
+                "mean_wait_seconds": (
+                    self.total_wait_seconds / started if started else 0.0
+                ),
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: InferenceExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Return this process's inference executor."""
+    global _executor
+    # Threads do not survive a fork, so a forked worker builds its own
+    if _executor is None or _executor.pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor.pid != os.getpid():
+                _executor = InferenceExecutor.from_settings()
+    return _executor
+
+
+def reset_inference_executor() -> None:
+    """Shut down the executor, e.g. after the DEEPFACE_INFERENCE_* settings changed."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor.pid == os.getpid():
+            _executor.shutdown()
+        _executor = None
+
+
+def embed_upload(uploaded_file, timer: StageTimer | None = None) -> list[float]:
+    """
+    Decode an upload and embed the first face in it (runs on the executor).
+
+    Args:
+        uploaded_file: The uploaded image
+        timer: Receives the ``decode`` stage and the embedder's stages
+    """
+    timer = timer if timer is not None else StageTimer()
+    with timer.stage("decode"):
+        img = load_upload(uploaded_file)
+    return get_embedder().represent(img, timer=timer)
@@ -0,0 +1,482 @@
+"""Concurrent load generator for face login and enrollment.
+
+``deepface_bench`` times one request at a time; this drives ``face_login``
+and ``profile_view`` with many clients at once, so queueing in the inference
+executor, overload shedding, database connections and session writes show
+up in the numbers. Each client is a user of its own with a logged-in
+session and an enrolled face, and sends a mix of face logins and
+enrollments with real or synthetic frames.
+
+Two targets:
+
+- in-process (default): each client is an ``AsyncClient`` on one event loop,
+  which runs the views through Django's ASGI handler as an ASGI server
+  would. The CPU stub replaces the model unless asked otherwise, so it runs
+  on a laptop, and per-stage timings come from ``face_image_processed``.
+- a running instance (``url``): each client has its own keep-alive HTTP
+  connection and cookies on a thread of its own. Users and sessions are
+  created in this process's database, so it must share the server's
+  database and session settings. Per-stage means come from the metrics
+  endpoint when ``DEEPFACE_METRICS`` is enabled on a single-process server.
+
+Used by the ``deepface_loadtest`` command.
+"""
+
+import asyncio
+import random
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from http.cookies import SimpleCookie
+from importlib import import_module
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import login
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import close_old_connections, connections
+from django.http import HttpRequest
+from django.test import AsyncClient
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+
+from .benchmark import (
+    StubEmbedder,
+    collect_stage_timings,
+    environment,
+    summarize,
+    synthetic_image,
+)
+from .embedder import set_embedder
+from .models import Identity
+from .utils import get_max_faces_per_user
+
+# Every user the load test creates starts with this, so it can clean up
+LOAD_USER_PREFIX = "deepface-load-"
+
+# How each request ended: logged in or enrolled, refused by the app (no
+# match, form error), shed by the inference executor, or failed outright
+OUTCOMES = ("ok", "rejected", "shed", "error")
+
+FRAME_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+BUSY_MESSAGE = b"busy right now"
+UPLOADED_MESSAGE = b"Face image uploaded"
+
+METRIC_LINE = re.compile(
+    r"^deepface_stage_seconds_(sum|count)\{([^}]*)\} (\S+)$", re.MULTILINE
+)
+METRIC_LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+
+def classify(operation: str, status: int, content: bytes) -> str:
+    """
+    Sort a response into one of ``OUTCOMES``.
+
+    Args:
+        operation: ``"login"`` or ``"enroll"``
+        status: HTTP status code
+        content: Response body
+    """
+    if status >= 400:
+        return "error"
+    if operation == "login" and status == 302:
+        return "ok"
+    if operation == "enroll" and status == 200 and UPLOADED_MESSAGE in content:
+        return "ok"
+    if BUSY_MESSAGE in content:
+        return "shed"
+    return "rejected"
+
+
+def load_frames(directory: str | None = None, count: int = 8) -> list[bytes]:
+    """
+    Read the images in a directory, or generate synthetic frames.
+
+    Raises:
+        ValueError: If the directory holds no images
+    """
+    if directory is None:
+        return [synthetic_image(seed) for seed in range(count)]
+    paths = sorted(
+        path
+        for path in Path(directory).iterdir()
+        if path.suffix.lower() in FRAME_SUFFIXES
+    )
+    if not paths:
+        raise ValueError(f"No images found in {directory}")
+    return [path.read_bytes() for path in paths]
+
+
+def create_load_users(count: int) -> list[User]:
+    """Create ``count`` load test users with unusable passwords."""
+    clear_load_users()
+    password = make_password(None)
+    User.objects.bulk_create(
+        [
+            User(username=f"{LOAD_USER_PREFIX}{i}", password=password)
+            for i in range(count)
+        ]
+    )
+    return list(
+        User.objects.filter(username__startswith=LOAD_USER_PREFIX).order_by("id")
+    )
+
+
+def clear_load_users() -> None:
+    """Delete every load test user, with their face images and files."""
+    for identity in Identity.objects.filter(
+        user__username__startswith=LOAD_USER_PREFIX
+    ):
+        if identity.image:
+            identity.image.delete(save=False)
+    User.objects.filter(username__startswith=LOAD_USER_PREFIX).delete()
+
+
+def trim_faces(user_id: int) -> None:
+    """Delete all but a user's first face image, so enrollment can go on."""
+    for identity in Identity.objects.filter(user_id=user_id, image_number__gt=1):
+        if identity.image:
+            identity.image.delete(save=False)
+        identity.delete()
+
+
+def start_session(user: User) -> str:
+    """Log a user in to a new session and return its key."""
+    request = HttpRequest()
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
+    request.session.save()
+    return request.session.session_key
+
+
+class InProcessClient:
+    """Sends requests through Django's ASGI handler in this process."""
+
+    def __init__(self, session_key: str):
+        self.client = AsyncClient()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+
+    async def post(self, path: str, data: dict) -> tuple[int, bytes]:
+        response = await self.client.post(path, data)
+        # The test client leaves the request's database connections open;
+        # close them as request_finished does under a server
+        await sync_to_async(close_old_connections)()
+        return response.status_code, response.content
+
+
+class HttpClient:
+    """
+    Sends requests to a running instance over one keep-alive connection.
+
+    Requests are blocking and run on ``executor``; cookies set by the server
+    (the session after login, the CSRF token) are kept like a browser would.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        session_key: str,
+        executor: ThreadPoolExecutor,
+        timeout: float = 30,
+    ):
+        url = urlsplit(base_url)
+        connection_class = HTTPSConnection if url.scheme == "https" else HTTPConnection
+        self.connection = connection_class(url.netloc, timeout=timeout)
+        self.origin = f"{url.scheme}://{url.netloc}"
+        self.prefix = url.path.rstrip("/")
+        self.executor = executor
+        self.cookies = {settings.SESSION_COOKIE_NAME: session_key}
+        # CSRF_HEADER_NAME is in request.META form, e.g. HTTP_X_CSRFTOKEN
+        self.csrf_header = settings.CSRF_HEADER_NAME.removeprefix("HTTP_").replace(
+            "_", "-"
+        )
+
+    def request(
+        self, method: str, path: str, body: bytes | None = None, headers=None
+    ) -> tuple[int, bytes]:
+        headers = {
+            **(headers or {}),
+            "Cookie": "; ".join(f"{k}={v}" for k, v in self.cookies.items()),
+        }
+        try:
+            self.connection.request(method, self.prefix + path, body, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except Exception:
+            # Reconnect on the next request
+            self.connection.close()
+            raise
+        for header in response.headers.get_all("Set-Cookie") or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response.status, content
+
+    def post_sync(self, path: str, data: dict) -> tuple[int, bytes]:
+        if settings.CSRF_COOKIE_NAME not in self.cookies:
+            self.request("GET", path)
+        return self.request(
+            "POST",
+            path,
+            encode_multipart(BOUNDARY, data),
+            {
+                "Content-Type": MULTIPART_CONTENT,
+                "Referer": self.origin + self.prefix + path,
+                self.csrf_header: self.cookies.get(settings.CSRF_COOKIE_NAME, ""),
+            },
+        )
+
+    async def post(self, path: str, data: dict) -> tuple[int, bytes]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.post_sync, path, data
+        )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def read_stage_totals(self) -> dict[tuple[str, str], list[float]] | None:
+        """Read ``deepface_stage_seconds`` sums and counts from the metrics endpoint."""
+        try:
+            status, content = self.request("GET", reverse("django_deepface:metrics"))
+        except Exception:
+            return None
+        if status != 200:
+            return None
+        totals: dict[tuple[str, str], list[float]] = defaultdict(lambda: [0.0, 0.0])
+        for kind, label_text, value in METRIC_LINE.findall(content.decode()):
+            labels = dict(METRIC_LABEL.findall(label_text))
+            key = (labels.get("operation", ""), labels.get("stage", ""))
+            totals[key][kind == "count"] = float(value)
+        return dict(totals)
+
+    async def stage_totals(self) -> dict[tuple[str, str], list[float]] | None:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.read_stage_totals
+        )
+
+
+class LoadClient:
+    """One simulated user: a transport, a username and a face frame."""
+
+    def __init__(self, transport, user: User, frame: bytes, identify: bool = False):
+        self.transport = transport
+        self.user = user
+        self.frame = frame
+        self.identify = identify
+        self.faces = 0
+
+    def upload(self) -> SimpleUploadedFile:
+        return SimpleUploadedFile("frame.jpg", self.frame, content_type="image/jpeg")
+
+    async def send(self, operation: str) -> str:
+        """Send one face login or enrollment and return its outcome."""
+        if operation == "enroll":
+            if self.faces >= get_max_faces_per_user():
+                await sync_to_async(trim_faces)(self.user.id)
+                self.faces = 1
+            path = reverse("django_deepface:profile")
+            data = {"image": self.upload()}
+        else:
+            path = reverse("django_deepface:login")
+            data = {
+                "username": "" if self.identify else self.user.username,
+                "use_face_login": "on",
+                "face_image": self.upload(),
+            }
+        try:
+            status, content = await self.transport.post(path, data)
+        except Exception:
+            return "error"
+        outcome = classify(operation, status, content)
+        if operation == "enroll" and outcome == "ok":
+            self.faces += 1
+        return outcome
+
+
+def plan_operations(
+    clients: int, requests: int, enroll_ratio: float, seed: int = 0
+) -> list[list[str]]:
+    """Spread ``requests`` login/enroll operations over the clients."""
+    rng = random.Random(seed)
+    return [
+        [
+            "enroll" if rng.random() < enroll_ratio else "login"
+            for _ in range(requests // clients + (i < requests % clients))
+        ]
+        for i in range(clients)
+    ]
+
+
+async def run_level(
+    clients: list[LoadClient], requests: int, enroll_ratio: float, seed: int = 0
+) -> dict[str, Any]:
+    """Run one concurrency level and summarize it."""
+    samples: dict[str, list[tuple[str, float]]] = defaultdict(list)
+
+    async def drive(client: LoadClient, operations: list[str]) -> None:
+        for operation in operations:
+            start = time.perf_counter()
+            outcome = await client.send(operation)
+            samples[operation].append((outcome, time.perf_counter() - start))
+
+    plan = plan_operations(len(clients), requests, enroll_ratio, seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(c, ops) for c, ops in zip(clients, plan)))
+    wall = time.perf_counter() - start
+
+    operations = {}
+    for operation, results in samples.items():
+        outcomes = {outcome: 0 for outcome in OUTCOMES}
+        for outcome, _ in results:
+            outcomes[outcome] += 1
+        operations[operation] = {
+            "latency": summarize([seconds for _, seconds in results]),
+            "outcomes": outcomes,
+            "error_rate": outcomes["error"] / len(results),
+            "shed_rate": outcomes["shed"] / len(results),
+        }
+    return {
+        "concurrency": len(clients),
+        "requests": requests,
+        "wall_seconds": wall,
+        "throughput_rps": requests / wall if wall else 0.0,
+        "operations": operations,
+    }
+
+
+async def enroll_first_faces(clients: list[LoadClient]) -> None:
+    """
+    Give every client the face it logs in with (untimed).
+
+    One at a time, so setup is never shed by the inference executor.
+    """
+    for client in clients:
+        outcome = await client.send("enroll")
+        if outcome != "ok":
+            raise RuntimeError(
+                f"Could not enroll {client.user.username} ({outcome}); check "
+                "that the embedder finds a face in the frames"
+            )
+
+
+def stage_means(before: dict | None, after: dict | None) -> dict | None:
+    """Mean stage timings between two scrapes of the metrics endpoint."""
+    if before is None or after is None:
+        return None
+    stages: dict[str, dict[str, dict[str, float]]] = defaultdict(dict)
+    for (operation, stage), (total, count) in after.items():
+        previous_total, previous_count = before.get((operation, stage), (0.0, 0.0))
+        if count > previous_count:
+            stages[operation][stage] = {
+                "count": int(count - previous_count),
+                "mean_ms": (total - previous_total) / (count - previous_count) * 1000,
+            }
+    return dict(stages)
+
+
+async def run_levels(
+    clients: list[LoadClient],
+    concurrency: list[int],
+    requests: int,
+    enroll_ratio: float,
+    seed: int,
+) -> list[dict[str, Any]]:
+    """Enroll every client's face, then run each concurrency level in turn."""
+    await enroll_first_faces(clients)
+    transport = clients[0].transport
+    levels = []
+    for level in concurrency:
+        if isinstance(transport, HttpClient):
+            before = await transport.stage_totals()
+            result = await run_level(clients[:level], requests, enroll_ratio, seed)
+            result["stages"] = stage_means(before, await transport.stage_totals())
+        else:
+            with collect_stage_timings() as samples:
+                result = await run_level(clients[:level], requests, enroll_ratio, seed)
+            result["stages"] = {
+                operation: {name: summarize(seconds) for name, seconds in s.items()}
+                for operation, s in samples.items()
+            }
+        levels.append(result)
+    # Views ran their queries on asgiref's sync thread; let its connections go
+    await sync_to_async(connections.close_all)()
+    return levels
+
+
+def run_load_test(
+    concurrency: list[int],
+    requests: int = 200,
+    enroll_ratio: float = 0.0,
+    frames: list[bytes] | None = None,
+    url: str | None = None,
+    identify: bool = False,
+    stub: bool = True,
+    keep: bool = False,
+    timeout: float = 30,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """
+    Drive face login and enrollment with each number of concurrent clients.
+
+    Args:
+        concurrency: Numbers of concurrent clients, e.g. ``[50, 100, 500]``
+        requests: Requests sent at each concurrency level
+        enroll_ratio: Share of requests that are enrollments, not logins
+        frames: Encoded images clients send, one per client in turn
+            (synthetic frames by default)
+        url: Base URL of the app on a running instance, e.g.
+            ``http://localhost:8000``; in-process when None
+        identify: Log in without a username (needs ``DEEPFACE_IDENTIFICATION``)
+        stub: Use ``StubEmbedder`` in-process instead of the configured model
+        keep: Leave the load test users and their face images in place
+        timeout: Socket timeout of requests to ``url``, in seconds
+        seed: Seed for the login/enrollment mix
+
+    Returns:
+        JSON-serializable results
+    """
+    frames = frames or load_frames()
+    users = create_load_users(max(concurrency))
+    in_process = url is None
+    executor = None if in_process else ThreadPoolExecutor(max(concurrency))
+    if in_process and stub:
+        previous_embedder = set_embedder(StubEmbedder(Identity.vector_dimensions))
+    clients = []
+    try:
+        for i, user in enumerate(users):
+            session_key = start_session(user)
+            transport = (
+                InProcessClient(session_key)
+                if in_process
+                else HttpClient(url, session_key, executor, timeout)
+            )
+            clients.append(
+                LoadClient(transport, user, frames[i % len(frames)], identify)
+            )
+        levels = asyncio.run(
+            run_levels(clients, sorted(concurrency), requests, enroll_ratio, seed)
+        )
+        return {
+            "environment": environment(),
+            "target": url or "in-process",
+            "frames": len(frames),
+            "enroll_ratio": enroll_ratio,
+            "identify": identify,
+            "levels": levels,
+        }
+    finally:
+        if not keep:
+            clear_load_users()
+        if executor is not None:
+            for client in clients:
+                client.transport.close()
+            executor.shutdown()
+        if in_process and stub:
+            set_embedder(previous_embedder)
@@ -1,11 +1,131 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
 from pathlib import Path
 
-from deepface import DeepFace
 from django.contrib.auth.models import User
-from django.core.files import File
+from django.core.exceptions import ImproperlyConfigured
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from django_deepface.bulk import (
+    delete_images,
+    insert_identities,
+    media_relative_name,
+    store_images,
+)
+from django_deepface.embedder import get_embedder, is_inference_available
+from django_deepface.face_templates import get_template_mode, rebuild_templates
 from django_deepface.models import Identity
+from django_deepface.utils import decode_image, get_max_faces_per_user
+
+# Valid image extensions
+VALID_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+# TensorFlow does not survive a fork once it has run, so workers start fresh
+WORKER_START_METHOD = "spawn"
+
+# Thread pools sized per worker so that N workers do not oversubscribe the CPU
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS")
+
+
+class UserImages:
+    """Tracks the images of one user directory while they are embedded.
+
+    Holds no database state so that it can be sent to worker processes.
+    """
+
+    def __init__(self, username, slots, image_paths):
+        self.username = username
+        self.slots = slots
+        self.in_flight = 0
+        self.embedded = []
+        self.errors = []
+        self._paths = list(image_paths)
+        self._index = 0
+
+    @property
+    def exhausted(self):
+        return self._index >= len(self._paths)
+
+    @property
+    def free_slots(self):
+        return self.slots - len(self.embedded) - self.in_flight
+
+    def next_path(self):
+        if self.exhausted:
+            return None
+        self._index += 1
+        return self._paths[self._index - 1]
+
+
+def embed_user_images(entries, batch_size):
+    """
+    Embed the images of several users, batching across users.
+
+    Images that fail free their slot again, so users with room left are
+    revisited until their images run out.
+
+    Args:
+        entries: UserImages to fill
+        batch_size: Images per model forward pass
+
+    Returns:
+        The same entries with ``embedded`` and ``errors`` filled in
+    """
+    embedder = get_embedder()
+    pending = list(entries)
+    while pending:
+        batch = []
+        for entry in pending:
+            while entry.free_slots > 0:
+                image_path = entry.next_path()
+                if image_path is None:
+                    break
+                entry.in_flight += 1
+                batch.append((entry, image_path))
+                if len(batch) >= batch_size:
+                    embed_batch(embedder, batch)
+                    batch = []
+        embed_batch(embedder, batch)
+        pending = [
+            entry for entry in pending if not entry.exhausted and entry.free_slots > 0
+        ]
+    return entries
+
+
+def embed_batch(embedder, batch):
+    """Detect faces for a batch of images and embed them in one forward pass."""
+    # Decode and detect each image; a bad image only drops itself
+    faces, detected = [], []
+    for entry, image_path in batch:
+        try:
+            # Camera photos are downscaled and made upright before detection
+            faces.append(embedder.extract_face(decode_image(image_path)))
+            detected.append((entry, image_path))
+        except Exception as e:
+            entry.errors.append((image_path, str(e)))
+
+    try:
+        embeddings = embedder.embed_faces(faces)
+    except Exception as e:
+        for entry, image_path in detected:
+            entry.errors.append((image_path, str(e)))
+        embeddings, detected = [], []
+
+    for (entry, image_path), embedding in zip(detected, embeddings):
+        entry.embedded.append((image_path, embedding))
+    for entry, _ in batch:
+        entry.in_flight = 0
+
+
+def init_worker():
+    """Set up Django and load the model once in each worker process."""
+    import django
+
+    django.setup()
+    get_embedder().load()
 
 
 class Command(BaseCommand):
@@ -23,12 +143,70 @@ class Command(BaseCommand):
             action="store_true",
             help="Clear all existing Identity records before processing new images",
         )
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            default=16,
+            help="Number of images detected and embedded per model forward pass",
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes, each loading its own copy of the model",
+        )
+        parser.add_argument(
+            "--in-place",
+            action="store_true",
+            help=(
+                "Reference the images where they are instead of copying them into "
+                "MEDIA_ROOT (the directory must be inside MEDIA_ROOT)"
+            ),
+        )
+        parser.add_argument(
+            "--copy-threads",
+            type=int,
+            default=8,
+            help="Number of image files copied into storage at once",
+        )
+        parser.add_argument(
+            "--write-batch",
+            type=int,
+            default=1000,
+            help="Number of rows buffered and inserted together in one transaction",
+        )
 
     def handle(self, *args, **options):
         root_dir = Path(options["directory"])
         if not root_dir.exists():
             raise CommandError(f"Directory {root_dir} does not exist")
 
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+        workers = options["workers"]
+        if workers < 1:
+            raise CommandError("--workers must be at least 1")
+        if options["copy_threads"] < 1 or options["write_batch"] < 1:
+            raise CommandError("--copy-threads and --write-batch must be at least 1")
+        if not is_inference_available():
+            raise CommandError(
+                "DEEPFACE_LOCAL_INFERENCE is off and no DEEPFACE_DAEMON_SOCKET is set; "
+                "run this where faces can be embedded"
+            )
+        self.in_place = options["in_place"]
+        if self.in_place:
+            try:
+                media_relative_name(root_dir)
+            except (ImproperlyConfigured, ValueError) as e:
+                raise CommandError(f"--in-place: {e}") from None
+        self.copy_threads = options["copy_threads"]
+        self.write_batch = options["write_batch"]
+        self.buffer = []
+        self.write_method = None
+
         # Clear existing records if requested
         if options["clear"]:
             count = Identity.objects.count()
@@ -37,11 +215,50 @@ class Command(BaseCommand):
                 self.style.SUCCESS(f"Cleared {count} existing Identity records")
             )
 
-        # Valid image extensions
-        valid_extensions = {".jpg", ".jpeg", ".png", ".webp"}
+        self.max_faces = get_max_faces_per_user()
+        self.users = {}
+        self.processed = 0
+        self.added = 0
+        start = time.perf_counter()
+
+        chunks = list(self.collect_chunks(root_dir, batch_size))
+        try:
+            if workers == 1:
+                # Load the model once up front rather than inside the first image
+                warmup_seconds = get_embedder().load()
+                self.stdout.write(f"Model ready in {warmup_seconds:.2f}s")
+                for chunk in chunks:
+                    self.write_chunk(embed_user_images(chunk, batch_size))
+                failed = []
+            else:
+                failed = self.run_workers(chunks, batch_size, workers)
+            self.flush()
+        except BaseException:
+            # Buffered rows were never written; remove the files copied for
+            # them, or a rerun would copy them again under new names
+            if not self.in_place:
+                delete_images(identity for identity, _ in self.buffer)
+            raise
+        if failed:
+            raise CommandError(
+                f"{len(failed)} user directories were not imported after a "
+                f"worker failure: {', '.join(sorted(failed))}"
+            )
+
+        elapsed = time.perf_counter() - start
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(
+            f"Added {self.added} of {self.processed} images in {elapsed:.1f}s "
+            f"({rate:.2f} images/sec)"
+        )
+        if self.write_method:
+            self.stdout.write(f"Rows written with {self.write_method}")
+        self.stdout.write(self.style.SUCCESS("Successfully processed all directories"))
 
-        # Process each subdirectory (username)
-        for user_dir in root_dir.iterdir():
+    def collect_chunks(self, root_dir, batch_size):
+        """Yield lists of users holding roughly one batch of images each."""
+        chunk, chunk_images = [], 0
+        for user_dir in sorted(root_dir.iterdir()):
             if not user_dir.is_dir():
                 continue
 
@@ -57,62 +274,141 @@ class Command(BaseCommand):
 
             # Get existing image count for this user
             existing_count = Identity.objects.filter(user=user).count()
-            if existing_count >= 4:
+            if existing_count >= self.max_faces:
                 self.stdout.write(
                     self.style.WARNING(
-                        f"User {username} already has maximum number of images (4). Skipping."
+                        f"User {username} already has maximum number of images ({self.max_faces}). Skipping."
                     )
                 )
                 continue
 
-            # Process images in the directory
-            image_number = existing_count + 1
-            for image_path in user_dir.iterdir():
-                if (
-                    not image_path.is_file()
-                    or image_path.suffix.lower() not in valid_extensions
-                ):
-                    continue
-
-                if image_number > 4:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f"Maximum images reached for {username}. Skipping remaining images."
-                        )
-                    )
-                    break
+            image_paths = [
+                path
+                for path in sorted(user_dir.iterdir())
+                if path.is_file() and path.suffix.lower() in VALID_EXTENSIONS
+            ]
+            slots = self.max_faces - existing_count
+            self.users[username] = (user, existing_count + 1)
+            chunk.append(UserImages(username, slots, image_paths))
+            chunk_images += min(slots, len(image_paths))
+            if chunk_images >= batch_size:
+                yield chunk
+                chunk, chunk_images = [], 0
+        if chunk:
+            yield chunk
 
-                try:
-                    # Generate face embedding
-                    embedding = DeepFace.represent(
-                        str(image_path),
-                        model_name="VGG-Face",
-                        enforce_detection=True,
-                        detector_backend="retinaface",
-                        align=True,
-                        normalization="base",
-                    )[0]["embedding"]
-
-                    # Create Identity record
-                    with open(image_path, "rb") as f:
-                        identity = Identity(
-                            user=user, image_number=image_number, embedding=embedding
-                        )
-                        identity.image.save(image_path.name, File(f), save=False)
-                        identity.save()
-
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"Added image {image_number} for {username}: {image_path.name}"
-                        )
-                    )
-                    image_number += 1
+    def run_workers(self, chunks, batch_size, workers):
+        """
+        Embed chunks in a process pool and write results as they arrive.
+
+        At most two chunks per worker are queued at a time. Finished chunks
+        are written as they arrive, so a crashed worker only loses the
+        chunks that had not come back yet.
+
+        Returns:
+            Usernames whose images could not be imported
+        """
+        failed = []
+        remaining = iter(chunks)
+        in_flight = {}
+
+        # Workers inherit the environment when they are spawned
+        saved_env = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+        threads = str(max(1, (os.cpu_count() or 1) // workers))
+        for name in THREAD_ENV_VARS:
+            os.environ.setdefault(name, threads)
+
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context(WORKER_START_METHOD),
+            initializer=init_worker,
+        )
 
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"Error processing {image_path.name} for {username}: {e!s}"
-                        )
+        def submit_next():
+            chunk = next(remaining, None)
+            if chunk is not None:
+                future = pool.submit(embed_user_images, chunk, batch_size)
+                in_flight[future] = chunk
+
+        try:
+            for _ in range(2 * workers):
+                submit_next()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    try:
+                        entries = future.result()
+                    except Exception as e:
+                        self.stdout.write(self.style.ERROR(f"Worker failed: {e!s}"))
+                        failed.extend(entry.username for entry in chunk)
+                    else:
+                        # Database errors are not worker failures; let them stop
+                        # the import rather than mark the buffered users failed
+                        self.write_chunk(entries)
+                    try:
+                        submit_next()
+                    except Exception:
+                        # The pool is broken; nothing more can be submitted
+                        for lost in remaining:
+                            failed.extend(entry.username for entry in lost)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        return failed
+
+    def write_chunk(self, entries):
+        """Store the embedded images and buffer their Identity rows."""
+        identities = []
+        for entry in entries:
+            user, next_number = self.users[entry.username]
+            for image_path, error in entry.errors:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Error processing {image_path.name} for {entry.username}: {error}"
+                    )
+                )
+            for image_path, embedding in entry.embedded:
+                identity = Identity(
+                    user=user, image_number=next_number, embedding=embedding
+                )
+                next_number += 1
+                identities.append((identity, image_path))
+            if not entry.exhausted:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"Maximum images reached for {entry.username}. Skipping remaining images."
                     )
+                )
+            self.users[entry.username] = (user, next_number)
+            self.processed += len(entry.embedded) + len(entry.errors)
 
-        self.stdout.write(self.style.SUCCESS("Successfully processed all directories"))
+        store_images(identities, in_place=self.in_place, threads=self.copy_threads)
+        self.buffer.extend(identities)
+        if len(self.buffer) >= self.write_batch:
+            self.flush()
+
+    def flush(self):
+        """Insert the buffered rows in one transaction."""
+        if not self.buffer:
+            return
+        with transaction.atomic():
+            self.write_method = insert_identities(
+                [identity for identity, _ in self.buffer]
+            )
+            # Bulk inserts send no post_save, so refresh templates here
+            if get_template_mode() is not None:
+                rebuild_templates(identity.user_id for identity, _ in self.buffer)
+        self.added += len(self.buffer)
+
+        for identity, image_path in self.buffer:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Added image {identity.image_number} for {identity.user.username}: {image_path.name}"
+                )
+            )
+        self.buffer = []
@@ -0,0 +1,190 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from django_deepface.benchmark import (
+    BENCH_USER_PREFIX,
+    compare_embedders,
+    environment,
+    run_benchmark,
+)
+from django_deepface.checks import pgvector_version
+from django_deepface.embedder import EMBEDDERS
+from django_deepface.vector_store import get_vector_store_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Break down face login and bulk import latency by stage against "
+        f"synthetic galleries (users named {BENCH_USER_PREFIX}*, removed afterwards)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            default="1000",
+            help="Comma-separated gallery sizes, e.g. 1000,100000,1000000",
+        )
+        parser.add_argument(
+            "--logins",
+            type=int,
+            default=50,
+            help="Number of timed face logins per gallery size",
+        )
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=32,
+            help="Number of synthetic images to import (0 skips the import)",
+        )
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            default=16,
+            help="Number of images embedded per forward pass during the import",
+        )
+        parser.add_argument(
+            "--recall",
+            help=(
+                "Comma-separated rerank candidate counts, e.g. 50,100,400: "
+                "measure the binary prefilter's recall against exact search"
+            ),
+        )
+        parser.add_argument(
+            "-k",
+            type=int,
+            default=10,
+            help="Number of users searched for when measuring recall",
+        )
+        parser.add_argument(
+            "--backends",
+            help=(
+                "Comma-separated DEEPFACE_EMBEDDER backends, e.g. deepface,onnx: "
+                "compare their embedding latency and throughput instead"
+            ),
+        )
+        parser.add_argument(
+            "--real-model",
+            action="store_true",
+            help="Use the configured DeepFace model instead of the CPU stub",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Leave the largest synthetic gallery in the database",
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Write the full results as JSON to this file",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            rows = [int(size) for size in options["rows"].split(",")]
+        except ValueError:
+            raise CommandError("--rows must be comma-separated integers") from None
+        if any(size < 1 for size in rows) or options["logins"] < 1:
+            raise CommandError("--rows and --logins must be at least 1")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        try:
+            recall = [
+                int(count) for count in (options["recall"] or "").split(",") if count
+            ]
+        except ValueError:
+            raise CommandError("--recall must be comma-separated integers") from None
+        if any(count < 1 for count in recall) or options["k"] < 1:
+            raise CommandError("--recall and -k must be at least 1")
+        if recall and get_vector_store_name() == "pgvector":
+            version = pgvector_version(connection)
+            if version is None or version < (0, 7):
+                raise CommandError(
+                    "The binary prefilter requires pgvector 0.7 or later "
+                    f"(installed: {version})"
+                )
+
+        if options["backends"]:
+            backends = options["backends"].split(",")
+            unknown = set(backends) - set(EMBEDDERS)
+            if unknown:
+                raise CommandError(
+                    f"Unknown backends {', '.join(sorted(unknown))}; "
+                    f"choose from {', '.join(EMBEDDERS)}"
+                )
+            comparison = compare_embedders(backends, batch_size=options["batch_size"])
+            for backend, result in comparison.items():
+                self.stdout.write(
+                    f"{backend:<10} loaded in {result['load_seconds']:6.2f}s  "
+                    f"single p50 {result['single']['p50_ms']:8.2f} ms  "
+                    f"{result['faces_per_second']:8.1f} faces/s in batches of "
+                    f"{result['batch_size']}"
+                    + (
+                        f"  max difference {result['max_difference']:.2e}"
+                        if "max_difference" in result
+                        else ""
+                    )
+                )
+            self.write_results(
+                {"environment": environment(), "backends": comparison},
+                options["output"],
+            )
+            return
+
+        results = run_benchmark(
+            rows,
+            logins=options["logins"],
+            images=options["images"],
+            batch_size=options["batch_size"],
+            stub=not options["real_model"],
+            keep=options["keep"],
+            recall=recall,
+            recall_k=options["k"],
+        )
+
+        for population in results["populations"]:
+            self.stdout.write(
+                f"Login against {population['rows']} rows "
+                f"(populated in {population['populate_seconds']:.1f}s):"
+            )
+            for stage, summary in population["login"].items():
+                self.stdout.write(
+                    f"  {stage:<15} p50 {summary['p50_ms']:8.2f} ms  "
+                    f"p95 {summary['p95_ms']:8.2f} ms"
+                )
+            if "recall" in population:
+                report = population["recall"]
+                self.stdout.write(
+                    f"  Binary prefilter recall@{report['k']} over "
+                    f"{report['queries']} queries (exact search p50 "
+                    f"{report['exact']['p50_ms']:.2f} ms):"
+                )
+                for count, result in report["candidates"].items():
+                    self.stdout.write(
+                        f"    {count:>6} candidates: recall {result['recall']:.3f}  "
+                        f"p50 {result['latency']['p50_ms']:8.2f} ms"
+                    )
+        if "import" in results:
+            report = results["import"]
+            self.stdout.write(
+                f"Import of {report['images']} images "
+                f"({report['images_per_second']:.1f} images/s):"
+            )
+            for stage, timing in report["stages"].items():
+                self.stdout.write(
+                    f"  {stage:<19} {timing['per_image_ms']:8.2f} ms/image"
+                )
+
+        self.write_results(results, options["output"])
+
+    def write_results(self, results, output):
+        if output:
+            with open(output, "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(
+                self.style.SUCCESS(f"Benchmark results written to {output}")
+            )
+        else:
+            self.stdout.write(json.dumps(results, indent=2))
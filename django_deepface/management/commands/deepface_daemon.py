@@ -0,0 +1,78 @@
+import os
+import signal
+from multiprocessing.connection import Client
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_deepface.daemon import InferenceServer, get_authkey, get_daemon_settings
+from django_deepface.embedder import embedder_class
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the shared inference daemon: one model copy per node, serving "
+        "web workers over a Unix socket with micro-batching"
+    )
+
+    def add_arguments(self, parser):
+        options = get_daemon_settings()
+        parser.add_argument(
+            "--socket",
+            default=options["socket"],
+            help="Unix socket path (default: DEEPFACE_DAEMON_SOCKET)",
+        )
+        parser.add_argument(
+            "--max-batch-size",
+            type=int,
+            default=options["max_batch_size"],
+            help="Most faces embedded per forward pass (default: DEEPFACE_DAEMON_MAX_BATCH)",
+        )
+        parser.add_argument(
+            "--max-wait-ms",
+            type=float,
+            default=options["max_wait_ms"],
+            help="How long to wait for a batch to fill (default: DEEPFACE_DAEMON_MAX_WAIT_MS)",
+        )
+
+    def handle(self, *args, **options):
+        address = options["socket"]
+        if not address:
+            raise CommandError("Set DEEPFACE_DAEMON_SOCKET or pass --socket")
+        if options["max_batch_size"] < 1:
+            raise CommandError("--max-batch-size must be at least 1")
+
+        if os.path.exists(address):
+            try:
+                Client(address, family="AF_UNIX", authkey=get_authkey()).close()
+            except OSError:
+                # Left behind by a daemon that did not shut down cleanly
+                os.unlink(address)
+            else:
+                raise CommandError(f"A daemon is already listening on {address}")
+
+        # Always a local model: get_embedder() would return a client for ourselves
+        embedder = embedder_class().from_settings()
+        warmup_seconds = embedder.load()
+        self.stdout.write(f"Model ready in {warmup_seconds:.2f}s")
+
+        server = InferenceServer(
+            embedder,
+            address,
+            max_batch_size=options["max_batch_size"],
+            max_wait_ms=options["max_wait_ms"],
+        )
+        server.listen()
+        signal.signal(signal.SIGTERM, lambda signum, frame: server.shutdown())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Listening on {address} (batches of up to "
+                f"{options['max_batch_size']}, {options['max_wait_ms']:g} ms wait)"
+            )
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+        self.stdout.write("Daemon stopped")
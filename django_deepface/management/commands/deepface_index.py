@@ -0,0 +1,133 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from django_deepface.checks import pgvector_version
+from django_deepface.fields import get_embedding_storage
+from django_deepface.models import Identity
+from django_deepface.search import (
+    BINARY_INDEX_NAME,
+    INDEX_NAME,
+    binary_index_sql,
+    get_distance_metric,
+    get_index_settings,
+    index_sql,
+    max_index_dimensions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build, rebuild or drop the ANN index on Identity.embedding without "
+        "blocking enrollment (uses CREATE INDEX CONCURRENTLY)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Build a fresh index next to the current one, then swap them",
+        )
+        parser.add_argument(
+            "--drop", action="store_true", help="Drop the ANN index concurrently"
+        )
+        parser.add_argument(
+            "--status", action="store_true", help="Show the current index definition"
+        )
+        parser.add_argument(
+            "--binary",
+            action="store_true",
+            help=(
+                "Act on the index of binary-quantized embeddings used by "
+                "DEEPFACE_BINARY_PREFILTER instead (pgvector 0.7+)"
+            ),
+        )
+        parser.add_argument(
+            "--maintenance-work-mem",
+            help="maintenance_work_mem for the build, e.g. 2GB (faster HNSW builds)",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("ANN indexes require PostgreSQL with pgvector")
+        self.table = Identity._meta.db_table
+        self.index_name = BINARY_INDEX_NAME if options["binary"] else INDEX_NAME
+
+        if options["status"]:
+            self.show_status()
+            return
+
+        if options["drop"]:
+            self.run_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{self.index_name}"')
+            self.stdout.write(self.style.SUCCESS(f"Dropped index {self.index_name}"))
+            return
+
+        if options["binary"]:
+            version = pgvector_version(connection)
+            if version is None or version < (0, 7):
+                raise CommandError(
+                    "Binary quantization requires pgvector 0.7 or later "
+                    f"(installed: {version})"
+                )
+            build_sql = binary_index_sql
+            description = "hnsw index of binary-quantized embeddings"
+        else:
+            build_sql = index_sql
+            index = get_index_settings()
+            description = f"{index['type']} index for {get_distance_metric()} distance"
+
+        dimensions = Identity._meta.get_field("embedding").dimensions
+        if not options["binary"] and dimensions > max_index_dimensions():
+            raise CommandError(
+                f"pgvector can only index up to {max_index_dimensions()} dimensions "
+                f"for {get_embedding_storage()} and embeddings have {dimensions}. "
+                "Use a smaller model."
+            )
+
+        if options["maintenance_work_mem"]:
+            self.run_sql(
+                "SELECT set_config('maintenance_work_mem', %s, false)",
+                [options["maintenance_work_mem"]],
+            )
+
+        self.stdout.write(f"Building {description}...")
+        if options["rebuild"]:
+            # Build under a temporary name so searches keep using the old index
+            new_name = f"{self.index_name}_new"
+            # A failed concurrent build leaves an invalid index behind
+            self.run_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{new_name}"')
+            self.run_sql(build_sql(self.table, name=new_name))
+            self.run_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{self.index_name}"')
+            self.run_sql(f'ALTER INDEX "{new_name}" RENAME TO "{self.index_name}"')
+        else:
+            self.run_sql(build_sql(self.table, name=self.index_name))
+        self.stdout.write(self.style.SUCCESS(f"Index {self.index_name} is ready"))
+        self.show_status()
+
+    def run_sql(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def show_status(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT pg_get_indexdef(i.indexrelid), i.indisvalid,
+                       pg_size_pretty(pg_relation_size(i.indexrelid))
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = %s
+                """,
+                [self.index_name],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            self.stdout.write(
+                self.style.WARNING(f"Index {self.index_name} does not exist")
+            )
+            return
+        definition, valid, size = row
+        self.stdout.write(f"{definition} ({size})")
+        if not valid:
+            self.stdout.write(
+                self.style.ERROR("Index is INVALID; run with --rebuild to replace it")
+            )
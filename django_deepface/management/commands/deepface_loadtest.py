@@ -0,0 +1,150 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_deepface.enrollment import is_async_enrollment_enabled
+from django_deepface.loadtest import LOAD_USER_PREFIX, load_frames, run_load_test
+from django_deepface.utils import is_identification_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        "Send face logins and enrollments from many concurrent clients and "
+        "report throughput, latency percentiles, error rates and stage timings "
+        f"(users named {LOAD_USER_PREFIX}*, removed afterwards)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-c",
+            "--concurrency",
+            default="10",
+            help="Comma-separated numbers of concurrent clients, e.g. 50,100,500",
+        )
+        parser.add_argument(
+            "-n",
+            "--requests",
+            type=int,
+            default=200,
+            help="Number of requests sent at each concurrency level",
+        )
+        parser.add_argument(
+            "--enroll-ratio",
+            type=float,
+            default=0.0,
+            help="Share of requests that enroll a face instead of logging in (0-1)",
+        )
+        parser.add_argument(
+            "--frames",
+            help="Directory of face images to send instead of synthetic frames",
+        )
+        parser.add_argument(
+            "--url",
+            help=(
+                "Base URL of a running instance sharing this database, e.g. "
+                "http://localhost:8000; in-process through the ASGI handler "
+                "when omitted"
+            ),
+        )
+        parser.add_argument(
+            "--identify",
+            action="store_true",
+            help="Log in without a username (needs DEEPFACE_IDENTIFICATION)",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=30,
+            help="Socket timeout of requests to --url, in seconds",
+        )
+        parser.add_argument(
+            "--real-model",
+            action="store_true",
+            help="Use the configured DeepFace model in-process instead of the CPU stub",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Leave the load test users and their face images in place",
+        )
+        parser.add_argument(
+            "-o",
+            "--output",
+            help="Write the full results as JSON to this file",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            concurrency = [int(count) for count in options["concurrency"].split(",")]
+        except ValueError:
+            raise CommandError(
+                "--concurrency must be comma-separated integers"
+            ) from None
+        if any(count < 1 for count in concurrency) or options["requests"] < 1:
+            raise CommandError("--concurrency and --requests must be at least 1")
+        if not 0 <= options["enroll_ratio"] <= 1:
+            raise CommandError("--enroll-ratio must be between 0 and 1")
+        if options["identify"] and not is_identification_enabled():
+            raise CommandError("--identify needs DEEPFACE_IDENTIFICATION = True")
+        if options["url"] is None and is_async_enrollment_enabled():
+            raise CommandError(
+                "Enrollments are queued for deepface_worker in this process, so "
+                "in-process logins would find no faces; use --url"
+            )
+        try:
+            frames = load_frames(options["frames"]) if options["frames"] else None
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e)) from None
+
+        try:
+            results = run_load_test(
+                concurrency,
+                requests=options["requests"],
+                enroll_ratio=options["enroll_ratio"],
+                frames=frames,
+                url=options["url"],
+                identify=options["identify"],
+                stub=not options["real_model"],
+                keep=options["keep"],
+                timeout=options["timeout"],
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e)) from None
+
+        for level in results["levels"]:
+            self.stdout.write(
+                f"{level['concurrency']} clients: {level['requests']} requests in "
+                f"{level['wall_seconds']:.2f}s ({level['throughput_rps']:.1f} req/s)"
+            )
+            for operation, report in level["operations"].items():
+                latency = report["latency"]
+                outcomes = ", ".join(
+                    f"{count} {outcome}"
+                    for outcome, count in report["outcomes"].items()
+                    if count
+                )
+                self.stdout.write(
+                    f"  {operation:<7} p50 {latency['p50_ms']:8.2f} ms  "
+                    f"p95 {latency['p95_ms']:8.2f} ms  "
+                    f"p99 {latency['p99_ms']:8.2f} ms  "
+                    f"errors {report['error_rate']:6.1%}  "
+                    f"shed {report['shed_rate']:6.1%}  ({outcomes})"
+                )
+            for operation, stages in (level["stages"] or {}).items():
+                self.stdout.write(
+                    f"  {operation} stages: "
+                    + "  ".join(
+                        f"{stage} {summary['mean_ms']:.2f} ms"
+                        for stage, summary in stages.items()
+                    )
+                )
+
+        output = options["output"]
+        if output:
+            with open(output, "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(
+                self.style.SUCCESS(f"Load test results written to {output}")
+            )
+        else:
+            self.stdout.write(json.dumps(results, indent=2))
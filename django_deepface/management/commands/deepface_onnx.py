@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django_deepface.onnx_embedder import convert_to_onnx, get_onnx_settings
+from django_deepface.utils import get_deepface_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the configured Keras recognition model to ONNX, for "
+        "DEEPFACE_EMBEDDER = 'onnx' (needs tf2onnx)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-o",
+            "--output",
+            default=get_onnx_settings()["model"],
+            help="Path of the .onnx file (default: DEEPFACE_ONNX_MODEL)",
+        )
+        parser.add_argument("--model", help="DeepFace model (default: DEEPFACE_MODEL)")
+        parser.add_argument("--opset", type=int, default=17, help="ONNX opset version")
+
+    def handle(self, *args, **options):
+        if not options["output"]:
+            raise CommandError("Set DEEPFACE_ONNX_MODEL or pass --output")
+        model_name = options["model"] or get_deepface_settings()["model_name"]
+
+        self.stdout.write(f"Converting {model_name}...")
+        try:
+            result = convert_to_onnx(
+                model_name, options["output"], opset=options["opset"]
+            )
+        except ImportError as e:
+            raise CommandError(
+                f"{e}; install the ONNX extra: pip install django-deepface[onnx]"
+            ) from e
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {result['path']}: {result['dimensions']} dimensions, "
+                f"{result['postprocess']} post-processing, largest difference from "
+                f"DeepFace {result['max_difference']:.2e}"
+            )
+        )
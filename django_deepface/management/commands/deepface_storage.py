@@ -0,0 +1,185 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from django_deepface.checks import column_type, embedding_fields, pgvector_version
+from django_deepface.fields import get_embedding_storage
+from django_deepface.models import Identity
+from django_deepface.search import BINARY_INDEX_NAME, INDEX_NAME
+
+BENCH_TABLE = "deepface_storage_bench"
+
+
+class Command(BaseCommand):
+    help = (
+        "Show or convert how embeddings are stored (vector or halfvec, and "
+        "dimensions for DEEPFACE_MODEL), "
+        "or benchmark the recall and latency impact of halfvec"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help=(
+                "Rewrite embedding columns to DEEPFACE_EMBEDDING_STORAGE and, "
+                "while they are empty, the dimensions of DEEPFACE_MODEL"
+            ),
+        )
+        parser.add_argument(
+            "--bench",
+            action="store_true",
+            help="Compare exact search over vector and halfvec on synthetic data",
+        )
+        parser.add_argument(
+            "--rows", type=int, default=5000, help="Benchmark gallery size"
+        )
+        parser.add_argument(
+            "--queries", type=int, default=50, help="Benchmark query count"
+        )
+        parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+        parser.add_argument(
+            "--dimensions",
+            type=int,
+            help="Benchmark vector size (default: the embedding column's)",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Embedding storage types require PostgreSQL")
+
+        needs_halfvec = options["bench"] or (
+            options["convert"] and get_embedding_storage() == "halfvec"
+        )
+        version = pgvector_version(connection)
+        if needs_halfvec and (version is None or version < (0, 7)):
+            raise CommandError(
+                f"halfvec requires pgvector 0.7 or later (installed: {version})"
+            )
+
+        if options["bench"]:
+            self.bench(options)
+        elif options["convert"]:
+            self.convert()
+        else:
+            self.show_status()
+
+    def show_status(self):
+        self.stdout.write(f"Configured storage: {get_embedding_storage()}")
+        for model, field in embedding_fields():
+            table = model._meta.db_table
+            actual = column_type(connection, table, field.column)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_size_pretty(pg_total_relation_size(to_regclass(%s)))",
+                    [table],
+                )
+                size = cursor.fetchone()[0]
+            self.stdout.write(f"{table}.{field.column}: {actual} (table size {size})")
+
+    def convert(self):
+        for model, field in embedding_fields():
+            table = model._meta.db_table
+            actual = column_type(connection, table, field.column)
+            expected = field.db_type(connection)
+            if actual is None or actual == expected:
+                self.stdout.write(f"{table}.{field.column} is already {expected}")
+                continue
+
+            self.stdout.write(
+                f"Converting {table}.{field.column}: {actual} -> {expected}"
+            )
+            with connection.cursor() as cursor:
+                if model is Identity:
+                    # The indexes are tied to the old type and dimensions
+                    for name in (INDEX_NAME, BINARY_INDEX_NAME):
+                        cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+                # Rewrites the table in place; existing rows are cast over,
+                # which fails if they have other dimensions
+                cursor.execute(
+                    f'ALTER TABLE "{table}" ALTER COLUMN "{field.column}" '
+                    f'TYPE {expected} USING "{field.column}"::{expected}'
+                )
+            self.stdout.write(self.style.SUCCESS(f"Converted {table}.{field.column}"))
+        self.stdout.write(
+            "Run manage.py deepface_index to rebuild the ANN index if you use one."
+        )
+
+    def bench(self, options):
+        dimensions = (
+            options["dimensions"] or Identity._meta.get_field("embedding").dimensions
+        )
+        rows, queries, k = options["rows"], options["queries"], options["k"]
+        rng = np.random.default_rng(0)
+
+        # Synthetic gallery: unit vectors, queried with noisy copies of rows
+        gallery = rng.standard_normal((rows, dimensions), dtype=np.float32)
+        gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+        picks = rng.choice(rows, size=queries, replace=False)
+        probes = gallery[picks] + 0.05 * rng.standard_normal(
+            (queries, dimensions), dtype=np.float32
+        )
+
+        self.stdout.write(
+            f"Loading {rows} x {dimensions}-d vectors into a temporary table..."
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {BENCH_TABLE} "
+                f"(id integer PRIMARY KEY, v vector({dimensions}), "
+                f"h halfvec({dimensions}))"
+            )
+            try:
+                with cursor.cursor.copy(
+                    f"COPY {BENCH_TABLE} (id, v) FROM STDIN"
+                ) as copy:
+                    for i, vector in enumerate(gallery):
+                        copy.write_row([i, vector_text(vector)])
+                cursor.execute(f"UPDATE {BENCH_TABLE} SET h = v::halfvec({dimensions})")
+                cursor.execute(
+                    f"SELECT avg(pg_column_size(v)), avg(pg_column_size(h)) "
+                    f"FROM {BENCH_TABLE}"
+                )
+                vector_bytes, halfvec_bytes = cursor.fetchone()
+
+                results = {"vector": [], "halfvec": []}
+                latency = {"vector": [], "halfvec": []}
+                for probe in probes:
+                    text = vector_text(probe)
+                    for storage, column in (("vector", "v"), ("halfvec", "h")):
+                        start = time.perf_counter()
+                        cursor.execute(
+                            f"SELECT id FROM {BENCH_TABLE} "
+                            f"ORDER BY {column} <=> %s::{storage}({dimensions}) "
+                            f"LIMIT %s",
+                            [text, k],
+                        )
+                        ids = [row[0] for row in cursor.fetchall()]
+                        latency[storage].append(time.perf_counter() - start)
+                        results[storage].append(set(ids))
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+
+        recall = np.mean(
+            [
+                len(half & full) / k
+                for full, half in zip(results["vector"], results["halfvec"])
+            ]
+        )
+        self.stdout.write(
+            f"Bytes per embedding: vector {vector_bytes:.0f}, "
+            f"halfvec {halfvec_bytes:.0f}"
+        )
+        for storage in ("vector", "halfvec"):
+            times = np.array(latency[storage]) * 1000
+            self.stdout.write(
+                f"{storage:8s} exact top-{k}: mean {times.mean():.2f} ms, "
+                f"p95 {np.percentile(times, 95):.2f} ms"
+            )
+        self.stdout.write(f"halfvec recall@{k} against vector: {recall:.4f}")
+
+
+def vector_text(vector) -> str:
+    return "[" + ",".join(f"{x:.7g}" for x in vector) + "]"
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from django_deepface.face_templates import get_template_mode, rebuild_templates
+from django_deepface.models import FaceTemplate, Identity
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild every user's face template from their Identity rows "
+        "(run after enabling DEEPFACE_TEMPLATES)"
+    )
+
+    def handle(self, *args, **options):
+        if get_template_mode() is None:
+            self.stdout.write(
+                self.style.WARNING(
+                    "DEEPFACE_TEMPLATES is not set; templates will not be used "
+                    "or kept up to date until it is"
+                )
+            )
+
+        user_ids = Identity.objects.values_list("user_id", flat=True).distinct()
+        count = rebuild_templates(user_ids)
+        # Templates of users whose images were all removed outside the ORM
+        stale = FaceTemplate.objects.exclude(user_id__in=user_ids).delete()[0]
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {count} face templates, removed {stale}")
+        )
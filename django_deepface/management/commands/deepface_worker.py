@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_deepface.embedder import get_embedder, is_inference_available
+from django_deepface.enrollment import claim_jobs, process_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Embed queued face uploads (DEEPFACE_ASYNC_ENROLLMENT) in batches, "
+        "retrying failures; several workers can run at once"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            default=16,
+            help="Number of jobs claimed and embedded per model forward pass",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before polling again when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when no jobs are due instead of polling forever",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if not is_inference_available():
+            raise CommandError(
+                "DEEPFACE_LOCAL_INFERENCE is off and no DEEPFACE_DAEMON_SOCKET is set; "
+                "run this where faces can be embedded"
+            )
+
+        warmup_seconds = get_embedder().load()
+        self.stdout.write(f"Model ready in {warmup_seconds:.2f}s")
+
+        completed = failed = 0
+        try:
+            while True:
+                jobs = claim_jobs(batch_size)
+                if not jobs:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+                done, errors = process_jobs(jobs)
+                completed += done
+                failed += errors
+                self.stdout.write(f"Embedded {done} of {len(jobs)} images")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping worker")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Enrollment worker finished: {completed} embedded, {failed} failed"
+            )
+        )
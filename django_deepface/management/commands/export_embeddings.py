@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django_deepface.fields import get_embedding_storage
+from django_deepface.gallery import DTYPES, export_gallery
+
+
+class Command(BaseCommand):
+    help = (
+        "Export every face embedding, its Identity metadata and the model "
+        "configuration to a directory, for import_embeddings"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory to write the export to")
+        parser.add_argument(
+            "--dtype",
+            choices=DTYPES,
+            help="Matrix precision (default: float16 with halfvec storage, else float32)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10_000,
+            help="Number of rows fetched and written at a time",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        dtype = options["dtype"] or (
+            "float16" if get_embedding_storage() == "halfvec" else "float32"
+        )
+        try:
+            rows = export_gallery(
+                options["directory"], dtype=dtype, chunk_size=options["chunk_size"]
+            )
+        except FileExistsError as e:
+            raise CommandError(str(e)) from None
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {rows} embeddings ({dtype}) to {options['directory']}"
+            )
+        )
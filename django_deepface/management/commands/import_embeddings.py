@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django_deepface.gallery import GalleryMismatchError, import_gallery
+
+
+class Command(BaseCommand):
+    help = (
+        "Import embeddings written by export_embeddings without recomputing them; "
+        "exports made with a different model configuration are refused"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory written by export_embeddings")
+        parser.add_argument(
+            "--create-users",
+            action="store_true",
+            help="Create missing users (with unusable passwords) instead of skipping them",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10_000,
+            help="Number of rows read and inserted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        try:
+            counts = import_gallery(
+                options["directory"],
+                create_users=options["create_users"],
+                chunk_size=options["chunk_size"],
+            )
+        except FileNotFoundError as e:
+            raise CommandError(f"Not an export directory: {e}") from None
+        except GalleryMismatchError as e:
+            raise CommandError(str(e)) from None
+
+        if counts["skipped"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Skipped {counts['skipped']} images whose number is already taken"
+                )
+            )
+        if counts["missing_users"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Skipped {counts['missing_users']} images of users that do not "
+                    "exist here (use --create-users to create them)"
+                )
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {counts['imported']} embeddings")
+        )
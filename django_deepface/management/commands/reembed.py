@@ -0,0 +1,188 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_deepface.reembed import (
+    build_embedder,
+    configuration_version,
+    discard,
+    embed_rows,
+    embed_rows_in_worker,
+    init_worker,
+    pending_chunks,
+    progress,
+    promote,
+    stage_embeddings,
+    target_configuration,
+)
+from django_deepface.utils import get_embedding_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute embeddings for another model configuration next to the live "
+        "ones, then promote them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", help="Target DEEPFACE_MODEL (default: settings)")
+        parser.add_argument(
+            "--detector",
+            help="Target DEEPFACE_DETECTOR, replacing any cascade (default: settings)",
+        )
+        parser.add_argument(
+            "--normalization", help="Target DEEPFACE_NORMALIZATION (default: settings)"
+        )
+        parser.add_argument(
+            "--onnx-model",
+            help=(
+                "ONNX model converted from the target model, with "
+                "DEEPFACE_EMBEDDER = 'onnx' (default: DEEPFACE_ONNX_MODEL)"
+            ),
+        )
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            default=16,
+            help="Number of images detected and embedded per model forward pass",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=256,
+            help="Number of rows read, embedded and committed together",
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes, each loading its own copy of the model",
+        )
+        parser.add_argument(
+            "--status", action="store_true", help="Show progress and stop"
+        )
+        parser.add_argument(
+            "--promote",
+            action="store_true",
+            help="Swap the staged embeddings of the target configuration into place",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Promote even though some rows have no embedding for the target",
+        )
+        parser.add_argument(
+            "--discard",
+            action="store_true",
+            help="Drop every staged embedding (e.g. the old ones after promoting)",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--batch-size and --chunk-size must be at least 1")
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        if options["discard"]:
+            count = discard()
+            self.stdout.write(
+                self.style.SUCCESS(f"Discarded {count} staged embeddings")
+            )
+            return
+
+        configuration = target_configuration(
+            options["model"],
+            options["detector"],
+            options["normalization"],
+            onnx_model=options["onnx_model"],
+        )
+        version = configuration_version(configuration)
+        counts = progress(version)
+        remaining = counts["total"] - counts["current"] - counts["staged"]
+        self.stdout.write(
+            f"Target {version} (settings: {get_embedding_version()}): "
+            f"{counts['current']} live, {counts['staged']} staged, "
+            f"{remaining} of {counts['total']} to re-embed"
+        )
+        if options["status"]:
+            return
+
+        if options["promote"]:
+            if remaining and not options["force"]:
+                raise CommandError(
+                    f"{remaining} rows have no embedding for {version} yet; run "
+                    "reembed again first, or pass --force"
+                )
+            try:
+                count = promote(version)
+            except ValueError as e:
+                raise CommandError(str(e)) from e
+            self.stdout.write(
+                self.style.SUCCESS(f"Promoted {count} embeddings of {version}")
+            )
+            return
+
+        start = time.perf_counter()
+        self.embedded = 0
+        self.failed = 0
+        chunks = pending_chunks(version, options["chunk_size"])
+        if options["workers"] == 1:
+            embedder = build_embedder(configuration)
+            self.stdout.write(f"Model ready in {embedder.load():.2f}s")
+            for chunk in chunks:
+                self.write(embed_rows(embedder, chunk, options["batch_size"]), version)
+        else:
+            self.run_workers(
+                chunks,
+                configuration,
+                version,
+                options["batch_size"],
+                options["workers"],
+            )
+
+        elapsed = time.perf_counter() - start
+        rate = self.embedded / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Re-embedded {self.embedded} images ({self.failed} failed) in "
+                f"{elapsed:.1f}s ({rate:.2f} images/sec)"
+            )
+        )
+
+    def run_workers(self, chunks, configuration, version, batch_size, workers):
+        """Embed chunks in a process pool and commit them as they come back."""
+        in_flight = set()
+        # TensorFlow does not survive a fork once it has run
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=init_worker,
+            initargs=(configuration,),
+        ) as pool:
+
+            def submit_next():
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    in_flight.add(pool.submit(embed_rows_in_worker, chunk, batch_size))
+
+            for _ in range(2 * workers):
+                submit_next()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.remove(future)
+                    self.write(future.result(), version)
+                    submit_next()
+
+    def write(self, result, version):
+        """Commit one chunk of embeddings; this is the resume checkpoint."""
+        embedded, errors = result
+        stage_embeddings(embedded, version)
+        for pk, error in errors:
+            self.stdout.write(self.style.ERROR(f"Identity {pk}: {error}"))
+        self.embedded += len(embedded)
+        self.failed += len(errors)
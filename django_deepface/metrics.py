@@ -0,0 +1,248 @@
+"""In-process metrics for face login and enrollment.
+
+Stage timings and match distances sent with ``face_image_processed`` are
+aggregated into per-process histograms and exposed in the Prometheus text
+format by the ``metrics`` view, together with inference and enrollment
+queue depths. Each process keeps its own numbers, so scrape every worker.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Any
+
+from django.conf import settings
+from django.db.models import Count
+from django.dispatch import receiver
+
+from .signals import face_image_processed
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DISTANCE_BUCKETS = (0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0, 1.5)
+
+# name: (type, help), in exposition order
+METRICS = {
+    "deepface_operations_total": (
+        "counter",
+        "Face logins, registrations and enrollments by outcome.",
+    ),
+    "deepface_operation_seconds": (
+        "histogram",
+        "Total time of an operation, summed over its stages.",
+    ),
+    "deepface_stage_seconds": (
+        "histogram",
+        "Time spent in each stage of an operation.",
+    ),
+    "deepface_match_distance": (
+        "histogram",
+        "Distance between a login face and the best match.",
+    ),
+    "deepface_model_ready": ("gauge", "Whether this process can serve inference."),
+    "deepface_inference_queued": ("gauge", "Inference jobs waiting for a thread."),
+    "deepface_inference_running": ("gauge", "Inference jobs running."),
+    "deepface_inference_completed_total": ("counter", "Inference jobs completed."),
+    "deepface_inference_cancelled_total": (
+        "counter",
+        "Inference jobs cancelled before they ran.",
+    ),
+    "deepface_inference_rejected_total": (
+        "counter",
+        "Inference jobs refused because the queue was full.",
+    ),
+    "deepface_inference_wait_seconds_max": (
+        "gauge",
+        "Longest time an inference job waited for a thread.",
+    ),
+    "deepface_detector_cascade_attempts_total": (
+        "counter",
+        "Images given to each detector cascade stage.",
+    ),
+    "deepface_detector_cascade_hits_total": (
+        "counter",
+        "Images whose face was accepted by each detector cascade stage.",
+    ),
+    "deepface_enrollment_jobs": ("gauge", "Enrollment jobs by status."),
+}
+
+
+def is_metrics_enabled() -> bool:
+    """Whether the metrics endpoint is served."""
+    return getattr(settings, "DEEPFACE_METRICS", False)
+
+
+class Histogram:
+    """Counts of observations at or under each bucket bound, plus sum and count."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i in range(bisect_left(self.buckets, value), len(self.buckets)):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by metric name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[tuple, float] = {}
+        self.histograms: dict[tuple, Histogram] = {}
+
+    def inc(self, name: str, labels: dict[str, str], amount: float = 1) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(
+        self,
+        name: str,
+        labels: dict[str, str],
+        value: float,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        """Every sample as ``(name, labels, value)``, histograms expanded."""
+        samples = []
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                samples.append((name, dict(labels), value))
+            for (name, labels), histogram in self.histograms.items():
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    samples.append(
+                        (f"{name}_bucket", {**dict(labels), "le": str(bound)}, count)
+                    )
+                samples.append(
+                    (f"{name}_bucket", {**dict(labels), "le": "+Inf"}, histogram.count)
+                )
+                samples.append((f"{name}_sum", dict(labels), histogram.sum))
+                samples.append((f"{name}_count", dict(labels), histogram.count))
+        return samples
+
+
+registry = MetricsRegistry()
+
+
+@receiver(face_image_processed, dispatch_uid="django_deepface.metrics")
+def record_face_image_processed(
+    sender,
+    stage,
+    was_successful=True,
+    timings=None,
+    distance=None,
+    reason=None,
+    **kwargs,
+):
+    """
+    Aggregate the outcome, stage timings and match distance of an operation.
+
+    Failures with a ``reason`` (``shed``, ``unavailable``) are counted under
+    that outcome instead of ``failure``.
+    """
+    outcome = "success" if was_successful else reason or "failure"
+    registry.inc("deepface_operations_total", {"operation": stage, "outcome": outcome})
+    if timings:
+        for name, seconds in timings.items():
+            registry.observe(
+                "deepface_stage_seconds", {"operation": stage, "stage": name}, seconds
+            )
+        registry.observe(
+            "deepface_operation_seconds",
+            {"operation": stage, "outcome": outcome},
+            sum(timings.values()),
+        )
+    if distance is not None:
+        registry.observe(
+            "deepface_match_distance",
+            {"operation": stage, "outcome": outcome},
+            distance,
+            DISTANCE_BUCKETS,
+        )
+
+
+def state_samples() -> list[tuple[str, dict[str, str], float]]:
+    """Current model, inference queue and enrollment queue state."""
+    from .embedder import get_embedder
+    from .inference import get_inference_executor
+    from .models import EnrollmentJob
+
+    embedder = get_embedder()
+    stats = get_inference_executor().stats()
+    samples = [
+        ("deepface_model_ready", {}, int(embedder.is_ready)),
+        ("deepface_inference_queued", {}, stats["queued"]),
+        ("deepface_inference_running", {}, stats["running"]),
+        ("deepface_inference_completed_total", {}, stats["completed"]),
+        ("deepface_inference_cancelled_total", {}, stats["cancelled"]),
+        ("deepface_inference_rejected_total", {}, stats["rejected"]),
+        ("deepface_inference_wait_seconds_max", {}, stats["max_wait_seconds"]),
+    ]
+    cascade_hit_rates = getattr(embedder, "cascade_hit_rates", dict)
+    for backend, counts in cascade_hit_rates().items():
+        samples.append(
+            (
+                "deepface_detector_cascade_attempts_total",
+                {"backend": backend},
+                counts["attempts"],
+            )
+        )
+        samples.append(
+            (
+                "deepface_detector_cascade_hits_total",
+                {"backend": backend},
+                counts["hits"],
+            )
+        )
+    jobs = dict(
+        EnrollmentJob.objects.order_by()
+        .values_list("status")
+        .annotate(count=Count("pk"))
+    )
+    for status in EnrollmentJob.Status.values:
+        samples.append(
+            ("deepface_enrollment_jobs", {"status": status}, jobs.get(status, 0))
+        )
+    return samples
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_metrics() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    by_metric: dict[str, list[str]] = {name: [] for name in METRICS}
+    for name, labels, value in registry.samples() + state_samples():
+        base = name
+        for suffix in ("_bucket", "_sum", "_count"):
+            if name.endswith(suffix) and name[: -len(suffix)] in METRICS:
+                base = name[: -len(suffix)]
+        label_text = ",".join(f'{k}="{escape_label(v)}"' for k, v in labels.items())
+        by_metric[base].append(
+            f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}"
+        )
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        if not by_metric[name]:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(by_metric[name])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:59
+
+import django_deepface.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_deepface", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="identity",
+            name="embedding",
+            field=django_deepface.fields.EmbeddingField(
+                blank=True,
+                dimensions=4096,
+                help_text="Embedding vector for the image",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:03
+
+import django.db.models.deletion
+import django_deepface.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("django_deepface", "0003_embedding_storage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FaceTemplate",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="face_template",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "embedding",
+                    django_deepface.fields.EmbeddingField(
+                        dimensions=4096,
+                        help_text="Normalized mean of the user's image embeddings",
+                    ),
+                ),
+                (
+                    "packed_embeddings",
+                    models.BinaryField(
+                        help_text="The user's image embeddings packed as a float32 matrix"
+                    ),
+                ),
+                ("image_count", models.IntegerField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
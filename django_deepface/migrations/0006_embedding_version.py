@@ -0,0 +1,50 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:45
+
+import django_deepface.fields
+import django_deepface.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_deepface", "0005_enrollment_job"),
+    ]
+
+    # Existing rows are stamped with the configuration set when migrating
+    operations = [
+        migrations.AddField(
+            model_name="facetemplate",
+            name="embedding_version",
+            field=models.CharField(
+                default=django_deepface.utils.get_embedding_version,
+                help_text="Model configuration of the embeddings summarized",
+                max_length=255,
+            ),
+        ),
+        migrations.AddField(
+            model_name="identity",
+            name="embedding_version",
+            field=models.CharField(
+                default=django_deepface.utils.get_embedding_version,
+                help_text="Model configuration that computed the embedding",
+                max_length=255,
+            ),
+        ),
+        migrations.AddField(
+            model_name="identity",
+            name="next_embedding",
+            field=django_deepface.fields.EmbeddingField(
+                blank=True,
+                dimensions=4096,
+                help_text="Embedding staged by reembed for another configuration",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="identity",
+            name="next_embedding_version",
+            field=models.CharField(
+                blank=True, db_index=True, default="", max_length=255
+            ),
+        ),
+    ]
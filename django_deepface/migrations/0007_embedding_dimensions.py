@@ -0,0 +1,40 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:06
+
+import django_deepface.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("django_deepface", "0006_embedding_version"),
+    ]
+
+    # embedding is sized for the DEEPFACE_MODEL set when migrating; the staged
+    # and template columns hold vectors of any length
+    operations = [
+        migrations.AlterField(
+            model_name="facetemplate",
+            name="embedding",
+            field=django_deepface.fields.EmbeddingField(
+                fixed_dimensions=False,
+                help_text="Normalized mean of the user's image embeddings",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="identity",
+            name="embedding",
+            field=django_deepface.fields.EmbeddingField(
+                blank=True, help_text="Embedding vector for the image", null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="identity",
+            name="next_embedding",
+            field=django_deepface.fields.EmbeddingField(
+                blank=True,
+                fixed_dimensions=False,
+                help_text="Embedding staged by reembed for another configuration",
+                null=True,
+            ),
+        ),
+    ]
@@ -2,7 +2,10 @@ from typing import ClassVar
 
 from django.contrib.auth.models import User
 from django.db import models
-from pgvector.django import VectorField
+from django.utils.functional import classproperty
+
+from .fields import EmbeddingField
+from .utils import get_embedding_dimensions, get_embedding_version
 
 # Create your models here.
 
@@ -13,14 +16,30 @@ def user_directory_path(instance, filename):
 
 
 class Identity(models.Model):
-    vector_dimensions = 4096
     image = models.ImageField(upload_to=user_directory_path)
-    embedding = VectorField(
-        dimensions=vector_dimensions,
+    # Sized for DEEPFACE_MODEL when migrating; see check_embedding_dimensions
+    embedding = EmbeddingField(
         help_text="Embedding vector for the image",
         null=True,
         blank=True,
     )
+    embedding_version = models.CharField(
+        max_length=255,
+        default=get_embedding_version,
+        help_text="Model configuration that computed the embedding",
+    )
+    # Filled by the reembed command for another configuration, then swapped
+    # with embedding by reembed --promote. Any length, as the other model's
+    # embeddings may be longer or shorter
+    next_embedding = EmbeddingField(
+        fixed_dimensions=False,
+        help_text="Embedding staged by reembed for another configuration",
+        null=True,
+        blank=True,
+    )
+    next_embedding_version = models.CharField(
+        max_length=255, blank=True, default="", db_index=True
+    )
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="identities")
     image_number = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
@@ -28,19 +47,28 @@ class Identity(models.Model):
     class Meta:
         unique_together: ClassVar = ("user", "image_number")
         ordering: ClassVar = ["user__username", "image_number"]
-        # indexes = [
-        #     HnswIndex(
-        #         name="identity_embedding_index",
-        #         fields=["embedding"],
-        #         opclasses=["vector_l2_ops"],
-        #     )
-        # ]
+        # The ANN index on embedding depends on DEEPFACE_DISTANCE and the
+        # DEEPFACE_INDEX_* settings, so it is managed by the deepface_index
+        # command (built CONCURRENTLY) rather than declared here.
         verbose_name: ClassVar = "Identity"
         verbose_name_plural: ClassVar = "Identities"
 
     def __str__(self):
         return f"{self.user.username}'s face image {self.image_number}"
 
+    @classproperty
+    def vector_dimensions(cls) -> int:  # noqa: N805
+        """Length of the embeddings of the configured model."""
+        return get_embedding_dimensions()
+
+    @property
+    def enrollment_status(self):
+        """ "ready" once embedded, otherwise the status of its enrollment job."""
+        if self.embedding is not None:
+            return "ready"
+        job = getattr(self, "enrollment_job", None)
+        return job.status if job else "missing"
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
@@ -48,3 +76,65 @@ class UserProfile(models.Model):
 
     def __str__(self):
         return f"{self.user.username}'s profile"
+
+
+class FaceTemplate(models.Model):
+    """Per-user summary of a user's face embeddings, kept up to date from Identity.
+
+    Lets 1:1 verification compare against a single row instead of ranking
+    every image of the user.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="face_template"
+    )
+    # Any length, so templates of another model can be built before the
+    # switch; they are only ever read by primary key
+    embedding = EmbeddingField(
+        fixed_dimensions=False,
+        help_text="Normalized mean of the user's image embeddings",
+    )
+    packed_embeddings = models.BinaryField(
+        help_text="The user's image embeddings packed as a float32 matrix"
+    )
+    image_count = models.IntegerField()
+    embedding_version = models.CharField(
+        max_length=255,
+        default=get_embedding_version,
+        help_text="Model configuration of the embeddings summarized",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}'s face template"
+
+
+class EnrollmentJob(models.Model):
+    """Queued embedding of an uploaded Identity, processed by deepface_worker."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSING = "processing", "Processing"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    identity = models.OneToOneField(
+        Identity, on_delete=models.CASCADE, related_name="enrollment_job"
+    )
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    run_after = models.DateTimeField(
+        help_text="Earliest time the job may be picked up (retry backoff)"
+    )
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes: ClassVar = [models.Index(fields=["status", "run_after"])]
+
+    def __str__(self):
+        return f"Enrollment of {self.identity} ({self.status})"
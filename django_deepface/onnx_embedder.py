@@ -0,0 +1,252 @@
+"""ONNX Runtime backend for the face embedder.
+
+The recognition model runs in ONNX Runtime on the CPU instead of in
+TensorFlow: it starts faster, uses less memory and runs concurrent requests
+in parallel with a fixed number of intra-op threads each. Convert the
+configured Keras model once with the ``deepface_onnx`` command, then set::
+
+    DEEPFACE_EMBEDDER = "onnx"
+    DEEPFACE_ONNX_MODEL = "/var/lib/deepface/vgg-face.onnx"
+
+Faces are still detected by DeepFace's detectors, and crops are resized and
+normalized exactly as ``DeepFace.represent`` does, so embeddings stay
+comparable with the ones already stored.
+"""
+
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .embedder import FaceEmbedder, load_deepface
+from .timing import StageTimer
+from .utils import get_deepface_settings, get_detector_cascade
+
+# Name of the graph input the converter writes
+ONNX_INPUT = "input"
+
+
+def get_onnx_settings() -> dict[str, Any]:
+    """Get the ONNX model path and thread settings."""
+    return {
+        "model": getattr(settings, "DEEPFACE_ONNX_MODEL", None),
+        "intra_op_threads": getattr(settings, "DEEPFACE_ONNX_THREADS", None),
+    }
+
+
+def l2_normalize(embeddings: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length, as DeepFace's ``l2_normalize`` does."""
+    return embeddings / (np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-10)
+
+
+class OnnxEmbedder(FaceEmbedder):
+    """Embeds faces with an ONNX Runtime session of the converted model."""
+
+    backend = "onnx"
+
+    def __init__(
+        self,
+        model_path: str | None,
+        intra_op_threads: int | None = None,
+        detector_cascade: list[tuple[str, float]] | None = None,
+        **deepface_settings: Any,
+    ):
+        super().__init__(detector_cascade=detector_cascade, **deepface_settings)
+        self.model_path = model_path
+        self.intra_op_threads = intra_op_threads
+        self.session = None
+        self.target_size: tuple[int, int] | None = None
+        self.postprocess = "none"
+
+    @classmethod
+    def from_settings(cls) -> "OnnxEmbedder":
+        """Create an embedder for the current Django settings."""
+        options = get_onnx_settings()
+        return cls(
+            options["model"],
+            intra_op_threads=options["intra_op_threads"],
+            detector_cascade=get_detector_cascade(),
+            **get_deepface_settings(),
+        )
+
+    def build(self) -> None:
+        """Open the ONNX session, check it matches settings and warm up."""
+        import onnxruntime
+
+        if not self.model_path:
+            raise ImproperlyConfigured(
+                "DEEPFACE_EMBEDDER = 'onnx' needs DEEPFACE_ONNX_MODEL; create the "
+                "model with the deepface_onnx command"
+            )
+        options = onnxruntime.SessionOptions()
+        if self.intra_op_threads:
+            options.intra_op_num_threads = self.intra_op_threads
+        session = onnxruntime.InferenceSession(
+            self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        metadata = session.get_modelmeta().custom_metadata_map
+        model_name = self.deepface_settings["model_name"]
+        if metadata.get("model_name") != model_name:
+            raise ImproperlyConfigured(
+                f"{self.model_path} was converted from {metadata.get('model_name')} "
+                f"but DEEPFACE_MODEL is {model_name}; run deepface_onnx again"
+            )
+        _, height, width, _ = session.get_inputs()[0].shape
+        self.target_size = (height, width)
+        self.postprocess = metadata.get("postprocess", "none")
+        self.session = session
+
+        blank = np.zeros((64, 64, 3), dtype=np.uint8)
+        detectors = [backend for backend, _ in self.detector_cascade or []] or [
+            self.deepface_settings["detector_backend"]
+        ]
+        for backend in detectors:
+            load_deepface().extract_faces(
+                blank, detector_backend=backend, enforce_detection=False
+            )
+        self.check_dimensions(
+            self.run(np.zeros((1, height, width, 3), dtype=np.float32)).shape[1]
+        )
+
+    def represent(self, img, timer: StageTimer | None = None) -> list[float]:
+        """
+        Return the embedding of the first face found in an image.
+
+        Args:
+            img: Path to an image file or a BGR numpy array
+            timer: Records the ``detection`` and ``embedding`` stages
+
+        Returns:
+            The embedding vector
+        """
+        timer = timer if timer is not None else StageTimer()
+        with timer.stage("detection"):
+            face = self.extract_face(img)
+        with timer.stage("embedding"):
+            return self.embed_faces([face])[0]
+
+    def preprocess(self, face: np.ndarray) -> np.ndarray:
+        """Resize and normalize a BGR face crop as ``DeepFace.represent`` does."""
+        from deepface.modules import preprocessing
+
+        img = preprocessing.resize_image(img=face, target_size=self.target_size)
+        return preprocessing.normalize_input(
+            img=img, normalization=self.deepface_settings["normalization"]
+        )
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        """Run the model on a batch of preprocessed faces."""
+        (embeddings,) = self.session.run(
+            None, {self.session.get_inputs()[0].name: batch.astype(np.float32)}
+        )
+        if self.postprocess == "l2":
+            embeddings = l2_normalize(embeddings)
+        return embeddings
+
+    def embed_faces(self, faces: list[np.ndarray]) -> list[list[float]]:
+        """
+        Embed already detected face crops in a single session run.
+
+        Args:
+            faces: Face crops as returned by ``extract_face``
+
+        Returns:
+            One embedding per face, in the same order
+        """
+        if not faces:
+            return []
+        self.load()
+        batch = np.concatenate([self.preprocess(face) for face in faces])
+        return self.run(batch).tolist()
+
+    def readiness(self) -> dict[str, Any]:
+        """Describe the warm-up state of this process and its ONNX session."""
+        return {
+            **super().readiness(),
+            "onnx_model": self.model_path,
+            "intra_op_threads": self.intra_op_threads,
+        }
+
+
+def convert_to_onnx(model_name: str, path: str, opset: int = 17) -> dict[str, Any]:
+    """
+    Convert a DeepFace Keras recognition model to ONNX.
+
+    Some DeepFace models post-process the Keras output (VGG-Face normalizes
+    it to unit length). That step is detected by comparing with DeepFace's
+    own ``forward`` and recorded in the model metadata, together with the
+    model name, so ``OnnxEmbedder`` can reproduce it.
+
+    Args:
+        model_name: DeepFace model name, e.g. ``"VGG-Face"``
+        path: Where to write the ``.onnx`` file
+        opset: ONNX opset version
+
+    Returns:
+        A summary of the conversion, including the largest difference from
+        DeepFace's embeddings on random inputs
+
+    Raises:
+        ValueError: If the model is not a Keras model or its post-processing
+            cannot be reproduced
+    """
+    import onnx
+    import onnxruntime
+    import tensorflow as tf
+    import tf2onnx
+
+    client = load_deepface().build_model(
+        task="facial_recognition", model_name=model_name
+    )
+    keras_model = getattr(client, "model", None)
+    if not hasattr(keras_model, "input_shape"):
+        raise ValueError(
+            f"{model_name} is not a Keras model in this DeepFace version and "
+            "cannot be converted"
+        )
+    input_shape = tuple(keras_model.input_shape[1:])
+    spec = (tf.TensorSpec((None, *input_shape), tf.float32, name=ONNX_INPUT),)
+
+    # Converting a tf.function works for both tf_keras and Keras 3 models
+    @tf.function(input_signature=spec)
+    def forward(faces):
+        return keras_model(faces, training=False)
+
+    proto, _ = tf2onnx.convert.from_function(forward, input_signature=spec, opset=opset)
+
+    sample = np.random.default_rng(0).random((2, *input_shape), dtype=np.float32)
+    raw = np.asarray(keras_model(sample, training=False))
+    expected = np.asarray(client.forward(sample), dtype=np.float32)
+    if np.allclose(raw, expected, atol=1e-5):
+        postprocess = "none"
+    elif np.allclose(l2_normalize(raw), expected, atol=1e-5):
+        postprocess = "l2"
+    else:
+        raise ValueError(
+            f"DeepFace post-processes {model_name} embeddings in a way the ONNX "
+            "backend cannot reproduce"
+        )
+
+    onnx.helper.set_model_props(
+        proto,
+        {
+            "model_name": model_name,
+            "postprocess": postprocess,
+            "deepface": getattr(load_deepface(), "__version__", ""),
+        },
+    )
+    onnx.save(proto, path)
+
+    session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+    (converted,) = session.run(None, {ONNX_INPUT: sample})
+    if postprocess == "l2":
+        converted = l2_normalize(converted)
+    return {
+        "model_name": model_name,
+        "path": path,
+        "input_shape": input_shape,
+        "dimensions": expected.shape[1],
+        "postprocess": postprocess,
+        "max_difference": float(np.abs(converted - expected).max()),
+    }
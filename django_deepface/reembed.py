@@ -0,0 +1,289 @@
+"""Recomputing stored embeddings for another model configuration.
+
+Embeddings are only comparable with probes computed the same way, so every
+Identity records the configuration that produced it (``embedding_version``).
+Switching ``DEEPFACE_MODEL``, ``DEEPFACE_DETECTOR`` or
+``DEEPFACE_NORMALIZATION`` without downtime takes three steps:
+
+1. ``reembed --model ...`` writes vectors for the new configuration to
+   ``next_embedding``, next to the ones logins use. It walks the table in
+   primary-key order and commits each chunk, so an interrupted run resumes
+   where it stopped.
+2. ``reembed --promote --model ...`` swaps the two columns in one
+   transaction. Each process keeps comparing against the column holding its
+   own configuration, so old and new settings both keep working. When the
+   new model's embeddings have another length, PostgreSQL's ``embedding``
+   column is resized in the same transaction and its ANN indexes dropped;
+   rebuild them with ``deepface_index``.
+3. Deploy the new settings, rebuild face templates if they are used, then
+   ``reembed --discard`` the old vectors.
+"""
+
+from typing import Any
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from .checks import column_type, type_dimensions
+from .embedder import FaceEmbedder, embedder_class, get_embedder_name
+from .models import Identity
+from .onnx_embedder import get_onnx_settings
+from .search import BINARY_INDEX_NAME, INDEX_NAME
+from .utils import (
+    decode_image,
+    get_deepface_settings,
+    get_detector_cascade,
+    get_embedding_version,
+)
+from .vector_store import get_vector_store
+
+
+def target_configuration(
+    model_name: str | None = None,
+    detector: str | None = None,
+    normalization: str | None = None,
+    onnx_model: str | None = None,
+) -> dict[str, Any]:
+    """
+    Build the embedder arguments for a configuration, defaulting to settings.
+
+    The embedder backend is the one configured with ``DEEPFACE_EMBEDDER``,
+    so stored vectors are computed the way logins compute probes.
+
+    Args:
+        onnx_model: ONNX model converted from ``model_name``, replacing
+            ``DEEPFACE_ONNX_MODEL`` on the ONNX backend
+
+    Returns:
+        Keyword arguments for ``build_embedder``; a ``detector`` replaces the
+        cascade
+    """
+    options: dict[str, Any] = {"embedder": get_embedder_name()}
+    if options["embedder"] == "onnx":
+        onnx = get_onnx_settings()
+        options["model_path"] = onnx_model or onnx["model"]
+        options["intra_op_threads"] = onnx["intra_op_threads"]
+    options.update(get_deepface_settings())
+    if model_name:
+        options["model_name"] = model_name
+    if normalization:
+        options["normalization"] = normalization
+    if detector:
+        options["detector_backend"] = detector
+        return {**options, "detector_cascade": None}
+    return {**options, "detector_cascade": get_detector_cascade()}
+
+
+def build_embedder(configuration: dict[str, Any]) -> FaceEmbedder:
+    """Create the configured backend's embedder for a target configuration."""
+    options = dict(configuration)
+    return embedder_class(options.pop("embedder"))(**options)
+
+
+def configuration_version(configuration: dict[str, Any]) -> str:
+    """The ``embedding_version`` of embeddings computed with a configuration."""
+    cascade = configuration["detector_cascade"]
+    return get_embedding_version(
+        model_name=configuration["model_name"],
+        detector=(
+            "+".join(backend for backend, _ in cascade)
+            if cascade
+            else configuration["detector_backend"]
+        ),
+        normalization=configuration["normalization"],
+    )
+
+
+def pending_rows(version: str):
+    """Embedded rows without a vector for ``version`` in either column."""
+    return Identity.objects.filter(embedding__isnull=False).exclude(
+        Q(embedding_version=version) | Q(next_embedding_version=version)
+    )
+
+
+def progress(version: str) -> dict[str, int]:
+    """Count embedded rows, and those already having a vector for ``version``."""
+    embedded = Identity.objects.filter(embedding__isnull=False)
+    return {
+        "total": embedded.count(),
+        "current": embedded.filter(embedding_version=version).count(),
+        "staged": embedded.filter(next_embedding_version=version).count(),
+    }
+
+
+def pending_chunks(version: str, chunk_size: int):
+    """
+    Yield ``(pk, image name)`` lists of pending rows in primary-key order.
+
+    Keyset pagination keeps every page an index range scan, however far
+    into the table the run is, and never revisits a row that failed.
+    """
+    last_pk = 0
+    while True:
+        chunk = list(
+            pending_rows(version)
+            .filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "image")[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1][0]
+
+
+def embed_rows(
+    embedder: FaceEmbedder, rows: list[tuple[int, str]], batch_size: int
+) -> tuple[list[tuple[int, list[float]]], list[tuple[int, str]]]:
+    """
+    Embed the images of some rows, one forward pass per batch.
+
+    Returns:
+        ``(pk, embedding)`` pairs, and ``(pk, error)`` for images that failed
+    """
+    storage = Identity._meta.get_field("image").storage
+    embedded, errors = [], []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start : start + batch_size]
+        faces, detected = [], []
+        for pk, name in batch:
+            try:
+                with storage.open(name, "rb") as f:
+                    faces.append(embedder.extract_face(decode_image(f)))
+                detected.append(pk)
+            except Exception as e:
+                errors.append((pk, str(e)))
+        try:
+            embeddings = embedder.embed_faces(faces)
+        except Exception as e:
+            errors.extend((pk, str(e)) for pk in detected)
+            continue
+        embedded.extend(zip(detected, embeddings))
+    return embedded, errors
+
+
+_worker_embedder: FaceEmbedder | None = None
+
+
+def init_worker(configuration: dict[str, Any]) -> None:
+    """Set up Django and load the target model once in a worker process."""
+    import django
+
+    django.setup()
+    global _worker_embedder
+    _worker_embedder = build_embedder(configuration)
+    _worker_embedder.load()
+
+
+def embed_rows_in_worker(rows, batch_size):
+    return embed_rows(_worker_embedder, rows, batch_size)
+
+
+def stage_embeddings(embedded: list[tuple[int, list[float]]], version: str) -> None:
+    """Write re-computed vectors next to the live ones, in one transaction."""
+    identities = [
+        Identity(
+            pk=pk,
+            next_embedding=np.asarray(embedding, dtype=np.float32),
+            next_embedding_version=version,
+        )
+        for pk, embedding in embedded
+    ]
+    with transaction.atomic():
+        Identity.objects.bulk_update(
+            identities, ["next_embedding", "next_embedding_version"]
+        )
+        # Processes already configured for this version read the staged column
+        get_vector_store().invalidate()
+
+
+def retype_embedding(dimensions: int | None) -> None:
+    """
+    Change the dimensions of PostgreSQL's ``embedding`` column.
+
+    Its ANN indexes are dropped, as they are tied to the dimensions.
+
+    Args:
+        dimensions: New dimensions; None accepts vectors of any length
+    """
+    table = Identity._meta.db_table
+    storage = column_type(connection, table, "embedding").split("(")[0]
+    db_type = storage if dimensions is None else f"{storage}({dimensions:d})"
+    # ALTER TABLE refuses to run while deferred foreign key checks are queued
+    connection.check_constraints()
+    with connection.cursor() as cursor:
+        for name in (INDEX_NAME, BINARY_INDEX_NAME):
+            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+        cursor.execute(
+            f'ALTER TABLE "{table}" ALTER COLUMN "embedding" '
+            f'TYPE {db_type} USING "embedding"::{db_type}'
+        )
+
+
+def promote(version: str) -> int:
+    """
+    Swap the staged vectors of ``version`` into ``embedding``.
+
+    The previous vectors move to ``next_embedding``, so processes still
+    configured for them keep working, and promoting them back undoes it.
+    On PostgreSQL, ``embedding`` is resized if the staged vectors have
+    other dimensions.
+
+    Returns:
+        Number of rows swapped
+
+    Raises:
+        ValueError: If the column must be resized but some rows have no
+            staged vector
+    """
+    staged = Identity.objects.filter(next_embedding_version=version)
+    with transaction.atomic():
+        dimensions = None
+        if connection.vendor == "postgresql":
+            vector = staged.values_list("next_embedding", flat=True).first()
+            actual = type_dimensions(
+                column_type(connection, Identity._meta.db_table, "embedding")
+            )
+            if vector is not None and len(vector) != actual:
+                dimensions = len(vector)
+        if dimensions is not None:
+            unstaged = Identity.objects.filter(embedding__isnull=False).exclude(
+                next_embedding_version=version
+            )
+            if unstaged.exists():
+                raise ValueError(
+                    f"{version} embeddings have {dimensions} dimensions, so every "
+                    "row must be re-embedded before the column is resized"
+                )
+            retype_embedding(None)
+        # SET assignments all read the old row, so this is a swap
+        count = staged.update(
+            embedding=F("next_embedding"),
+            embedding_version=F("next_embedding_version"),
+            next_embedding=F("embedding"),
+            next_embedding_version=F("embedding_version"),
+        )
+        if dimensions is not None:
+            retype_embedding(dimensions)
+        get_vector_store().invalidate()
+    return count
+
+
+def discard(version: str | None = None) -> int:
+    """
+    Drop staged vectors, e.g. the previous ones after a promotion.
+
+    Args:
+        version: Only drop this version; None drops every staged vector
+
+    Returns:
+        Number of rows cleared
+    """
+    staged = Identity.objects.exclude(next_embedding_version="")
+    if version is not None:
+        staged = staged.filter(next_embedding_version=version)
+    with transaction.atomic():
+        count = staged.update(next_embedding=None, next_embedding_version="")
+        get_vector_store().invalidate()
+    return count
@@ -0,0 +1,295 @@
+"""Vector search helpers for django-deepface.
+
+Keeps the distance used by queries and the operator class of the ANN index
+in step, so that the index built by ``manage.py deepface_index`` is the one
+the login query can actually use.
+"""
+
+from contextlib import contextmanager
+from typing import Any
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Func, Value
+from pgvector import HalfVector, Vector
+from pgvector.django import (
+    BitField,
+    CosineDistance,
+    HammingDistance,
+    L2Distance,
+    MaxInnerProduct,
+)
+
+from .fields import get_embedding_storage
+from .utils import get_embedding_dimensions, get_similarity_threshold
+
+# Name of the ANN index managed by the deepface_index command
+INDEX_NAME = "deepface_identity_embedding_ann"
+
+# Name of the HNSW index on binary-quantized embeddings (deepface_index --binary)
+BINARY_INDEX_NAME = "deepface_identity_embedding_bq"
+
+# Distance setting -> (query expression, operator class suffix)
+DISTANCES = {
+    "cosine": (CosineDistance, "cosine_ops"),
+    "l2": (L2Distance, "l2_ops"),
+    "inner_product": (MaxInnerProduct, "ip_ops"),
+}
+
+INDEX_TYPES = ("hnsw", "ivfflat")
+
+# pgvector refuses to index more dimensions than this, per storage type
+MAX_INDEX_DIMENSIONS = {"vector": 2000, "halfvec": 4000}
+
+
+def get_distance_metric() -> str:
+    """Get the distance metric used to compare embeddings."""
+    metric = getattr(settings, "DEEPFACE_DISTANCE", "cosine")
+    if metric not in DISTANCES:
+        raise ValueError(
+            f"DEEPFACE_DISTANCE must be one of {', '.join(DISTANCES)}, not {metric!r}"
+        )
+    return metric
+
+
+def get_index_settings() -> dict[str, Any]:
+    """Get ANN index build and search parameters from Django settings."""
+    index_type = getattr(settings, "DEEPFACE_INDEX_TYPE", "hnsw")
+    if index_type not in INDEX_TYPES:
+        raise ValueError(
+            f"DEEPFACE_INDEX_TYPE must be one of {', '.join(INDEX_TYPES)}, not {index_type!r}"
+        )
+    return {
+        "type": index_type,
+        "m": getattr(settings, "DEEPFACE_INDEX_M", 16),
+        "ef_construction": getattr(settings, "DEEPFACE_INDEX_EF_CONSTRUCTION", 64),
+        "lists": getattr(settings, "DEEPFACE_INDEX_LISTS", 100),
+        "ef_search": getattr(settings, "DEEPFACE_HNSW_EF_SEARCH", 40),
+        "probes": getattr(settings, "DEEPFACE_IVFFLAT_PROBES", 10),
+    }
+
+
+def get_binary_prefilter() -> int | None:
+    """
+    Get how many binary-quantized candidates gallery-wide search reranks.
+
+    Returns:
+        ``DEEPFACE_RERANK_CANDIDATES`` when ``DEEPFACE_BINARY_PREFILTER`` is
+        on, otherwise None (search the full-precision vectors directly)
+    """
+    if not getattr(settings, "DEEPFACE_BINARY_PREFILTER", False):
+        return None
+    return getattr(settings, "DEEPFACE_RERANK_CANDIDATES", 100)
+
+
+def distance_expression(vector, field: str = "embedding"):
+    """
+    Build the distance expression between a column and a query vector.
+
+    Args:
+        vector: Query embedding
+        field: Name of the vector column
+
+    Returns:
+        A pgvector distance expression matching the index operator class
+        and the storage type of the column
+    """
+    expression, _ = DISTANCES[get_distance_metric()]
+    if get_embedding_storage() == "halfvec":
+        vector = HalfVector(vector)
+    return expression(field, vector)
+
+
+def numpy_distances(matrix, vector, norms=None) -> np.ndarray:
+    """
+    Compute the configured distance in NumPy, matching what pgvector returns.
+
+    Args:
+        matrix: Embeddings, one per row
+        vector: Query embedding
+        norms: Precomputed L2 norms of the rows of ``matrix``, if known
+
+    Returns:
+        One distance per row of ``matrix``
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    vector = np.asarray(vector, dtype=np.float32)
+    metric = get_distance_metric()
+    if metric == "l2":
+        return np.linalg.norm(matrix - vector, axis=1)
+    if metric == "inner_product":
+        # pgvector's <#> is the negated inner product
+        return -(matrix @ vector)
+    if norms is None:
+        norms = np.linalg.norm(matrix, axis=1)
+    norms = norms * np.linalg.norm(vector)
+    return 1.0 - (matrix @ vector) / np.maximum(norms, 1e-12)
+
+
+def binary_quantize(field: str = "embedding") -> Func:
+    """
+    Build ``binary_quantize(column)::bit(N)``, the expression of the binary index.
+
+    The query must repeat the indexed expression exactly for PostgreSQL to
+    use the index, so both are built here.
+    """
+    return Func(
+        F(field),
+        template="binary_quantize(%(expressions)s)::bit(%(dimensions)d)",
+        dimensions=get_embedding_dimensions(),
+        output_field=BitField(),
+    )
+
+
+def hamming_expression(vector, field: str = "embedding") -> HammingDistance:
+    """Hamming distance between the sign bits of a column and a query vector."""
+    query = Func(
+        Value(Vector(vector).to_text()),
+        template="binary_quantize(%(expressions)s::vector)",
+        output_field=BitField(),
+    )
+    return HammingDistance(binary_quantize(field), query)
+
+
+def pack_signs(matrix) -> np.ndarray:
+    """Pack the sign of each dimension into bits, as ``binary_quantize`` does."""
+    return np.packbits(np.asarray(matrix) > 0, axis=-1)
+
+
+# Set bits of every byte value, for NumPy versions without bitwise_count
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hamming_distances(bits: np.ndarray, query_bits: np.ndarray) -> np.ndarray:
+    """Hamming distance between packed sign bits, one per row of ``bits``."""
+    different = np.bitwise_xor(bits, query_bits)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(different).sum(axis=1, dtype=np.int32)
+    return POPCOUNT[different].sum(axis=1, dtype=np.int32)
+
+
+def index_opclass() -> str:
+    """Get the operator class matching the configured distance and storage."""
+    _, suffix = DISTANCES[get_distance_metric()]
+    return f"{get_embedding_storage()}_{suffix}"
+
+
+def max_index_dimensions() -> int:
+    """Get the most dimensions pgvector can index for the configured storage."""
+    return MAX_INDEX_DIMENSIONS[get_embedding_storage()]
+
+
+def index_sql(table: str, column: str = "embedding", name: str = INDEX_NAME) -> str:
+    """
+    Build the CREATE INDEX CONCURRENTLY statement for the configured index.
+
+    Args:
+        table: Table holding the embeddings
+        column: Vector column to index
+        name: Index name
+
+    Returns:
+        SQL statement (must run outside a transaction)
+    """
+    index = get_index_settings()
+    if index["type"] == "hnsw":
+        options = (
+            f"m = {int(index['m'])}, ef_construction = {int(index['ef_construction'])}"
+        )
+    else:
+        options = f"lists = {int(index['lists'])}"
+    return (
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" '
+        f'USING {index["type"]} ("{column}" {index_opclass()}) WITH ({options})'
+    )
+
+
+def binary_index_sql(
+    table: str, column: str = "embedding", name: str = BINARY_INDEX_NAME
+) -> str:
+    """
+    Build the CREATE INDEX CONCURRENTLY statement for the binary prefilter.
+
+    Bits index up to 64,000 dimensions, so this works where the
+    full-precision index cannot (needs pgvector 0.7).
+    """
+    index = get_index_settings()
+    return (
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" '
+        f'USING hnsw ((binary_quantize("{column}")::bit({get_embedding_dimensions():d})) '
+        f"bit_hamming_ops) WITH (m = {int(index['m'])}, "
+        f"ef_construction = {int(index['ef_construction'])})"
+    )
+
+
+@contextmanager
+def search_parameters(using: str = "default", limit: int | None = None):
+    """
+    Apply the per-query ANN search parameters to the enclosed queries.
+
+    The parameters are set with ``SET LOCAL`` semantics, so they only last
+    for the surrounding transaction and never leak into pooled connections.
+
+    Args:
+        using: Database alias
+        limit: Rows the query will fetch; HNSW cannot return more rows than
+            ``ef_search``, so it is raised to at least this many
+    """
+    index = get_index_settings()
+    if index["type"] == "hnsw":
+        name, value = "hnsw.ef_search", max(index["ef_search"], limit or 0)
+    else:
+        name, value = "ivfflat.probes", index["probes"]
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT set_config(%s, %s, true)", [name, str(value)])
+        yield
+
+
+def nearest_users(embedding, k: int) -> list[tuple[int, float]]:
+    """
+    Search the whole gallery for the users nearest to an embedding.
+
+    Users have several images, so each user is ranked by their closest
+    image. The search runs in the configured vector store.
+
+    Args:
+        embedding: Query embedding
+        k: Number of users to return
+
+    Returns:
+        ``(user_id, distance)`` pairs, nearest first
+    """
+    from .vector_store import get_vector_store
+
+    return get_vector_store().nearest_users(embedding, k)
+
+
+def identify(embedding) -> tuple[int | None, list[tuple[int, float]]]:
+    """
+    Identify a face against the whole gallery (1:N, no username).
+
+    A match is only accepted when the nearest user is under
+    ``DEEPFACE_THRESHOLD`` and beats the runner-up by at least
+    ``DEEPFACE_IDENTIFICATION_MARGIN``, so that look-alikes are refused
+    rather than guessed between.
+
+    Args:
+        embedding: Query embedding
+
+    Returns:
+        The matched user id (or None) and the top-k candidates
+    """
+    candidates = nearest_users(
+        embedding, getattr(settings, "DEEPFACE_IDENTIFICATION_TOP_K", 5)
+    )
+    if not candidates:
+        return None, candidates
+    _, best_distance = candidates[0]
+    if best_distance >= get_similarity_threshold():
+        return None, candidates
+    margin = getattr(settings, "DEEPFACE_IDENTIFICATION_MARGIN", 0.05)
+    if len(candidates) > 1 and candidates[1][1] - best_distance < margin:
+        return None, candidates
+    return candidates[0][0], candidates
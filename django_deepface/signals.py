@@ -1,4 +1,37 @@
-from django.dispatch import Signal
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .face_templates import get_template_mode, rebuild_template
+from .models import Identity
+from .vector_store import get_vector_store
 
 # Signal sent when a face image is successfully processed
 face_image_processed = Signal()
+
+
+@receiver(post_save, sender=Identity)
+def update_template_on_save(sender, instance, update_fields=None, **kwargs):
+    """Refresh the user's face template when one of their embeddings changes."""
+    if get_template_mode() is None:
+        return
+    # Renumbering images does not change the template
+    if update_fields is not None and "embedding" not in update_fields:
+        return
+    rebuild_template(instance.user_id)
+
+
+@receiver(post_delete, sender=Identity)
+def update_template_on_delete(sender, instance, **kwargs):
+    """Refresh (or drop) the user's face template when an image is deleted."""
+    if get_template_mode() is None:
+        return
+    rebuild_template(instance.user_id)
+
+
+@receiver(post_save, sender=Identity)
+@receiver(post_delete, sender=Identity)
+def invalidate_vector_store(sender, update_fields=None, **kwargs):
+    """Make the vector store reload the gallery after an embedding changes."""
+    if update_fields is not None and "embedding" not in update_fields:
+        return
+    get_vector_store().invalidate()
@@ -1,8 +1,56 @@
 import os
 
+import numpy as np
 import pytest
+from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from django_deepface.embedder import reset_embedder
+from django_deepface.inference import reset_inference_executor
+from django_deepface.models import Identity
+from django_deepface.signals import face_image_processed
+from django_deepface.vector_store import reset_vector_store
+
+
+def unit_vector(*indices):
+    """An embedding of unit length pointing along the given dimensions."""
+    vector = np.zeros(Identity.vector_dimensions)
+    vector[list(indices)] = 1.0
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def pytest_runtest_setup(item):
+    """Skip tests marked ``postgres`` when running on another database."""
+    if item.get_closest_marker("postgres"):
+        from django.db import connection
+
+        if connection.vendor != "postgresql":
+            pytest.skip("needs PostgreSQL with pgvector")
+
+
+@pytest.fixture(autouse=True)
+def fresh_embedder():
+    """Give every test its own embedder so warm-up state does not leak."""
+    reset_embedder()
+    yield
+    reset_embedder()
+
+
+@pytest.fixture(autouse=True)
+def fresh_inference_executor():
+    """Give every test its own inference executor and queue counters."""
+    reset_inference_executor()
+    yield
+    reset_inference_executor()
+
+
+@pytest.fixture(autouse=True)
+def fresh_vector_store():
+    """Give every test an empty vector store; rolled back rows send no signals."""
+    reset_vector_store()
+    yield
+    reset_vector_store()
+
 
 @pytest.fixture
 def real_face_image():
@@ -18,3 +66,51 @@ def real_face_image():
     return SimpleUploadedFile(
         name="test_face.webp", content=image_content, content_type="image/webp"
     )
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username="testuser", password="testpass123")
+
+
+@pytest.fixture
+def mock_deepface(monkeypatch):
+    """Mock detection and embedding, recording the size of each forward pass.
+
+    Detection fails while ``broken`` is set and for images under 8 pixels
+    tall; ``embedding`` maps a model name to the vector it returns.
+    """
+    state = {
+        "broken": False,
+        "forward_passes": [],
+        "embedding": lambda model_name: np.ones(Identity.vector_dimensions).tolist(),
+    }
+
+    def mock_extract_faces(img, **kwargs):
+        if state["broken"] or img.shape[0] < 8:
+            raise ValueError("Face could not be detected")
+        return [{"face": np.zeros((4, 4, 3)), "confidence": 1.0}]
+
+    def mock_represent(img, model_name="VGG-Face", **kwargs):
+        if not isinstance(img, list):
+            return [{"embedding": state["embedding"](model_name)}]
+        state["forward_passes"].append(len(img))
+        results = [[{"embedding": state["embedding"](model_name)}] for _ in img]
+        return results[0] if len(img) == 1 else results
+
+    monkeypatch.setattr("deepface.DeepFace.extract_faces", mock_extract_faces)
+    monkeypatch.setattr("deepface.DeepFace.represent", mock_represent)
+    return state
+
+
+@pytest.fixture
+def received():
+    """Collect the keyword arguments of every face_image_processed signal."""
+    payloads = []
+
+    def handler(sender, **kwargs):
+        payloads.append(kwargs)
+
+    face_image_processed.connect(handler)
+    yield payloads
+    face_image_processed.disconnect(handler)
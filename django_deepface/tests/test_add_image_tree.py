@@ -0,0 +1,160 @@
+import io
+import shutil
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError
+
+from django_deepface.models import Identity
+
+TEST_IMAGE = Path(__file__).parent / "test_face.webp"
+
+
+@pytest.fixture
+def image_tree(tmp_path):
+    """A directory tree with three images for alice and five for bob."""
+    for username, count in (("alice", 3), ("bob", 5)):
+        user_dir = tmp_path / username
+        user_dir.mkdir()
+        for i in range(count):
+            shutil.copy(TEST_IMAGE, user_dir / f"face_{i}.webp")
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestAddImageTree:
+    def test_batches_forward_passes(
+        self, image_tree, mock_deepface, settings, tmp_path
+    ):
+        """Test that images are embedded in batches across users"""
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        out = io.StringIO()
+
+        call_command("add_image_tree", str(image_tree), batch_size=3, stdout=out)
+
+        # alice gets 3 images, bob is capped at 4
+        assert Identity.objects.filter(user__username="alice").count() == 3
+        assert Identity.objects.filter(user__username="bob").count() == 4
+        assert mock_deepface["forward_passes"] == [3, 3, 1]
+        assert "images/sec" in out.getvalue()
+        assert "Maximum images reached for bob" in out.getvalue()
+
+    def test_failed_image_frees_its_slot(
+        self, image_tree, mock_deepface, settings, tmp_path
+    ):
+        """Test that a failed image lets the next image take its number"""
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        (image_tree / "bob" / "face_0.webp").unlink()
+        (image_tree / "bob" / "broken_0.webp").write_bytes(b"not an image")
+        out = io.StringIO()
+
+        call_command("add_image_tree", str(image_tree), batch_size=4, stdout=out)
+
+        numbers = list(
+            Identity.objects.filter(user__username="bob").values_list(
+                "image_number", flat=True
+            )
+        )
+        assert numbers == [1, 2, 3, 4]
+        assert "Error processing broken_0.webp for bob" in out.getvalue()
+
+    def test_workers_write_through_single_writer(
+        self, image_tree, mock_deepface, settings, tmp_path, monkeypatch
+    ):
+        """Test that a process pool embeds users and the command stores them"""
+        # Forked workers inherit the mocked DeepFace; real runs use spawn
+        monkeypatch.setattr(
+            "django_deepface.management.commands.add_image_tree.WORKER_START_METHOD",
+            "fork",
+        )
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        out = io.StringIO()
+
+        call_command(
+            "add_image_tree", str(image_tree), batch_size=2, workers=2, stdout=out
+        )
+
+        assert Identity.objects.filter(user__username="alice").count() == 3
+        assert Identity.objects.filter(user__username="bob").count() == 4
+        assert "Added 7 of 7 images" in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestBulkWrites:
+    @pytest.mark.postgres
+    def test_rows_are_copied(self, image_tree, mock_deepface, settings, tmp_path):
+        """Test that rows are written with binary COPY and read back intact"""
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        out = io.StringIO()
+
+        call_command(
+            "add_image_tree", str(image_tree), write_batch=2, copy_threads=4, stdout=out
+        )
+
+        assert "Rows written with copy" in out.getvalue()
+        identities = Identity.objects.filter(user__username="alice")
+        assert identities.count() == 3
+        for identity in identities:
+            assert len(identity.embedding) == Identity.vector_dimensions
+            assert identity.created_at is not None
+            assert (tmp_path / "media" / identity.image.name).exists()
+
+    def test_bulk_create_fallback(
+        self, image_tree, mock_deepface, settings, tmp_path, monkeypatch
+    ):
+        """Test that bulk_create is used where COPY is unavailable"""
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        monkeypatch.setattr("django_deepface.bulk.can_copy", lambda connection: False)
+        out = io.StringIO()
+
+        call_command("add_image_tree", str(image_tree), stdout=out)
+
+        assert "Rows written with bulk_create" in out.getvalue()
+        assert Identity.objects.count() == 7
+
+    def test_failed_write_leaves_no_files(
+        self, image_tree, mock_deepface, settings, tmp_path, monkeypatch
+    ):
+        """Test that images copied for rows that were never written are removed"""
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+
+        def fail(identities):
+            raise DatabaseError("connection lost")
+
+        monkeypatch.setattr(
+            "django_deepface.management.commands.add_image_tree.insert_identities",
+            fail,
+        )
+
+        with pytest.raises(DatabaseError):
+            call_command("add_image_tree", str(image_tree), stdout=io.StringIO())
+
+        assert not Identity.objects.exists()
+        assert [p for p in (tmp_path / "media").rglob("*") if p.is_file()] == []
+
+    def test_in_place_references_images(self, mock_deepface, settings, tmp_path):
+        """Test that --in-place stores paths under MEDIA_ROOT without copying"""
+        settings.MEDIA_ROOT = str(tmp_path)
+        user_dir = tmp_path / "imports" / "alice"
+        user_dir.mkdir(parents=True)
+        shutil.copy(TEST_IMAGE, user_dir / "face_0.webp")
+
+        call_command(
+            "add_image_tree",
+            str(tmp_path / "imports"),
+            in_place=True,
+            stdout=io.StringIO(),
+        )
+
+        identity = Identity.objects.get(user__username="alice")
+        assert identity.image.name == "imports/alice/face_0.webp"
+        assert not (tmp_path / "faces").exists()
+
+    def test_in_place_outside_media_root(self, image_tree, settings, tmp_path):
+        """Test that --in-place refuses a directory outside MEDIA_ROOT"""
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+
+        with pytest.raises(CommandError, match="not inside the media root"):
+            call_command("add_image_tree", str(image_tree), in_place=True)
@@ -0,0 +1,125 @@
+import io
+import json
+import os
+
+import numpy as np
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from django_deepface.benchmark import (
+    BENCH_USER_PREFIX,
+    StubEmbedder,
+    clear_gallery,
+    populate_gallery,
+    run_benchmark,
+    synthetic_image,
+)
+from django_deepface.embedder import get_embedder, set_embedder
+from django_deepface.models import Identity
+from django_deepface.utils import decode_image
+
+LOGIN_STAGES = {
+    "upload",
+    "decode",
+    "detection",
+    "embedding",
+    "vector_query",
+    "session_login",
+    "total",
+}
+
+
+class TestStubEmbedder:
+    def test_embeddings_are_deterministic_unit_vectors(self):
+        """Test that the stub embeds the same image identically every time"""
+        img = decode_image(synthetic_image(1))
+
+        first = StubEmbedder(Identity.vector_dimensions).represent(img)
+        second = StubEmbedder(Identity.vector_dimensions).represent(img)
+
+        assert first == second
+        assert len(first) == Identity.vector_dimensions
+        assert np.linalg.norm(first) == pytest.approx(1.0, rel=1e-5)
+
+    def test_different_images_differ(self):
+        """Test that distinct images get distinct embeddings"""
+        embedder = StubEmbedder(Identity.vector_dimensions)
+
+        a = embedder.represent(decode_image(synthetic_image(1)))
+        b = embedder.represent(decode_image(synthetic_image(2)))
+
+        assert a != b
+
+
+@pytest.mark.django_db
+class TestGallery:
+    def test_populate_and_clear(self):
+        """Test that synthetic galleries are created in bulk and fully removed"""
+        User.objects.create_user(username="someone-else")
+
+        sample = populate_gallery(250, batch_size=100)
+
+        assert len(sample) == 100
+        assert Identity.objects.filter(user__username__in=sample).count() == 100
+        assert (
+            User.objects.filter(username__startswith=BENCH_USER_PREFIX).count() == 250
+        )
+
+        clear_gallery()
+
+        assert not Identity.objects.exists()
+        assert list(User.objects.values_list("username", flat=True)) == ["someone-else"]
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+class TestLatencyBenchmark:
+    def test_run_benchmark(self, settings, tmp_path):
+        """Test a full run; DEEPFACE_BENCH_ROWS and _OUTPUT size and keep it"""
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        rows = [int(n) for n in os.environ.get("DEEPFACE_BENCH_ROWS", "200").split(",")]
+        embedder = StubEmbedder(Identity.vector_dimensions)
+        set_embedder(embedder)
+
+        results = run_benchmark(rows, logins=3, images=4, batch_size=2)
+
+        assert [p["rows"] for p in results["populations"]] == sorted(rows)
+        for population in results["populations"]:
+            assert set(population["login"]) == LOGIN_STAGES
+            assert population["login"]["total"]["count"] == 3
+        stages = results["import"]["stages"]
+        assert {"decode", "detection", "embedding", "write_and_overhead"} <= set(stages)
+        assert results["environment"]["embedder"] == "stub"
+        assert get_embedder() is embedder
+        # Nothing is left behind, and the output is plain JSON
+        assert not User.objects.filter(username__startswith=BENCH_USER_PREFIX).exists()
+        output = os.environ.get("DEEPFACE_BENCH_OUTPUT")
+        if output:
+            with open(output, "w") as f:
+                json.dump(results, f, indent=2)
+        else:
+            json.dumps(results)
+
+    def test_command_writes_json(self, settings, tmp_path):
+        """Test that deepface_bench writes its results to --output"""
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        # Recall is measured in NumPy, so any pgvector version will do
+        settings.DEEPFACE_VECTOR_STORE = "numpy"
+        output = tmp_path / "bench.json"
+
+        call_command(
+            "deepface_bench",
+            rows="50",
+            logins=2,
+            images=0,
+            recall="5,50",
+            output=str(output),
+            stdout=io.StringIO(),
+        )
+
+        results = json.loads(output.read_text())
+        assert results["populations"][0]["rows"] == 50
+        assert "import" not in results
+        recall = results["populations"][0]["recall"]["candidates"]
+        assert recall["50"]["recall"] == 1.0
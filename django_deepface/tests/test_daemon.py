@@ -0,0 +1,89 @@
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+from django.urls import reverse
+
+from django_deepface.daemon import InferenceServer, RemoteEmbedder, RemoteInferenceError
+from django_deepface.embedder import FaceEmbedder, get_embedder
+from django_deepface.models import Identity
+
+TEST_IMAGE = Path(__file__).parent / "test_face.webp"
+
+
+@pytest.fixture
+def daemon(mock_deepface, settings):
+    """A daemon serving from a thread on a temporary socket."""
+    # Unix socket paths are limited to ~100 characters, so avoid tmp_path
+    with tempfile.TemporaryDirectory() as directory:
+        address = str(Path(directory) / "deepface.sock")
+        settings.DEEPFACE_DAEMON_SOCKET = address
+        embedder = FaceEmbedder.from_settings()
+        embedder.load()
+        server = InferenceServer(embedder, address, max_batch_size=8, max_wait_ms=300)
+        server.listen()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        thread.join(timeout=5)
+
+
+class TestInferenceDaemon:
+    def test_get_embedder_uses_daemon(self, daemon):
+        """Test that setting DEEPFACE_DAEMON_SOCKET switches to the client"""
+        embedder = get_embedder()
+
+        assert isinstance(embedder, RemoteEmbedder)
+        assert embedder.load() == 0.0
+        assert embedder.is_ready
+
+    def test_represent_round_trip(self, daemon):
+        """Test that images sent by path or array are embedded remotely"""
+        embedder = get_embedder()
+
+        by_path = embedder.represent(str(TEST_IMAGE))
+        by_array = embedder.represent(np.zeros((32, 32, 3), dtype=np.uint8))
+
+        assert len(by_path) == Identity.vector_dimensions
+        assert by_array == by_path
+
+    def test_concurrent_requests_share_a_batch(self, daemon, mock_deepface):
+        """Test that requests arriving together are embedded in one pass"""
+        embedder = get_embedder()
+        image = np.zeros((32, 32, 3), dtype=np.uint8)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: embedder.represent(image), range(4)))
+
+        assert len(results) == 4
+        assert max(mock_deepface["forward_passes"]) > 1
+        assert daemon.status()["daemon"]["represented"] == 4
+
+    def test_errors_are_sent_back(self, daemon):
+        """Test that a failed detection raises in the client, not the daemon"""
+        embedder = get_embedder()
+
+        with pytest.raises(RemoteInferenceError, match="could not be detected"):
+            embedder.represent(np.zeros((2, 2, 3), dtype=np.uint8))
+        # The connection is still usable afterwards
+        assert len(embedder.represent(np.zeros((32, 32, 3), dtype=np.uint8)))
+
+    def test_readiness_reports_daemon(self, daemon, client):
+        """Test that the readiness endpoint reflects the daemon's state"""
+        response = client.get(reverse("django_deepface:readiness"))
+
+        assert response.status_code == 200
+        assert response.json()["daemon"]["socket"] == daemon.address
+
+    def test_daemon_down_is_not_ready(self, settings, client):
+        """Test that a missing daemon makes the worker report 503"""
+        settings.DEEPFACE_DAEMON_SOCKET = "/nonexistent/deepface.sock"
+
+        response = client.get(reverse("django_deepface:readiness"))
+
+        assert response.status_code == 503
+        assert response.json()["error"]
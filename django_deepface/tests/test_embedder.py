@@ -0,0 +1,314 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+
+from django_deepface.embedder import (
+    DisabledEmbedder,
+    InferenceUnavailableError,
+    get_embedder,
+    is_serving_process,
+    set_embedder,
+    warm_up,
+)
+from django_deepface.models import EnrollmentJob, Identity
+
+# Imports the whole web surface and reports which heavy modules it loaded
+IMPORT_CHECK = """
+import sys
+import django
+django.setup()
+from django.urls import resolve
+import django_deepface.admin
+resolve("/login/")
+print(sorted({"deepface", "tensorflow", "cv2"} & set(sys.modules)))
+"""
+
+
+@pytest.fixture
+def represent_calls(monkeypatch):
+    calls = []
+
+    def mock_represent(*args, **kwargs):
+        calls.append(kwargs)
+        return [{"embedding": np.ones(Identity.vector_dimensions).tolist()}]
+
+    monkeypatch.setattr("deepface.DeepFace.represent", mock_represent)
+    return calls
+
+
+class TestFaceEmbedder:
+    def test_get_embedder_is_shared(self):
+        """Test that every caller gets the same process-wide embedder"""
+        assert get_embedder() is get_embedder()
+
+    def test_embedder_uses_settings(self, settings):
+        """Test that the embedder is built from the DEEPFACE_* settings"""
+        settings.DEEPFACE_MODEL = "Facenet"
+        settings.DEEPFACE_DETECTOR = "opencv"
+
+        embedder = get_embedder()
+
+        assert embedder.deepface_settings["model_name"] == "Facenet"
+        assert embedder.deepface_settings["detector_backend"] == "opencv"
+
+    def test_warm_up_loads_once(self, represent_calls):
+        """Test that the model is only warmed up once per process"""
+        warm_up()
+        warm_up()
+
+        assert len(represent_calls) == 1
+        assert represent_calls[0]["enforce_detection"] is False
+        assert get_embedder().is_ready
+        assert get_embedder().warmup_seconds is not None
+
+    @pytest.mark.parametrize(
+        "argv, serving",
+        [
+            (["manage.py", "migrate"], False),
+            (["/usr/bin/django-admin", "collectstatic"], False),
+            (["/venv/lib/django/__main__.py", "makemigrations"], False),
+            (["manage.py", "deepface_worker"], False),
+            (["manage.py", "runserver"], True),
+            (["/venv/bin/gunicorn", "mysite.wsgi"], True),
+            (["/venv/bin/uvicorn", "mysite.asgi:application"], True),
+        ],
+    )
+    def test_serving_processes(self, argv, serving):
+        """Test that management commands other than runserver are not serving"""
+        assert is_serving_process(argv) is serving
+
+    def test_ready_skips_warm_up_in_commands(self, settings, monkeypatch):
+        """Test that DEEPFACE_WARMUP only starts the thread in serving processes"""
+        started = []
+        monkeypatch.setattr(
+            "django_deepface.embedder.warm_up_in_background",
+            lambda: started.append(True),
+        )
+        settings.DEEPFACE_WARMUP = True
+        config = apps.get_app_config("django_deepface")
+
+        monkeypatch.setattr("sys.argv", ["manage.py", "migrate"])
+        config.ready()
+        assert started == []
+
+        monkeypatch.setattr("sys.argv", ["manage.py", "runserver"])
+        config.ready()
+        assert started == [True]
+
+    def test_represent_warms_up_lazily(self, represent_calls):
+        """Test that the first represent call loads the model first"""
+        embedding = get_embedder().represent("face.jpg")
+
+        assert len(embedding) == Identity.vector_dimensions
+        assert len(represent_calls) == 2  # warm-up + the real call
+        get_embedder().represent("face.jpg")
+        assert len(represent_calls) == 3
+
+    def test_failed_warm_up_is_reported(self, monkeypatch):
+        """Test that a warm-up failure leaves the embedder not ready"""
+
+        def mock_represent(*args, **kwargs):
+            raise RuntimeError("weights missing")
+
+        monkeypatch.setattr("deepface.DeepFace.represent", mock_represent)
+
+        with pytest.raises(RuntimeError):
+            warm_up()
+
+        state = get_embedder().readiness()
+        assert state["ready"] is False
+        assert state["error"] == "weights missing"
+
+    def test_warm_up_checks_dimensions(self, settings, monkeypatch):
+        """Test that a model returning embeddings of another length is refused"""
+        settings.DEEPFACE_MODEL = "Facenet"
+        monkeypatch.setattr(
+            "deepface.DeepFace.represent",
+            lambda *args, **kwargs: [{"embedding": [1.0] * 4096}],
+        )
+
+        with pytest.raises(ImproperlyConfigured, match="expected 128"):
+            warm_up()
+        assert not get_embedder().is_ready
+
+
+@pytest.fixture
+def cascade(settings, represent_calls, monkeypatch):
+    """A yunet -> retinaface cascade where yunet finds faces in 'clear' images."""
+    settings.DEEPFACE_DETECTOR_CASCADE = ["yunet", "retinaface"]
+    settings.DEEPFACE_CASCADE_MIN_CONFIDENCE = {"yunet": 0.8}
+    detections = []
+
+    def mock_extract_faces(img, detector_backend, **kwargs):
+        detections.append(detector_backend)
+        clear = img.shape[0] > 32
+        confidence = 0.95 if detector_backend == "retinaface" or clear else 0.3
+        return [{"face": np.zeros((4, 4, 3)), "confidence": confidence}]
+
+    monkeypatch.setattr("deepface.DeepFace.extract_faces", mock_extract_faces)
+    return detections
+
+
+class TestDetectorCascade:
+    def test_cheap_detector_hit_skips_fallback(self, cascade):
+        """Test that a confident cheap detection never runs the expensive one"""
+        embedder = get_embedder()
+        embedder.load()
+        cascade.clear()
+
+        embedder.extract_face(np.zeros((64, 64, 3), dtype=np.uint8))
+
+        assert cascade == ["yunet"]
+
+    def test_low_confidence_falls_back(self, cascade):
+        """Test that an unconfident cheap detection falls back to retinaface"""
+        embedder = get_embedder()
+        embedder.load()
+        cascade.clear()
+
+        embedding = embedder.represent(np.zeros((16, 16, 3), dtype=np.uint8))
+
+        assert cascade == ["yunet", "retinaface"]
+        assert len(embedding) == Identity.vector_dimensions
+
+    def test_hit_rates_are_reported(self, cascade):
+        """Test that per-stage hit rates are exposed for tuning"""
+        embedder = get_embedder()
+        embedder.extract_face(np.zeros((64, 64, 3), dtype=np.uint8))
+        embedder.extract_face(np.zeros((16, 16, 3), dtype=np.uint8))
+
+        stats = embedder.readiness()["detector_cascade"]
+
+        assert stats["yunet"] == {"attempts": 2, "hits": 1, "hit_rate": 0.5}
+        assert stats["retinaface"]["hit_rate"] == 1.0
+
+    def test_warm_up_loads_every_stage(self, cascade):
+        """Test that warm-up builds every detector in the cascade"""
+        warm_up()
+
+        assert cascade == ["yunet", "retinaface"]
+
+
+class TestReadinessView:
+    def test_readiness_cold(self, client):
+        """Test that a cold worker reports 503"""
+        response = client.get(reverse("django_deepface:readiness"))
+
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+
+    def test_readiness_warm(self, client, represent_calls):
+        """Test that a warm worker reports 200 with its warm-up time"""
+        warm_up()
+        response = client.get(reverse("django_deepface:readiness"))
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["ready"] is True
+        assert data["warmup_seconds"] is not None
+
+
+@pytest.fixture
+def inference_free(settings):
+    settings.DEEPFACE_LOCAL_INFERENCE = False
+    settings.DEEPFACE_DAEMON_SOCKET = None
+
+
+class TestInferenceFreeMode:
+    def test_web_surface_does_not_import_deepface(self):
+        """Test that URLs, views and admin load without DeepFace or TensorFlow"""
+        root = Path(__file__).resolve().parents[2]
+        env = {
+            **os.environ,
+            "PYTHONPATH": str(root),
+            "DJANGO_SETTINGS_MODULE": "django_deepface.tests.settings",
+        }
+
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_CHECK],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        assert result.stdout.strip() == "[]"
+
+    def test_embedder_refuses_faces(self, inference_free):
+        """Test that an inference-free process never runs the model"""
+        embedder = get_embedder()
+
+        assert isinstance(embedder, DisabledEmbedder)
+        assert warm_up() == 0.0
+        with pytest.raises(InferenceUnavailableError):
+            embedder.represent(np.zeros((4, 4, 3)))
+
+    @pytest.mark.django_db
+    def test_face_login_points_to_password(
+        self, client, inference_free, real_face_image, received
+    ):
+        """Test that face login is refused with a message, and the node is ready"""
+        User.objects.create_user(username="testuser", password="testpass123")
+
+        response = client.post(
+            reverse("django_deepface:login"),
+            {
+                "username": "testuser",
+                "use_face_login": "on",
+                "face_image": real_face_image,
+            },
+        )
+
+        messages = [str(m) for m in get_messages(response.wsgi_request)]
+        assert any("use password login" in m for m in messages)
+        assert received[-1]["reason"] == "unavailable"
+        assert client.get(reverse("django_deepface:readiness")).status_code == 200
+
+    @pytest.mark.django_db
+    def test_enrollment_is_queued(
+        self, client, inference_free, real_face_image, settings, tmp_path
+    ):
+        """Test that uploads are left to deepface_worker on another host"""
+        settings.MEDIA_ROOT = str(tmp_path)
+        User.objects.create_user(username="testuser", password="testpass123")
+        client.login(username="testuser", password="testpass123")
+
+        client.post(reverse("django_deepface:profile"), {"image": real_face_image})
+
+        identity = Identity.objects.get(user__username="testuser")
+        assert identity.embedding is None
+        assert EnrollmentJob.objects.filter(identity=identity).exists()
+        with pytest.raises(CommandError, match="DEEPFACE_LOCAL_INFERENCE"):
+            call_command("deepface_worker")
+
+    @pytest.mark.django_db
+    def test_refused_enrollment_is_queued(
+        self, client, user, real_face_image, settings, tmp_path
+    ):
+        """Test that an upload the embedder refuses is queued, not rejected"""
+        settings.MEDIA_ROOT = str(tmp_path)
+        set_embedder(DisabledEmbedder())
+        client.login(username="testuser", password="testpass123")
+
+        response = client.post(
+            reverse("django_deepface:profile"), {"image": real_face_image}
+        )
+
+        identity = Identity.objects.get(user=user)
+        assert identity.embedding is None
+        assert EnrollmentJob.objects.filter(identity=identity).exists()
+        messages = [str(m) for m in get_messages(response.wsgi_request)]
+        assert messages == [
+            "Face image uploaded. It will be ready for face login in a moment."
+        ]
@@ -0,0 +1,122 @@
+import io
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from django_deepface.enrollment import claim_jobs, enqueue_enrollment, process_jobs
+from django_deepface.models import EnrollmentJob, Identity
+
+
+@pytest.fixture
+def async_enrollment(settings, tmp_path):
+    settings.DEEPFACE_ASYNC_ENROLLMENT = True
+    settings.DEEPFACE_ENROLLMENT_MAX_ATTEMPTS = 2
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def upload(client, real_face_image):
+    client.login(username="testuser", password="testpass123")
+    return client.post(reverse("django_deepface:profile"), {"image": real_face_image})
+
+
+@pytest.mark.django_db
+class TestAsyncEnrollment:
+    def test_upload_returns_pending(
+        self, client, user, real_face_image, async_enrollment, mock_deepface
+    ):
+        """Test that the upload is stored without running the model"""
+        upload(client, real_face_image)
+
+        identity = Identity.objects.get(user=user)
+        assert identity.embedding is None
+        assert identity.enrollment_status == EnrollmentJob.Status.PENDING
+        assert mock_deepface["forward_passes"] == []
+
+        status = client.get(reverse("django_deepface:enrollment_status")).json()
+        assert status["pending"] == 1
+        assert status["images"][0]["status"] == "pending"
+
+    def test_worker_fills_in_embeddings(
+        self, client, user, real_face_image, async_enrollment, mock_deepface
+    ):
+        """Test that deepface_worker embeds queued uploads in one batch"""
+        for _ in range(3):
+            real_face_image.seek(0)
+            upload(client, real_face_image)
+
+        out = io.StringIO()
+        call_command("deepface_worker", "--once", stdout=out)
+
+        assert mock_deepface["forward_passes"] == [3]
+        assert not Identity.objects.filter(embedding__isnull=True).exists()
+        assert set(EnrollmentJob.objects.values_list("status", flat=True)) == {"done"}
+        assert "3 embedded, 0 failed" in out.getvalue()
+        status = client.get(reverse("django_deepface:enrollment_status")).json()
+        assert status["pending"] == 0
+
+    def test_failures_retry_then_give_up(
+        self, client, user, real_face_image, async_enrollment, mock_deepface
+    ):
+        """Test that a failing job is retried with backoff, then marked failed"""
+        upload(client, real_face_image)
+        mock_deepface["broken"] = True
+
+        process_jobs(claim_jobs(10))
+        job = EnrollmentJob.objects.get()
+        assert job.status == EnrollmentJob.Status.PENDING
+        assert job.attempts == 1
+        assert job.run_after > timezone.now()
+        assert "could not be detected" in job.error
+        # Not due again until the backoff has passed
+        assert claim_jobs(10) == []
+
+        EnrollmentJob.objects.update(run_after=timezone.now())
+        process_jobs(claim_jobs(10))
+        job.refresh_from_db()
+        assert job.status == EnrollmentJob.Status.FAILED
+        assert job.identity.enrollment_status == "failed"
+
+    def test_stale_jobs_are_reclaimed(self, user, async_enrollment, settings):
+        """Test that a job left processing by a dead worker is picked up again"""
+        identity = Identity(user=user, image_number=1, image="faces/a.jpg")
+        enqueue_enrollment(identity)
+        assert len(claim_jobs(10)) == 1
+        assert claim_jobs(10) == []
+
+        settings.DEEPFACE_ENROLLMENT_LOCK_TIMEOUT = 60
+        EnrollmentJob.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+
+        (job,) = claim_jobs(10)
+        assert job.attempts == 2
+
+    def test_stale_jobs_out_of_attempts_fail(self, user, async_enrollment, settings):
+        """Test that a job that keeps killing its worker is marked failed"""
+        identity = Identity(user=user, image_number=1, image="faces/a.jpg")
+        enqueue_enrollment(identity)
+        settings.DEEPFACE_ENROLLMENT_LOCK_TIMEOUT = 60
+        EnrollmentJob.objects.update(
+            status=EnrollmentJob.Status.PROCESSING,
+            attempts=2,
+            locked_at=timezone.now() - timedelta(minutes=5),
+        )
+
+        assert claim_jobs(10) == []
+        job = EnrollmentJob.objects.get()
+        assert job.status == EnrollmentJob.Status.FAILED
+        assert job.attempts == 2
+        assert "worker died" in job.error
+        assert Identity.objects.get().enrollment_status == "failed"
+
+    def test_deleted_identity_is_skipped(
+        self, client, user, real_face_image, async_enrollment, mock_deepface
+    ):
+        """Test that an image deleted while queued does not break the worker"""
+        upload(client, real_face_image)
+        jobs = claim_jobs(10)
+        Identity.objects.all().delete()
+
+        assert process_jobs(jobs) == (1, 0)
+        assert not EnrollmentJob.objects.exists()
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+from django.core.checks import run_checks
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from django_deepface.face_templates import (
+    rebuild_template,
+    unpack_embeddings,
+    verify,
+)
+from django_deepface.models import FaceTemplate, Identity
+from django_deepface.tests.conftest import unit_vector
+
+
+def enroll(user, number, embedding):
+    return Identity.objects.create(
+        user=user,
+        image_number=number,
+        image=f"faces/{user.username}{number}.jpg",
+        embedding=embedding,
+    )
+
+
+@pytest.mark.django_db
+class TestFaceTemplates:
+    def test_template_follows_identity_changes(self, user, settings):
+        """Test that saving and deleting images keeps the template current"""
+        settings.DEEPFACE_TEMPLATES = "mean"
+        first = enroll(user, 1, unit_vector(0))
+        enroll(user, 2, unit_vector(1))
+
+        template = FaceTemplate.objects.get(user=user)
+        assert template.image_count == 2
+        assert np.allclose(template.embedding, unit_vector(0, 1), atol=1e-6)
+        packed = unpack_embeddings(
+            template.packed_embeddings, Identity.vector_dimensions
+        )
+        assert packed.shape == (2, Identity.vector_dimensions)
+
+        first.delete()
+        assert FaceTemplate.objects.get(user=user).image_count == 1
+
+        Identity.objects.filter(user=user).delete()
+        assert not FaceTemplate.objects.filter(user=user).exists()
+
+    def test_templates_not_maintained_when_disabled(self, user, settings):
+        """Test that nothing is written unless DEEPFACE_TEMPLATES is set"""
+        settings.DEEPFACE_TEMPLATES = None
+        enroll(user, 1, unit_vector(0))
+
+        assert not FaceTemplate.objects.exists()
+
+    def test_invalid_mode_is_rejected(self, user, settings):
+        """Test that an unknown template mode raises a clear error"""
+        settings.DEEPFACE_TEMPLATES = "median"
+
+        with pytest.raises(ValueError, match="DEEPFACE_TEMPLATES"):
+            verify("testuser", unit_vector(0))
+
+    @pytest.mark.parametrize("mode", [None, "mean", "packed"])
+    def test_verify_returns_user_and_distance(self, user, settings, mode):
+        """Test that every mode finds the user and how close the face is"""
+        settings.DEEPFACE_TEMPLATES = mode
+        enroll(user, 1, unit_vector(0))
+        enroll(user, 2, unit_vector(0))
+
+        matched_user, distance = verify("testuser", unit_vector(0))
+
+        assert matched_user == user
+        assert distance == pytest.approx(0.0, abs=1e-6)
+        assert verify("nobody", unit_vector(0)) is None
+
+    @pytest.mark.parametrize("mode", [None, "packed"])
+    @pytest.mark.parametrize("distance", ["l2", "inner_product"])
+    def test_verify_with_other_distances(self, user, settings, mode, distance):
+        """Test that an enrolled face of any length matches itself exactly"""
+        settings.DEEPFACE_DISTANCE = distance
+        settings.DEEPFACE_TEMPLATES = mode
+        face = (3 * np.asarray(unit_vector(0))).tolist()
+        enroll(user, 1, face)
+
+        _, found = verify("testuser", face)
+
+        expected = 0.0 if distance == "l2" else -9.0
+        assert found == pytest.approx(expected, abs=1e-4)
+
+    @pytest.mark.parametrize("distance", ["l2", "inner_product"])
+    def test_mean_templates_need_cosine(self, user, settings, distance):
+        """Test that mean templates are refused with non-cosine distances"""
+        settings.DEEPFACE_DISTANCE = distance
+        settings.DEEPFACE_TEMPLATES = "mean"
+
+        with pytest.raises(ValueError, match='DEEPFACE_DISTANCE = "cosine"'):
+            verify("testuser", unit_vector(0))
+        assert "django_deepface.E005" in {m.id for m in run_checks()}
+
+        settings.DEEPFACE_TEMPLATES = "packed"
+        assert "django_deepface.E005" not in {m.id for m in run_checks()}
+
+    def test_packed_mode_uses_closest_image(self, user, settings):
+        """Test that packed templates match on the nearest image, not the mean"""
+        settings.DEEPFACE_TEMPLATES = "packed"
+        enroll(user, 1, unit_vector(0))
+        enroll(user, 2, unit_vector(1))
+
+        _, distance = verify("testuser", unit_vector(1))
+
+        assert distance == pytest.approx(0.0, abs=1e-6)
+
+    def test_mean_mode_is_one_query(self, user, settings):
+        """Test that verification loads the template and the user together"""
+        settings.DEEPFACE_TEMPLATES = "mean"
+        enroll(user, 1, unit_vector(0))
+
+        with CaptureQueriesContext(connection) as queries:
+            matched_user, _ = verify("testuser", unit_vector(0))
+            assert matched_user.username == "testuser"
+
+        selects = [q for q in queries if q["sql"].lstrip().startswith("SELECT")]
+        # pgvector adds one for search_parameters' set_config
+        assert len(selects) == (2 if connection.vendor == "postgresql" else 1)
+
+    def test_rebuild_command_backfills(self, user, settings):
+        """Test that deepface_templates builds templates for existing images"""
+        settings.DEEPFACE_TEMPLATES = None
+        enroll(user, 1, unit_vector(0))
+        settings.DEEPFACE_TEMPLATES = "mean"
+
+        call_command("deepface_templates")
+
+        assert FaceTemplate.objects.get(user=user).image_count == 1
+        assert rebuild_template(user.id).image_count == 1
@@ -0,0 +1,136 @@
+import io
+import json
+
+import numpy as np
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from django_deepface.gallery import (
+    GalleryMismatchError,
+    export_gallery,
+    import_gallery,
+    read_header,
+)
+from django_deepface.models import Identity
+from django_deepface.utils import get_embedding_version
+
+
+def random_embedding(seed):
+    return np.random.default_rng(seed).random(Identity.vector_dimensions)
+
+
+@pytest.fixture
+def gallery(db):
+    """Two users with two and one embedded images, plus one still pending."""
+    alice = User.objects.create_user(username="alice")
+    bob = User.objects.create_user(username="bob")
+    for user, number, seed in ((alice, 1, 1), (alice, 2, 2), (bob, 1, 3)):
+        Identity.objects.create(
+            user=user,
+            image_number=number,
+            image=f"faces/{user.username}_{number}.jpg",
+            embedding=random_embedding(seed),
+        )
+    Identity.objects.create(user=bob, image_number=2, image="faces/bob_2.jpg")
+    return {"alice": alice, "bob": bob}
+
+
+@pytest.mark.django_db
+class TestExportEmbeddings:
+    def test_writes_matrix_rows_and_header(self, gallery, tmp_path):
+        """Test that embedded rows are exported as a memory-mappable matrix"""
+        rows = export_gallery(tmp_path / "export", chunk_size=2)
+
+        assert rows == 3
+        matrix = np.load(tmp_path / "export" / "embeddings.npy", mmap_mode="r")
+        assert matrix.shape == (3, Identity.vector_dimensions)
+        assert matrix.dtype == np.float32
+        np.testing.assert_allclose(matrix[2], random_embedding(3), rtol=1e-6)
+        lines = (tmp_path / "export" / "identities.jsonl").read_text().splitlines()
+        assert json.loads(lines[0]) == {
+            "username": "alice",
+            "image_number": 1,
+            "image": "faces/alice_1.jpg",
+        }
+        header = read_header(tmp_path / "export")
+        assert header["embedding_version"] == get_embedding_version()
+        assert header["dimensions"] == Identity.vector_dimensions
+
+    def test_float16(self, gallery, tmp_path):
+        """Test that --dtype float16 halves the matrix"""
+        call_command(
+            "export_embeddings",
+            str(tmp_path / "export"),
+            dtype="float16",
+            stdout=io.StringIO(),
+        )
+
+        matrix = np.load(tmp_path / "export" / "embeddings.npy")
+        assert matrix.dtype == np.float16
+        header = json.loads((tmp_path / "export" / "header.json").read_text())
+        assert header["dtype"] == "float16"
+
+    def test_refuses_to_overwrite(self, gallery, tmp_path):
+        """Test that an existing export is not overwritten"""
+        export_gallery(tmp_path / "export")
+
+        with pytest.raises(CommandError, match="already contains an export"):
+            call_command("export_embeddings", str(tmp_path / "export"))
+
+
+@pytest.mark.django_db
+class TestImportEmbeddings:
+    def test_round_trip(self, gallery, tmp_path):
+        """Test that an export can be imported into an empty gallery"""
+        export_gallery(tmp_path / "export")
+        Identity.objects.all().delete()
+        out = io.StringIO()
+
+        call_command(
+            "import_embeddings", str(tmp_path / "export"), chunk_size=2, stdout=out
+        )
+
+        assert "Imported 3 embeddings" in out.getvalue()
+        alice = Identity.objects.get(user__username="alice", image_number=2)
+        np.testing.assert_allclose(alice.embedding, random_embedding(2), rtol=1e-6)
+        assert alice.image.name == "faces/alice_2.jpg"
+
+    def test_existing_images_and_missing_users_are_skipped(self, gallery, tmp_path):
+        """Test that taken image numbers and unknown users are not imported"""
+        export_gallery(tmp_path / "export")
+        Identity.objects.filter(user__username="alice", image_number=2).delete()
+        gallery["bob"].delete()
+
+        counts = import_gallery(tmp_path / "export")
+
+        assert counts == {"imported": 1, "skipped": 1, "missing_users": 1}
+
+    def test_create_users(self, gallery, tmp_path):
+        """Test that --create-users creates users missing from this database"""
+        export_gallery(tmp_path / "export")
+        User.objects.all().delete()
+
+        counts = import_gallery(tmp_path / "export", create_users=True)
+
+        assert counts["imported"] == 3
+        assert not User.objects.get(username="bob").has_usable_password()
+
+    def test_refuses_other_model(self, gallery, tmp_path, settings):
+        """Test that embeddings from another model configuration are refused"""
+        export_gallery(tmp_path / "export")
+        settings.DEEPFACE_MODEL = "Facenet512"
+
+        with pytest.raises(GalleryMismatchError, match="'Facenet512/"):
+            import_gallery(tmp_path / "export")
+        with pytest.raises(CommandError, match="different configuration"):
+            call_command("import_embeddings", str(tmp_path / "export"))
+
+    def test_refuses_other_detector(self, gallery, tmp_path, settings):
+        """Test that the detector is part of the compared embedding version"""
+        export_gallery(tmp_path / "export")
+        settings.DEEPFACE_DETECTOR_CASCADE = ["yunet", "retinaface"]
+
+        with pytest.raises(GalleryMismatchError, match="yunet\\+retinaface"):
+            read_header(tmp_path / "export")
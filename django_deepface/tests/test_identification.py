@@ -0,0 +1,95 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from django_deepface.models import Identity
+from django_deepface.search import identify, nearest_users
+from django_deepface.tests.conftest import unit_vector
+
+
+@pytest.fixture
+def gallery(db):
+    """Three users whose faces point in different directions."""
+    users = {}
+    for i, username in enumerate(("alice", "bob", "carol")):
+        user = User.objects.create_user(username=username, password="pass123")
+        Identity.objects.create(
+            user=user,
+            image_number=1,
+            image=f"faces/{username}.jpg",
+            embedding=unit_vector(i),
+        )
+        users[username] = user
+    return users
+
+
+@pytest.mark.django_db
+class TestIdentify:
+    def test_nearest_users_ranks_distinct_users(self, gallery):
+        """Test that each user appears once, ranked by their closest image"""
+        Identity.objects.create(
+            user=gallery["alice"],
+            image_number=2,
+            image="faces/alice2.jpg",
+            embedding=unit_vector(0),
+        )
+
+        candidates = nearest_users(unit_vector(0), k=2)
+
+        assert candidates[0][0] == gallery["alice"].id
+        assert len({user_id for user_id, _ in candidates}) == 2
+        assert candidates[0][1] == pytest.approx(0.0)
+
+    def test_identify_accepts_clear_winner(self, gallery):
+        """Test that a close, unambiguous match is accepted"""
+        user_id, candidates = identify(unit_vector(1))
+
+        assert user_id == gallery["bob"].id
+        assert len(candidates) == 3
+
+    def test_identify_refuses_lookalikes(self, gallery, settings):
+        """Test that a match too close to the runner-up is refused"""
+        settings.DEEPFACE_IDENTIFICATION_MARGIN = 0.05
+        Identity.objects.filter(user=gallery["carol"]).update(embedding=unit_vector(1))
+
+        user_id, _ = identify(unit_vector(1))
+
+        assert user_id is None
+
+    def test_identify_refuses_above_threshold(self, gallery):
+        """Test that nobody is matched when every user is too far away"""
+        user_id, _ = identify(unit_vector(3))
+
+        assert user_id is None
+
+
+@pytest.mark.django_db
+class TestIdentificationLogin:
+    def test_login_without_username(
+        self, client, gallery, real_face_image, monkeypatch, settings
+    ):
+        """Test that face login without a username identifies the user"""
+        settings.DEEPFACE_IDENTIFICATION = True
+
+        def mock_represent(*args, **kwargs):
+            return [{"embedding": unit_vector(2)}]
+
+        monkeypatch.setattr("deepface.DeepFace.represent", mock_represent)
+
+        response = client.post(
+            reverse("django_deepface:login"),
+            {"username": "", "use_face_login": "on", "face_image": real_face_image},
+        )
+
+        assert response.status_code == 302
+        assert int(client.session["_auth_user_id"]) == gallery["carol"].id
+
+    def test_username_required_when_disabled(self, client, gallery, real_face_image):
+        """Test that a username is still required unless identification is on"""
+        response = client.post(
+            reverse("django_deepface:login"),
+            {"username": "", "use_face_login": "on", "face_image": real_face_image},
+        )
+
+        assert response.status_code == 200
+        assert "_auth_user_id" not in client.session
@@ -0,0 +1,165 @@
+import asyncio
+import threading
+
+import pytest
+from django.contrib.messages import get_messages
+from django.urls import reverse
+
+from django_deepface.inference import (
+    InferenceExecutor,
+    InferenceOverloadedError,
+    get_inference_executor,
+)
+from django_deepface.models import Identity
+
+
+@pytest.fixture
+def blocked_executor(settings):
+    """A one-thread executor with no queue, kept busy until the test ends."""
+    settings.DEEPFACE_INFERENCE_WORKERS = 1
+    settings.DEEPFACE_INFERENCE_QUEUE = 0
+    executor = get_inference_executor()
+    release = threading.Event()
+    executor.submit(release.wait)
+    yield executor
+    release.set()
+
+
+class TestInferenceExecutor:
+    def test_runs_and_reports_wait(self):
+        """Test that jobs run on the executor and their wait time is recorded"""
+        executor = InferenceExecutor(workers=2, max_queue=2)
+
+        assert executor.submit(sum, [1, 2, 3]).result(timeout=5) == 6
+        stats = executor.stats()
+        assert stats["completed"] == 1
+        assert stats["queued"] == 0
+        assert stats["mean_wait_seconds"] >= 0.0
+        executor.shutdown()
+
+    def test_sheds_when_queue_full(self):
+        """Test that jobs beyond workers + max_queue are refused immediately"""
+        executor = InferenceExecutor(workers=1, max_queue=1)
+        release = threading.Event()
+        running = executor.submit(release.wait)
+        waiting = executor.submit(release.wait)
+
+        with pytest.raises(InferenceOverloadedError):
+            executor.submit(release.wait)
+        assert executor.stats()["rejected"] == 1
+
+        release.set()
+        running.result(timeout=5)
+        waiting.result(timeout=5)
+        # Slots are released once jobs finish
+        assert executor.submit(sum, [1]).result(timeout=5) == 1
+        executor.shutdown()
+
+    def test_cancelled_jobs_give_back_their_slot(self):
+        """Test that a job cancelled while queued frees its slot and queue count"""
+        executor = InferenceExecutor(workers=1, max_queue=1)
+        release = threading.Event()
+        running = executor.submit(release.wait)
+        waiting = executor.submit(release.wait)
+
+        assert waiting.cancel()
+        stats = executor.stats()
+        assert (stats["queued"], stats["cancelled"]) == (0, 1)
+        # The freed slot takes a new job
+        accepted = executor.submit(sum, [2])
+
+        release.set()
+        running.result(timeout=5)
+        assert accepted.result(timeout=5) == 2
+        assert executor.stats()["completed"] == 2
+        executor.shutdown()
+
+    def test_cancelled_caller_frees_the_queue(self):
+        """Test that a request task cancelled while waiting does not leak a slot"""
+        executor = InferenceExecutor(workers=1, max_queue=1)
+        release = threading.Event()
+
+        async def scenario():
+            running = asyncio.ensure_future(executor.run(release.wait))
+            waiting = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+            assert executor.stats()["queued"] == 0
+            release.set()
+            await running
+            return await asyncio.gather(executor.run(sum, [1]), executor.run(sum, [2]))
+
+        assert asyncio.run(scenario()) == [1, 2]
+        executor.shutdown()
+
+    def test_shutdown_frees_queued_slots(self):
+        """Test that jobs cancelled by shutdown are not left counted as queued"""
+        executor = InferenceExecutor(workers=1, max_queue=2)
+        release = threading.Event()
+        executor.submit(release.wait)
+        executor.submit(release.wait)
+
+        executor.shutdown()
+        release.set()
+
+        assert executor.stats()["queued"] == 0
+
+    def test_settings_size_the_executor(self, settings):
+        """Test that the shared executor follows DEEPFACE_INFERENCE_* settings"""
+        settings.DEEPFACE_INFERENCE_WORKERS = 3
+        settings.DEEPFACE_INFERENCE_QUEUE = 7
+
+        stats = get_inference_executor().stats()
+
+        assert (stats["workers"], stats["max_queue"]) == (3, 7)
+        assert get_inference_executor() is get_inference_executor()
+
+
+@pytest.mark.django_db
+class TestOverloadShedding:
+    def test_face_login_falls_back_to_password(
+        self, client, user, real_face_image, blocked_executor, received
+    ):
+        """Test that a full queue fails fast and points to password login"""
+        response = client.post(
+            reverse("django_deepface:login"),
+            {
+                "username": "testuser",
+                "use_face_login": "on",
+                "face_image": real_face_image,
+            },
+        )
+
+        assert response.status_code == 200
+        messages = [str(m) for m in get_messages(response.wsgi_request)]
+        assert any("use password login" in m for m in messages)
+        assert blocked_executor.stats()["rejected"] == 1
+        (payload,) = received
+        assert (payload["stage"], payload["was_successful"]) == ("login", False)
+        assert payload["reason"] == "shed"
+
+    def test_profile_upload_is_shed(
+        self, client, user, real_face_image, blocked_executor, received
+    ):
+        """Test that enrollment is refused rather than queued when busy"""
+        client.login(username="testuser", password="testpass123")
+
+        response = client.post(
+            reverse("django_deepface:profile"), {"image": real_face_image}
+        )
+
+        assert response.status_code == 200
+        assert not Identity.objects.filter(user=user).exists()
+        messages = [str(m) for m in get_messages(response.wsgi_request)]
+        assert any("busy" in m for m in messages)
+        (payload,) = received
+        assert (payload["stage"], payload["reason"]) == ("register", "shed")
+
+    def test_readiness_reports_queue(self, client):
+        """Test that the readiness endpoint exposes queue depth and waits"""
+        inference = client.get(reverse("django_deepface:readiness")).json()["inference"]
+
+        assert inference["queued"] == 0
+        assert "mean_wait_seconds" in inference
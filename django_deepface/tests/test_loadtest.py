@@ -0,0 +1,155 @@
+import asyncio
+import io
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+
+from django_deepface.benchmark import StubEmbedder
+from django_deepface.embedder import get_embedder, set_embedder
+from django_deepface.loadtest import (
+    LOAD_USER_PREFIX,
+    classify,
+    load_frames,
+    plan_operations,
+    run_level,
+    run_load_test,
+    stage_means,
+)
+from django_deepface.models import Identity
+
+
+class TestHelpers:
+    def test_classify(self):
+        """Test that responses are sorted into ok, rejected, shed and error"""
+        assert classify("login", 302, b"") == "ok"
+        assert classify("login", 200, b"No match") == "rejected"
+        assert classify("login", 200, b"Face login is busy right now.") == "shed"
+        assert classify("enroll", 200, b"Face image uploaded successfully!") == "ok"
+        assert classify("enroll", 200, b"Maximum number of face images") == "rejected"
+        assert classify("enroll", 403, b"") == "error"
+
+    def test_plan_spreads_requests(self):
+        """Test that every request is assigned once, in the requested mix"""
+        plan = plan_operations(3, 100, enroll_ratio=0.5)
+
+        assert [len(operations) for operations in plan] == [34, 33, 33]
+        enrollments = sum(operations.count("enroll") for operations in plan)
+        assert 30 < enrollments < 70
+
+    def test_frames_from_directory(self, tmp_path):
+        """Test that image files are read in order and other files ignored"""
+        (tmp_path / "b.jpg").write_bytes(b"second")
+        (tmp_path / "a.png").write_bytes(b"first")
+        (tmp_path / "notes.txt").write_bytes(b"ignored")
+
+        (tmp_path / "empty").mkdir()
+
+        assert load_frames(str(tmp_path)) == [b"first", b"second"]
+        with pytest.raises(ValueError, match="No images"):
+            load_frames(str(tmp_path / "empty"))
+
+    def test_rates_count_errors_and_shedding_apart(self):
+        """Test that rejected and shed requests are not reported as errors"""
+
+        class ScriptedClient:
+            outcomes = iter(["ok", "rejected", "shed", "error", "ok", "shed"])
+
+            async def send(self, operation):
+                return next(self.outcomes)
+
+        level = asyncio.run(run_level([ScriptedClient()], 6, enroll_ratio=0))
+
+        login = level["operations"]["login"]
+        assert login["outcomes"] == {"ok": 2, "rejected": 1, "shed": 2, "error": 1}
+        assert login["error_rate"] == pytest.approx(1 / 6)
+        assert login["shed_rate"] == pytest.approx(2 / 6)
+
+    def test_stage_means_between_scrapes(self):
+        """Test that metrics scrapes are diffed into per-stage means"""
+        before = {("login", "embedding"): [1.0, 10.0]}
+        after = {("login", "embedding"): [1.5, 20.0], ("login", "decode"): [0.2, 4.0]}
+
+        assert stage_means(before, after) == {
+            "login": {
+                "embedding": {"count": 10, "mean_ms": pytest.approx(50.0)},
+                "decode": {"count": 4, "mean_ms": pytest.approx(50.0)},
+            }
+        }
+        assert stage_means(None, after) is None
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadTest:
+    def test_in_process(self, settings, tmp_path):
+        """Test a run through the ASGI handler with the stub embedder"""
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        User.objects.create_user(username="someone-else")
+        embedder = StubEmbedder(Identity.vector_dimensions)
+        set_embedder(embedder)
+
+        results = run_load_test([2, 4], requests=12, enroll_ratio=0.25)
+
+        assert [level["concurrency"] for level in results["levels"]] == [2, 4]
+        for level in results["levels"]:
+            operations = level["operations"]
+            count = sum(report["latency"]["count"] for report in operations.values())
+            assert count == 12
+            login = operations["login"]
+            assert login["outcomes"]["ok"] == login["latency"]["count"]
+            assert login["error_rate"] == 0
+            assert {"upload", "decode", "detection", "embedding"} <= set(
+                level["stages"]["login"]
+            )
+        assert results["environment"]["embedder"] == "stub"
+        assert get_embedder() is embedder
+        # Nothing is left behind, and the output is plain JSON
+        assert list(User.objects.values_list("username", flat=True)) == ["someone-else"]
+        assert not Identity.objects.exists()
+        json.dumps(results)
+
+    def test_over_http(self, settings, live_server):
+        """Test a run against a live server, CSRF and session cookies included"""
+        settings.DEEPFACE_METRICS = True
+        set_embedder(StubEmbedder(Identity.vector_dimensions))
+
+        results = run_load_test(
+            [3], requests=9, enroll_ratio=0.3, url=live_server.url, stub=False
+        )
+
+        (level,) = results["levels"]
+        login = level["operations"]["login"]
+        assert login["error_rate"] == 0
+        assert level["operations"]["enroll"]["error_rate"] == 0
+        # Read from the server's metrics endpoint
+        assert (
+            level["stages"]["login"]["embedding"]["count"]
+            == (login["latency"]["count"])
+        )
+        assert not User.objects.filter(username__startswith=LOAD_USER_PREFIX).exists()
+
+    def test_command_writes_json(self, settings, tmp_path):
+        """Test that deepface_loadtest reports each level and writes --output"""
+        settings.MEDIA_ROOT = str(tmp_path / "media")
+        output = tmp_path / "load.json"
+        out = io.StringIO()
+
+        call_command(
+            "deepface_loadtest",
+            concurrency="3",
+            requests=6,
+            output=str(output),
+            stdout=out,
+        )
+
+        assert "3 clients: 6 requests" in out.getvalue()
+        results = json.loads(output.read_text())
+        assert results["levels"][0]["operations"]["login"]["outcomes"]["ok"] == 6
+
+    def test_identify_needs_identification(self, settings):
+        """Test that --identify is refused while identification is off"""
+        settings.DEEPFACE_IDENTIFICATION = False
+
+        with pytest.raises(CommandError, match="DEEPFACE_IDENTIFICATION"):
+            call_command("deepface_loadtest", identify=True)
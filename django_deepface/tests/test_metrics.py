@@ -0,0 +1,179 @@
+import threading
+
+import numpy as np
+import pytest
+from django.urls import reverse
+
+from django_deepface.enrollment import claim_jobs, enqueue_enrollment, process_jobs
+from django_deepface.inference import get_inference_executor
+from django_deepface.metrics import Histogram, registry, render_metrics
+from django_deepface.models import Identity
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+@pytest.fixture
+def user(user):
+    """The shared user, with one enrolled face."""
+    Identity.objects.create(
+        user=user,
+        image_number=1,
+        image="faces/a.webp",
+        embedding=np.ones(Identity.vector_dimensions).tolist(),
+    )
+    return user
+
+
+@pytest.fixture
+def mock_represent(monkeypatch):
+    def mock_represent(img, **kwargs):
+        return [{"embedding": np.ones(Identity.vector_dimensions).tolist()}]
+
+    monkeypatch.setattr("deepface.DeepFace.represent", mock_represent)
+
+
+def face_login(client, real_face_image):
+    return client.post(
+        reverse("django_deepface:login"),
+        {"username": "testuser", "use_face_login": "on", "face_image": real_face_image},
+    )
+
+
+class TestHistogram:
+    def test_buckets_are_cumulative(self):
+        """Test that each bucket counts every observation at or under its bound"""
+        histogram = Histogram((0.1, 0.5, 1.0))
+
+        for value in (0.05, 0.1, 0.3, 2.0):
+            histogram.observe(value)
+
+        assert histogram.counts == [2, 3, 3]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(2.45)
+
+
+@pytest.mark.django_db
+class TestStageTimings:
+    def test_login_signal_carries_timings(
+        self, client, user, real_face_image, mock_represent, received
+    ):
+        """Test that a face login reports the time of each stage and the distance"""
+        response = face_login(client, real_face_image)
+
+        assert response.status_code == 302
+        payload = received[-1]
+        assert payload["was_successful"]
+        assert {
+            "upload",
+            "decode",
+            "inference",
+            "vector_query",
+            "session_login",
+        } == set(payload["timings"])
+        assert all(seconds >= 0 for seconds in payload["timings"].values())
+        assert payload["distance"] == pytest.approx(0.0, abs=1e-6)
+
+    def test_failed_embedding_is_reported(
+        self, client, user, real_face_image, monkeypatch, received
+    ):
+        """Test that a login whose face cannot be processed is sent as a failure"""
+
+        def mock_represent(img, **kwargs):
+            raise ValueError("Face could not be detected")
+
+        monkeypatch.setattr("deepface.DeepFace.represent", mock_represent)
+
+        face_login(client, real_face_image)
+
+        assert not received[-1]["was_successful"]
+        assert "decode" in received[-1]["timings"]
+
+    def test_worker_reports_shared_batch(
+        self, user, real_face_image, monkeypatch, settings, tmp_path, received
+    ):
+        """Test that enrollment jobs report decode, detection, embedding and save"""
+        settings.MEDIA_ROOT = str(tmp_path)
+        monkeypatch.setattr(
+            "deepface.DeepFace.extract_faces",
+            lambda img, **kwargs: [{"face": np.zeros((4, 4, 3)), "confidence": 1.0}],
+        )
+        monkeypatch.setattr(
+            "deepface.DeepFace.represent",
+            lambda img, **kwargs: [
+                {"embedding": np.ones(Identity.vector_dimensions).tolist()}
+            ],
+        )
+        enqueue_enrollment(Identity(user=user, image_number=2, image=real_face_image))
+
+        assert process_jobs(claim_jobs(10)) == (1, 0)
+
+        assert received[-1]["stage"] == "enroll"
+        assert set(received[-1]["timings"]) == {
+            "decode",
+            "detection",
+            "embedding",
+            "save",
+        }
+
+
+@pytest.mark.django_db
+class TestMetricsView:
+    def test_disabled_by_default(self, client):
+        """Test that the metrics endpoint is not served unless enabled"""
+        response = client.get(reverse("django_deepface:metrics"))
+
+        assert response.status_code == 404
+
+    def test_exposes_prometheus_text(
+        self, client, user, real_face_image, mock_represent, settings
+    ):
+        """Test that logins show up as counters, latency and distance histograms"""
+        settings.DEEPFACE_METRICS = True
+        face_login(client, real_face_image)
+
+        response = client.get(reverse("django_deepface:metrics"))
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        text = response.content.decode()
+        assert "# TYPE deepface_stage_seconds histogram" in text
+        assert (
+            'deepface_operations_total{operation="login",outcome="success"} 1' in text
+        )
+        assert (
+            'deepface_stage_seconds_count{operation="login",stage="vector_query"} 1'
+            in text
+        )
+        assert (
+            'deepface_match_distance_bucket{operation="login",outcome="success",le="+Inf"} 1'
+            in text
+        )
+        assert "deepface_inference_completed_total 1" in text
+        assert 'deepface_enrollment_jobs{status="pending"} 0' in text
+
+    def test_shed_logins_are_counted(self, client, user, real_face_image, settings):
+        """Test that logins refused by a full inference queue get their own outcome"""
+        settings.DEEPFACE_METRICS = True
+        settings.DEEPFACE_INFERENCE_WORKERS = 1
+        settings.DEEPFACE_INFERENCE_QUEUE = 0
+        release = threading.Event()
+        get_inference_executor().submit(release.wait)
+        try:
+            face_login(client, real_face_image)
+        finally:
+            release.set()
+
+        text = client.get(reverse("django_deepface:metrics")).content.decode()
+        assert 'deepface_operations_total{operation="login",outcome="shed"} 1' in text
+        assert 'outcome="failure"' not in text
+
+    def test_label_values_are_escaped(self, db):
+        """Test that quotes and newlines in labels cannot break the format"""
+        registry.inc("deepface_operations_total", {"operation": 'a"b\nc'})
+
+        assert 'operation="a\\"b\\nc"' in render_metrics()
@@ -0,0 +1,161 @@
+import io
+
+import numpy as np
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+
+from django_deepface.benchmark import compare_embedders
+from django_deepface.embedder import get_embedder
+from django_deepface.models import Identity
+from django_deepface.timing import StageTimer
+
+onnxruntime = pytest.importorskip("onnxruntime")
+onnx = pytest.importorskip("onnx")
+
+from django_deepface.onnx_embedder import OnnxEmbedder  # noqa: E402
+
+FACE_SHAPE = (8, 8, 3)
+
+
+def save_linear_model(path, weights, model_name="VGG-Face", postprocess="l2"):
+    """An ONNX graph that flattens each face and multiplies it by ``weights``."""
+    from onnx import TensorProto, helper, numpy_helper
+
+    graph = helper.make_graph(
+        [
+            helper.make_node("Flatten", ["input"], ["flat"]),
+            helper.make_node("MatMul", ["flat", "weights"], ["embedding"]),
+        ],
+        "linear",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["n", *FACE_SHAPE])],
+        [helper.make_tensor_value_info("embedding", TensorProto.FLOAT, ["n", None])],
+        [numpy_helper.from_array(weights.astype(np.float32), "weights")],
+    )
+    # IR version 8 goes with opset 17 and loads in any recent ONNX Runtime
+    model = helper.make_model(
+        graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8
+    )
+    helper.set_model_props(
+        model, {"model_name": model_name, "postprocess": postprocess}
+    )
+    onnx.save(model, str(path))
+
+
+@pytest.fixture
+def weights():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((int(np.prod(FACE_SHAPE)), Identity.vector_dimensions))
+
+
+@pytest.fixture
+def onnx_model(tmp_path, weights, monkeypatch):
+    path = tmp_path / "model.onnx"
+    save_linear_model(path, weights)
+    # Warm-up builds the detector; faces are passed in already detected
+    monkeypatch.setattr(
+        "deepface.DeepFace.extract_faces",
+        lambda img, **kwargs: [{"face": np.zeros(FACE_SHAPE), "confidence": 1.0}],
+    )
+    return path
+
+
+@pytest.fixture
+def onnx_settings(settings, onnx_model):
+    settings.DEEPFACE_EMBEDDER = "onnx"
+    settings.DEEPFACE_ONNX_MODEL = str(onnx_model)
+    settings.DEEPFACE_ONNX_THREADS = 2
+    settings.DEEPFACE_NORMALIZATION = "base"
+
+
+def expected_embeddings(faces, weights):
+    flat = np.stack([face.reshape(-1) for face in faces]) @ weights
+    return flat / np.linalg.norm(flat, axis=1, keepdims=True)
+
+
+class TestOnnxEmbedder:
+    def test_settings_select_backend(self, onnx_settings):
+        """Test that DEEPFACE_EMBEDDER picks the ONNX backend and its threads"""
+        embedder = get_embedder()
+        embedder.load()
+
+        assert isinstance(embedder, OnnxEmbedder)
+        assert embedder.session.get_session_options().intra_op_num_threads == 2
+        assert embedder.readiness()["backend"] == "onnx"
+
+    def test_embeds_batches(self, onnx_settings, weights):
+        """Test that a batch is embedded in one run, matching one by one"""
+        rng = np.random.default_rng(1)
+        faces = [rng.random(FACE_SHAPE) for _ in range(5)]
+        embedder = get_embedder()
+
+        batched = embedder.embed_faces(faces)
+        single = [embedder.embed_faces([face])[0] for face in faces]
+
+        expected = expected_embeddings(faces, weights)
+        np.testing.assert_allclose(batched, expected, rtol=1e-4, atol=1e-6)
+        np.testing.assert_allclose(single, batched, rtol=1e-4, atol=1e-6)
+
+    def test_represent_detects_then_embeds(self, onnx_settings):
+        """Test that represent records detection and embedding separately"""
+        embedder = get_embedder()
+        embedder.load()
+        timer = StageTimer()
+        embedding = embedder.represent(np.zeros((32, 32, 3), np.uint8), timer=timer)
+
+        assert len(embedding) == Identity.vector_dimensions
+        assert set(timer.timings) == {"detection", "embedding"}
+
+    def test_refuses_another_model(self, onnx_settings, settings):
+        """Test that a model converted from another DEEPFACE_MODEL is refused"""
+        settings.DEEPFACE_MODEL = "Facenet"
+        embedder = get_embedder()
+
+        with pytest.raises(ImproperlyConfigured, match="converted from VGG-Face"):
+            embedder.load()
+        assert "VGG-Face" in embedder.readiness()["error"]
+
+    def test_compare_backends(self, onnx_settings):
+        """Test that the benchmark measures each backend on the same crops"""
+        results = compare_embedders(["onnx"], faces=4, batch_size=2)
+
+        assert results["onnx"]["faces_per_second"] > 0
+        assert results["onnx"]["single"]["count"] == 4
+
+
+class TestConversion:
+    def test_converts_keras_model(self, settings, tmp_path, monkeypatch):
+        """Test that conversion keeps DeepFace's output, post-processing included"""
+        pytest.importorskip("tf2onnx")
+        from tensorflow.keras import Sequential, layers
+
+        keras_model = Sequential(
+            [layers.Input(FACE_SHAPE), layers.Flatten(), layers.Dense(16)]
+        )
+
+        class Client:
+            model = keras_model
+
+            def forward(self, img):
+                embeddings = keras_model(img, training=False).numpy()
+                return (
+                    embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+                ).tolist()
+
+        monkeypatch.setattr(
+            "deepface.DeepFace.build_model", lambda **kwargs: Client(), raising=False
+        )
+        path = tmp_path / "converted.onnx"
+        out = io.StringIO()
+
+        call_command("deepface_onnx", output=str(path), stdout=out)
+
+        assert "16 dimensions, l2 post-processing" in out.getvalue()
+        metadata = onnx.load(str(path)).metadata_props
+        assert {p.key: p.value for p in metadata}["model_name"] == "VGG-Face"
+        session = onnxruntime.InferenceSession(str(path))
+        face = np.random.default_rng(2).random((1, *FACE_SHAPE), dtype=np.float32)
+        (converted,) = session.run(None, {"input": face})
+        np.testing.assert_allclose(
+            converted, keras_model(face, training=False).numpy(), rtol=1e-4, atol=1e-5
+        )
@@ -0,0 +1,174 @@
+import io
+
+import numpy as np
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from django_deepface.checks import column_type
+from django_deepface.face_templates import verify
+from django_deepface.models import Identity
+from django_deepface.reembed import build_embedder, progress, target_configuration
+from django_deepface.search import nearest_users
+from django_deepface.utils import get_embedding_dimensions
+
+OLD = "VGG-Face/retinaface/base/aligned"
+NEW = "Facenet/retinaface/base/aligned"
+
+
+def model_vector(model_name):
+    """A different direction per model, so tests can tell the vectors apart."""
+    vector = np.zeros(get_embedding_dimensions(model_name))
+    vector[0 if model_name == "VGG-Face" else 1] = 1.0
+    return vector.tolist()
+
+
+@pytest.fixture
+def mock_deepface(mock_deepface):
+    mock_deepface["embedding"] = model_vector
+    return mock_deepface
+
+
+@pytest.fixture
+def gallery(db, settings, tmp_path, real_face_image):
+    """Three users with one VGG-Face image each, stored on disk."""
+    settings.MEDIA_ROOT = str(tmp_path)
+    content = real_face_image.read()
+    for username in ("alice", "bob", "carol"):
+        user = User.objects.create_user(username=username)
+        identity = Identity(
+            user=user, image_number=1, embedding=model_vector("VGG-Face")
+        )
+        identity.image.save(f"{username}.webp", ContentFile(content), save=False)
+        identity.save()
+
+
+def reembed(**options):
+    out = io.StringIO()
+    call_command("reembed", model="Facenet", stdout=out, **options)
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+class TestReembed:
+    def test_versions_are_recorded(self, gallery):
+        """Test that every embedding records the configuration that made it"""
+        assert set(Identity.objects.values_list("embedding_version", flat=True)) == {
+            OLD
+        }
+
+    def test_stages_next_to_live_embeddings(self, gallery, mock_deepface):
+        """Test that new vectors are staged and logins keep using the old ones"""
+        output = reembed(chunk_size=2, batch_size=2)
+
+        assert "Re-embedded 3 images (0 failed)" in output
+        identity = Identity.objects.get(user__username="alice")
+        assert identity.embedding_version == OLD
+        assert identity.next_embedding_version == NEW
+        np.testing.assert_array_equal(identity.next_embedding, model_vector("Facenet"))
+        _, distance = verify("alice", model_vector("VGG-Face"))
+        assert distance == pytest.approx(0.0, abs=1e-6)
+
+    def test_resumes_where_it_stopped(self, gallery, mock_deepface, monkeypatch):
+        """Test that committed chunks are skipped by the next run"""
+        calls = []
+        original = Identity.objects.bulk_update
+
+        def interrupt_second_chunk(objs, fields, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return original(objs, fields, **kwargs)
+
+        monkeypatch.setattr(Identity.objects, "bulk_update", interrupt_second_chunk)
+        with pytest.raises(KeyboardInterrupt):
+            reembed(chunk_size=2)
+        assert progress(NEW)["staged"] == 2
+
+        output = reembed(chunk_size=2)
+
+        assert "1 of 3 to re-embed" in output
+        assert progress(NEW)["staged"] == 3
+
+    def test_failed_images_are_reported(self, gallery, mock_deepface, monkeypatch):
+        """Test that an image without a face is reported and left unstaged"""
+
+        def no_face(img, **kwargs):
+            raise ValueError("Face could not be detected")
+
+        monkeypatch.setattr("deepface.DeepFace.extract_faces", no_face)
+
+        output = reembed()
+
+        assert "Re-embedded 0 images (3 failed)" in output
+        assert "Face could not be detected" in output
+        assert progress(NEW)["staged"] == 0
+
+    def test_promote_switches_without_downtime(self, gallery, mock_deepface, settings):
+        """Test that both configurations keep logging in across the promotion"""
+        reembed()
+
+        assert "Promoted 3 embeddings" in reembed(promote=True)
+
+        # Processes still on the old settings read the swapped-out column
+        assert verify("bob", model_vector("VGG-Face"))[1] == pytest.approx(0, abs=1e-6)
+        settings.DEEPFACE_MODEL = "Facenet"
+        assert verify("bob", model_vector("Facenet"))[1] == pytest.approx(0, abs=1e-6)
+        candidates = nearest_users(model_vector("Facenet"), k=3)
+        assert [distance for _, distance in candidates] == pytest.approx([0, 0, 0])
+
+    @pytest.mark.postgres
+    def test_promote_resizes_column(self, gallery, mock_deepface):
+        """Test that promoting a model of another length resizes the column"""
+        from django.db import connection
+
+        reembed()
+        # A row added after the run has no 128-dimensional embedding
+        Identity.objects.create(
+            user=User.objects.create_user(username="dave"),
+            image_number=1,
+            image="dave.webp",
+            embedding=model_vector("VGG-Face"),
+        )
+        with pytest.raises(CommandError, match="every row must be re-embedded"):
+            reembed(promote=True, force=True)
+
+        Identity.objects.filter(user__username="dave").delete()
+        reembed(promote=True)
+
+        assert column_type(connection, "django_deepface_identity", "embedding") == (
+            "vector(128)"
+        )
+
+    def test_uses_configured_backend(self, settings):
+        """Test that the target is embedded with DEEPFACE_EMBEDDER's backend"""
+        from django_deepface.onnx_embedder import OnnxEmbedder
+
+        settings.DEEPFACE_EMBEDDER = "onnx"
+        settings.DEEPFACE_ONNX_MODEL = "/models/vgg-face.onnx"
+        settings.DEEPFACE_ONNX_THREADS = 2
+
+        embedder = build_embedder(
+            target_configuration("Facenet", onnx_model="/models/facenet.onnx")
+        )
+
+        assert isinstance(embedder, OnnxEmbedder)
+        assert embedder.model_path == "/models/facenet.onnx"
+        assert embedder.intra_op_threads == 2
+        assert embedder.deepface_settings["model_name"] == "Facenet"
+
+    def test_promote_refuses_partial_runs(self, gallery):
+        """Test that promoting before every row is re-embedded is refused"""
+        with pytest.raises(CommandError, match="3 rows have no embedding"):
+            reembed(promote=True)
+
+    def test_discard(self, gallery, mock_deepface):
+        """Test that staged embeddings can be dropped"""
+        reembed()
+
+        call_command("reembed", discard=True, stdout=io.StringIO())
+
+        assert progress(NEW)["staged"] == 0
+        assert not Identity.objects.filter(next_embedding__isnull=False).exists()
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from pgvector.django import CosineDistance, L2Distance
+
+from django_deepface.checks import pgvector_version
+from django_deepface.search import (
+    binary_index_sql,
+    distance_expression,
+    hamming_distances,
+    index_sql,
+    pack_signs,
+    search_parameters,
+)
+
+
+class TestIndexDefinition:
+    def test_hnsw_cosine_index(self, settings):
+        """Test that the HNSW index uses the operator class of the query distance"""
+        settings.DEEPFACE_DISTANCE = "cosine"
+        settings.DEEPFACE_INDEX_TYPE = "hnsw"
+        settings.DEEPFACE_INDEX_M = 24
+        settings.DEEPFACE_INDEX_EF_CONSTRUCTION = 100
+
+        sql = index_sql("identity")
+
+        assert "CONCURRENTLY" in sql
+        assert 'USING hnsw ("embedding" vector_cosine_ops)' in sql
+        assert "WITH (m = 24, ef_construction = 100)" in sql
+        assert isinstance(distance_expression([1.0, 0.0]), CosineDistance)
+
+    def test_ivfflat_l2_index(self, settings):
+        """Test that IVFFlat builds with lists and L2 ops when configured"""
+        settings.DEEPFACE_DISTANCE = "l2"
+        settings.DEEPFACE_INDEX_TYPE = "ivfflat"
+        settings.DEEPFACE_INDEX_LISTS = 500
+
+        sql = index_sql("identity")
+
+        assert 'USING ivfflat ("embedding" vector_l2_ops) WITH (lists = 500)' in sql
+        assert isinstance(distance_expression([1.0, 0.0]), L2Distance)
+
+    def test_binary_index(self, settings):
+        """Test that the binary index covers the expression searches use"""
+        settings.DEEPFACE_INDEX_M = 24
+
+        sql = binary_index_sql("identity")
+
+        assert "CONCURRENTLY" in sql
+        assert (
+            'USING hnsw ((binary_quantize("embedding")::bit(4096)) bit_hamming_ops)'
+            in sql
+        )
+        assert "WITH (m = 24, ef_construction = 64)" in sql
+
+    def test_unknown_distance(self, settings):
+        """Test that an unsupported distance fails loudly"""
+        settings.DEEPFACE_DISTANCE = "manhattan"
+
+        with pytest.raises(ValueError):
+            distance_expression([1.0])
+
+
+class TestHammingDistance:
+    def test_matches_sign_disagreements(self):
+        """Test that packed sign bits count the dimensions whose signs differ"""
+        rng = np.random.default_rng(0)
+        matrix = rng.standard_normal((5, 100))
+        query = rng.standard_normal(100)
+
+        distances = hamming_distances(pack_signs(matrix), pack_signs(query))
+
+        expected = ((matrix > 0) != (query > 0)).sum(axis=1)
+        np.testing.assert_array_equal(distances, expected)
+
+
+@pytest.mark.postgres
+@pytest.mark.django_db(transaction=True)
+class TestSearchParameters:
+    @pytest.mark.parametrize(
+        "index_type,name,setting,value",
+        [
+            ("hnsw", "hnsw.ef_search", "DEEPFACE_HNSW_EF_SEARCH", 123),
+            ("ivfflat", "ivfflat.probes", "DEEPFACE_IVFFLAT_PROBES", 7),
+        ],
+    )
+    def test_parameters_are_transaction_local(
+        self, settings, index_type, name, setting, value
+    ):
+        """Test that search parameters apply inside the block only"""
+        settings.DEEPFACE_INDEX_TYPE = index_type
+        setattr(settings, setting, value)
+
+        with search_parameters():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT current_setting(%s, true)", [name])
+                assert cursor.fetchone()[0] == str(value)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_setting(%s, true)", [name])
+            assert cursor.fetchone()[0] != str(value)
+
+
+@pytest.mark.postgres
+@pytest.mark.django_db
+class TestDeepfaceIndexCommand:
+    def test_refuses_unindexable_dimensions(self):
+        """Test that 4096-dim embeddings are rejected before touching the table"""
+        with pytest.raises(CommandError, match="up to 2000 dimensions"):
+            call_command("deepface_index")
+
+    def test_binary_index_requires_pgvector_07(self):
+        """Test that the binary index explains the pgvector requirement"""
+        if pgvector_version(connection) >= (0, 7):
+            pytest.skip("pgvector supports binary quantization")
+
+        with pytest.raises(CommandError, match=r"pgvector 0\.7"):
+            call_command("deepface_index", binary=True)
@@ -0,0 +1,152 @@
+import io
+
+import pytest
+from django.core.checks import run_checks
+from django.core.management import CommandError, call_command
+from django.db import connection
+from pgvector.django import CosineDistance
+
+from django_deepface.checks import column_type, pgvector_version
+from django_deepface.models import Identity
+from django_deepface.search import distance_expression, index_opclass
+from django_deepface.utils import get_embedding_dimensions
+
+
+def check_ids(**kwargs):
+    return {m.id for m in run_checks(**kwargs) if m.id.startswith("django_deepface")}
+
+
+class TestEmbeddingStorage:
+    @pytest.mark.postgres
+    def test_default_storage_is_vector(self):
+        """Test that embeddings are full-precision vectors by default"""
+        field = Identity._meta.get_field("embedding")
+
+        assert field.db_type(connection) == "vector(4096)"
+        assert index_opclass() == "vector_cosine_ops"
+
+    @pytest.mark.postgres
+    def test_halfvec_storage(self, settings):
+        """Test that halfvec storage changes the column, opclass and query type"""
+        settings.DEEPFACE_EMBEDDING_STORAGE = "halfvec"
+        field = Identity._meta.get_field("embedding")
+
+        assert field.db_type(connection) == "halfvec(4096)"
+        assert index_opclass() == "halfvec_cosine_ops"
+        expression = distance_expression([0.5, 0.25])
+        assert isinstance(expression, CosineDistance)
+        assert "[0.5,0.25]" in str(expression.source_expressions[1].value)
+
+    def test_unknown_storage(self, settings):
+        """Test that an unsupported storage type fails loudly"""
+        settings.DEEPFACE_EMBEDDING_STORAGE = "float64"
+
+        with pytest.raises(ValueError):
+            Identity._meta.get_field("embedding").db_type(connection)
+
+
+class TestEmbeddingDimensions:
+    def test_dimensions_follow_model(self, settings):
+        """Test that the embedding column is sized for DEEPFACE_MODEL"""
+        settings.DEEPFACE_MODEL = "Facenet"
+        field = Identity._meta.get_field("embedding")
+
+        assert Identity.vector_dimensions == field.dimensions == 128
+        assert Identity._meta.get_field("next_embedding").dimensions is None
+        # Migrations do not pin the model
+        assert "dimensions" not in field.deconstruct()[3]
+
+    @pytest.mark.postgres
+    def test_column_types(self, settings):
+        """Test that staged embeddings may have any length"""
+        settings.DEEPFACE_MODEL = "ArcFace"
+
+        assert Identity._meta.get_field("embedding").db_type(connection) == (
+            "vector(512)"
+        )
+        assert Identity._meta.get_field("next_embedding").db_type(connection) == (
+            "vector"
+        )
+
+    def test_unknown_model_needs_dimensions(self, settings):
+        """Test that a model missing from the table must be given dimensions"""
+        settings.DEEPFACE_MODEL = "NewNet"
+
+        with pytest.raises(ValueError, match="DEEPFACE_EMBEDDING_DIMENSIONS"):
+            get_embedding_dimensions()
+        assert "django_deepface.E002" in check_ids()
+
+        settings.DEEPFACE_EMBEDDING_DIMENSIONS = 256
+        assert get_embedding_dimensions() == 256
+        assert "django_deepface.E002" not in check_ids()
+
+    def test_contradicting_dimensions(self, settings):
+        """Test that overriding a known model's dimensions is an error"""
+        settings.DEEPFACE_EMBEDDING_DIMENSIONS = 512
+
+        assert "django_deepface.E003" in check_ids()
+
+    @pytest.mark.django_db
+    def test_stored_dimensions_mismatch(self, settings, django_user_model):
+        """Test that embeddings of another length in the database are an error"""
+        settings.DEEPFACE_MODEL = "NewNet"
+        settings.DEEPFACE_EMBEDDING_DIMENSIONS = 4096
+        user = django_user_model.objects.create_user(username="alice")
+        Identity.objects.create(
+            user=user, image_number=1, image="a.jpg", embedding=[1.0] * 4096
+        )
+        assert "django_deepface.E004" not in check_ids(databases=["default"])
+
+        settings.DEEPFACE_EMBEDDING_DIMENSIONS = 256
+
+        assert "django_deepface.E004" in check_ids(databases=["default"])
+
+
+@pytest.mark.postgres
+@pytest.mark.django_db
+class TestStorageCommand:
+    def test_status(self):
+        """Test that the status shows the actual column type"""
+        out = io.StringIO()
+
+        call_command("deepface_storage", stdout=out)
+
+        assert "django_deepface_identity.embedding: vector(4096)" in out.getvalue()
+
+    def test_mismatch_warning(self, settings):
+        """Test that the database check warns when the column is not converted"""
+        settings.DEEPFACE_EMBEDDING_STORAGE = "halfvec"
+
+        messages = run_checks(databases=["default"])
+
+        assert any(m.id == "django_deepface.W001" for m in messages)
+
+    def test_convert_resizes_empty_table(self, settings):
+        """Test that an empty embedding column is resized for another model"""
+        settings.DEEPFACE_MODEL = "Facenet"
+        assert "django_deepface.E004" in check_ids(databases=["default"])
+
+        call_command("deepface_storage", convert=True, stdout=io.StringIO())
+
+        assert column_type(connection, "django_deepface_identity", "embedding") == (
+            "vector(128)"
+        )
+        assert "django_deepface.E004" not in check_ids(databases=["default"])
+
+    def test_bench_requires_halfvec_support(self):
+        """Test that the benchmark runs, or explains the pgvector requirement"""
+        out = io.StringIO()
+        if pgvector_version(connection) < (0, 7):
+            with pytest.raises(CommandError, match=r"pgvector 0\.7"):
+                call_command("deepface_storage", bench=True, stdout=out)
+            return
+
+        call_command(
+            "deepface_storage",
+            bench=True,
+            rows=200,
+            queries=5,
+            dimensions=64,
+            stdout=out,
+        )
+        assert "halfvec recall@10" in out.getvalue()
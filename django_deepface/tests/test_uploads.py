@@ -0,0 +1,185 @@
+import io
+import time
+
+import numpy as np
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+from django.urls import reverse
+from PIL import Image
+
+from django_deepface.models import Identity
+from django_deepface.signals import face_image_processed
+from django_deepface.uploads import FaceUploadHandler, RejectedUpload
+from django_deepface.utils import ImageTooLargeError, load_upload
+
+
+def jpeg(width, height) -> bytes:
+    buffer = io.BytesIO()
+    # Noise keeps the file large enough to arrive in several chunks
+    Image.effect_noise((width, height), 64).convert("RGB").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def stream(handler, content: bytes, chunk_size: int = 1024) -> list:
+    """Feed a file to a handler the way MultiPartParser does."""
+    handler.new_file("image", "face.jpg", "image/jpeg", None)
+    passed = [
+        handler.receive_data_chunk(content[start : start + chunk_size], start)
+        for start in range(0, len(content), chunk_size)
+    ]
+    return [*passed, handler.file_complete(len(content))]
+
+
+@pytest.fixture
+def represent_calls(monkeypatch):
+    calls = []
+
+    def mock_represent(*args, **kwargs):
+        calls.append(args)
+        return [{"embedding": np.ones(Identity.vector_dimensions).tolist()}]
+
+    monkeypatch.setattr("deepface.DeepFace.represent", mock_represent)
+    return calls
+
+
+class TestFaceUploadHandler:
+    def test_accepted_file_passes_through(self, settings):
+        """Test that chunks of an image within budget reach the next handler"""
+        content = jpeg(64, 48)
+
+        *chunks, complete = stream(FaceUploadHandler(), content)
+
+        assert b"".join(chunks) == content
+        assert complete is None
+
+    def test_pixels_are_refused_from_the_header(self, settings):
+        """Test that an image over the pixel budget is dropped after its header"""
+        settings.DEEPFACE_MAX_UPLOAD_PIXELS = 10_000
+        content = jpeg(400, 300)
+
+        *chunks, complete = stream(FaceUploadHandler(), content)
+
+        # The header is in the first kilobyte, so nothing is buffered
+        assert all(chunk is None for chunk in chunks)
+        assert len(chunks) > 10
+        assert isinstance(complete, RejectedUpload)
+        assert complete.size == 0
+        assert "400x300" in complete.error
+
+    def test_bytes_are_counted_while_streaming(self, settings):
+        """Test that nothing past the byte budget is buffered"""
+        settings.DEEPFACE_MAX_UPLOAD_BYTES = 2048
+        content = jpeg(64, 48) + bytes(8192)
+
+        *chunks, complete = stream(FaceUploadHandler(), content)
+
+        assert [chunk is not None for chunk in chunks] == [True, True] + [False] * (
+            len(chunks) - 2
+        )
+        assert "larger than" in complete.error
+
+    def test_unknown_format_is_left_to_the_form(self, settings):
+        """Test that data Pillow cannot parse stops being inspected, not accepted"""
+        content = bytes(300 * 1024)
+
+        *chunks, complete = stream(FaceUploadHandler(), content, chunk_size=64 * 1024)
+
+        assert all(chunk is not None for chunk in chunks)
+        assert complete is None
+
+    def test_load_upload_checks_pixels(self, settings):
+        """Test that uploads decoded outside the handler are checked too"""
+        settings.DEEPFACE_MAX_UPLOAD_PIXELS = 10_000
+        upload = SimpleUploadedFile("face.jpg", jpeg(400, 300))
+
+        with pytest.raises(ImageTooLargeError, match=r"0\.1 MP"):
+            load_upload(upload)
+
+
+@pytest.mark.django_db
+class TestFaceUploadViews:
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(username="alice", password="pw")  # nosec
+
+    def test_oversized_enrollment_is_refused(
+        self, client, user, settings, represent_calls
+    ):
+        """Test that an upload over the pixel budget never reaches the model"""
+        settings.DEEPFACE_MAX_UPLOAD_PIXELS = 10_000
+        client.force_login(user)
+
+        response = client.post(
+            reverse("django_deepface:profile"),
+            {"image": SimpleUploadedFile("face.jpg", jpeg(400, 300))},
+        )
+
+        assert b"0.1 MP" in response.content
+        assert not Identity.objects.exists()
+        assert represent_calls == []
+
+    def test_oversized_login_is_refused(self, client, user, settings, represent_calls):
+        """Test that a face login over the byte budget is a form error"""
+        settings.DEEPFACE_MAX_UPLOAD_BYTES = 1024
+        response = client.post(
+            reverse("django_deepface:login"),
+            {
+                "username": "alice",
+                "use_face_login": "on",
+                "face_image": SimpleUploadedFile("face.jpg", jpeg(320, 240)),
+            },
+        )
+
+        assert "larger than" in str(response.context["form"].errors["face_image"])
+        assert represent_calls == []
+
+    def test_upload_stage_times_the_body(
+        self, user, settings, represent_calls, monkeypatch, tmp_path
+    ):
+        """Test that the upload stage covers reading the body through the handler"""
+        settings.MEDIA_ROOT = str(tmp_path)
+        receive = FaceUploadHandler.receive_data_chunk
+
+        def slow_receive(self, raw_data, start):
+            time.sleep(0.05)
+            return receive(self, raw_data, start)
+
+        monkeypatch.setattr(FaceUploadHandler, "receive_data_chunk", slow_receive)
+        timings = []
+        face_image_processed.connect(
+            lambda sender, **kwargs: timings.append(kwargs["timings"]),
+            weak=False,
+            dispatch_uid="test_upload_stage",
+        )
+        # The CSRF token in the form makes the CSRF check read the body
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(user)
+        client.get(reverse("django_deepface:profile"))
+        try:
+            client.post(
+                reverse("django_deepface:profile"),
+                {
+                    "csrfmiddlewaretoken": client.cookies["csrftoken"].value,
+                    "image": SimpleUploadedFile("face.jpg", jpeg(64, 48)),
+                },
+            )
+        finally:
+            face_image_processed.disconnect(dispatch_uid="test_upload_stage")
+
+        (recorded,) = timings
+        assert recorded["upload"] >= 0.05
+
+    def test_csrf_is_still_enforced(self, user):
+        """Test that moving the CSRF check into the view keeps it in force"""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(user)
+
+        response = client.post(
+            reverse("django_deepface:profile"),
+            {"image": SimpleUploadedFile("face.jpg", jpeg(64, 48))},
+        )
+
+        assert response.status_code == 403
+        assert not Identity.objects.exists()
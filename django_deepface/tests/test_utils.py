@@ -0,0 +1,149 @@
+import io
+import os
+
+import numpy as np
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.urls import reverse
+from PIL import Image
+
+from django_deepface.models import Identity
+from django_deepface.utils import (
+    cleanup_temp_file,
+    decode_image,
+    load_upload,
+    save_temp_file,
+)
+
+
+def encode_image(color, size=(8, 6), fmt="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class TestLoadUpload:
+    def test_decode_image_returns_bgr(self):
+        """Test that decoded images use DeepFace's BGR channel order"""
+        image = decode_image(encode_image((255, 0, 0)))
+
+        assert image.shape == (6, 8, 3)
+        assert image.dtype == np.uint8
+        assert image[0, 0].tolist() == [0, 0, 255]
+
+    def test_in_memory_upload_is_decoded(self, real_face_image):
+        """Test that in-memory uploads are decoded straight from their bytes"""
+        real_face_image.read()  # leave the pointer at the end like a validator
+
+        image = load_upload(real_face_image)
+
+        assert isinstance(image, np.ndarray)
+        assert image.ndim == 3
+
+    def test_temporary_upload_is_decoded_in_place(self):
+        """Test that uploads already spooled to disk are decoded from their path"""
+        upload = TemporaryUploadedFile("face.png", "image/png", 0, None)
+        try:
+            upload.write(encode_image((0, 255, 0)))
+            upload.flush()
+            image = load_upload(upload)
+        finally:
+            upload.close()
+
+        assert image.shape == (6, 8, 3)
+
+    def test_temp_file_helpers_are_deprecated(
+        self, real_face_image, settings, tmp_path
+    ):
+        """Test that the old temp file helpers still work but warn"""
+        settings.MEDIA_ROOT = str(tmp_path)
+
+        with pytest.deprecated_call():
+            path = save_temp_file(real_face_image)
+        assert os.path.exists(path)
+        with pytest.deprecated_call():
+            cleanup_temp_file(path)
+        assert not os.path.exists(path)
+
+
+class TestDecodeImage:
+    def test_long_edge_is_capped(self, settings):
+        """Test that large images are downscaled before detection"""
+        settings.DEEPFACE_MAX_IMAGE_EDGE = 100
+
+        image = decode_image(encode_image((0, 0, 255), size=(400, 200)))
+
+        assert image.shape == (50, 100, 3)
+
+    def test_large_jpeg_uses_draft_decode(self, settings, monkeypatch):
+        """Test that big JPEGs are decoded at reduced scale by libjpeg"""
+        settings.DEEPFACE_MAX_IMAGE_EDGE = 100
+        requested = []
+        original_draft = Image.Image.draft
+
+        def spy_draft(self, mode, size):
+            requested.append(size)
+            return original_draft(self, mode, size)
+
+        monkeypatch.setattr("PIL.JpegImagePlugin.JpegImageFile.draft", spy_draft)
+
+        image = decode_image(encode_image((0, 0, 255), size=(800, 400), fmt="JPEG"))
+
+        assert requested == [(100, 50)]
+        assert image.shape == (50, 100, 3)
+
+    def test_small_images_and_disabled_cap_keep_size(self, settings):
+        """Test that images are never upscaled and the cap can be disabled"""
+        settings.DEEPFACE_MAX_IMAGE_EDGE = None
+
+        assert decode_image(encode_image((0, 0, 0), size=(400, 200))).shape == (
+            200,
+            400,
+            3,
+        )
+
+    def test_exif_orientation_is_applied(self):
+        """Test that photos tagged as rotated come out upright"""
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotated 90 degrees clockwise
+        Image.new("RGB", (40, 20)).save(buffer, format="JPEG", exif=exif)
+
+        image = decode_image(buffer.getvalue())
+
+        assert image.shape == (40, 20, 3)
+
+
+@pytest.mark.django_db
+class TestFaceLoginWithoutTempFiles:
+    def test_face_login_does_not_write_temp_file(
+        self, client, real_face_image, monkeypatch, settings, tmp_path
+    ):
+        """Test that face login embeds the decoded upload without touching MEDIA_ROOT"""
+        settings.MEDIA_ROOT = str(tmp_path)
+        user = User.objects.create_user(username="alice", password="pass123")
+        stored_embedding = np.random.rand(Identity.vector_dimensions).tolist()
+        Identity.objects.create(
+            user=user, image_number=1, image="faces/a.webp", embedding=stored_embedding
+        )
+        received = []
+
+        def mock_represent(img, **kwargs):
+            received.append(img)
+            return [{"embedding": stored_embedding}]
+
+        monkeypatch.setattr("deepface.DeepFace.represent", mock_represent)
+
+        response = client.post(
+            reverse("django_deepface:login"),
+            {
+                "username": "alice",
+                "use_face_login": "on",
+                "face_image": real_face_image,
+            },
+        )
+
+        assert response.status_code == 302
+        assert isinstance(received[-1], np.ndarray)
+        assert not (tmp_path / "temp").exists()
@@ -0,0 +1,219 @@
+import numpy as np
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+
+from django_deepface.benchmark import measure_recall
+from django_deepface.bulk import insert_identities
+from django_deepface.checks import check_vector_store_cache, pgvector_version
+from django_deepface.face_templates import verify
+from django_deepface.models import Identity
+from django_deepface.tests.conftest import unit_vector
+from django_deepface.vector_store import (
+    NumpyVectorStore,
+    PgVectorStore,
+    bump_generation,
+    get_vector_store,
+)
+
+
+@pytest.fixture
+def numpy_store(settings):
+    settings.DEEPFACE_VECTOR_STORE = "numpy"
+    return get_vector_store()
+
+
+@pytest.fixture
+def gallery(db):
+    """Alice with two images, Bob and Carol with one each."""
+    users = {}
+    for username in ("alice", "bob", "carol"):
+        users[username] = User.objects.create_user(username=username)
+    for user, number, index in (
+        (users["alice"], 1, 0),
+        (users["alice"], 2, 3),
+        (users["bob"], 1, 1),
+        (users["carol"], 1, 2),
+    ):
+        Identity.objects.create(
+            user=user,
+            image_number=number,
+            image=f"faces/{user.username}_{number}.jpg",
+            embedding=unit_vector(index),
+        )
+    return users
+
+
+def count_loads(store, monkeypatch):
+    loads = []
+    load = store.load
+
+    def counting_load():
+        loads.append(1)
+        return load()
+
+    monkeypatch.setattr(store, "load", counting_load)
+    return loads
+
+
+@pytest.mark.django_db
+class TestNumpyVectorStore:
+    def test_store_follows_settings(self, settings):
+        """Test that DEEPFACE_VECTOR_STORE picks the implementation"""
+        settings.DEEPFACE_VECTOR_STORE = "numpy"
+        assert isinstance(get_vector_store(), NumpyVectorStore)
+        settings.DEEPFACE_VECTOR_STORE = "pgvector"
+        assert isinstance(get_vector_store(), PgVectorStore)
+        settings.DEEPFACE_VECTOR_STORE = "faiss"
+        with pytest.raises(ValueError):
+            get_vector_store()
+
+    def test_embeddings_round_trip(self, gallery):
+        """Test that embeddings read back intact on any database"""
+        identity = Identity.objects.get(user=gallery["bob"])
+
+        np.testing.assert_array_equal(identity.embedding, unit_vector(1))
+
+    def test_nearest_users_ranks_by_closest_image(self, gallery, numpy_store):
+        """Test that each user is ranked once, by their closest image"""
+        query = np.asarray(unit_vector(3)) + 0.5 * np.asarray(unit_vector(1))
+
+        candidates = numpy_store.nearest_users(query, k=2)
+
+        assert [user_id for user_id, _ in candidates] == [
+            gallery["alice"].id,
+            gallery["bob"].id,
+        ]
+        assert candidates[0][1] < candidates[1][1]
+
+    def test_verify_compares_claimed_user_only(self, gallery, numpy_store):
+        """Test that 1:1 verification finds the user's closest image"""
+        matched_user, distance = verify("alice", unit_vector(3))
+
+        assert matched_user == gallery["alice"]
+        assert distance == pytest.approx(0.0, abs=1e-6)
+        assert verify("nobody", unit_vector(3)) is None
+
+    def test_matrix_is_loaded_once(self, gallery, numpy_store, monkeypatch):
+        """Test that searches reuse the matrix until the gallery changes"""
+        loads = count_loads(numpy_store, monkeypatch)
+
+        numpy_store.nearest_users(unit_vector(0), k=1)
+        numpy_store.nearest_users(unit_vector(1), k=1)
+        assert len(loads) == 1
+
+        Identity.objects.filter(user=gallery["carol"]).delete()
+        assert len(numpy_store.nearest_users(unit_vector(2), k=5)) == 2
+        assert len(loads) == 2
+
+    def test_bulk_inserts_invalidate(self, gallery, numpy_store):
+        """Test that rows inserted without signals are still searched"""
+        numpy_store.nearest_users(unit_vector(0), k=1)
+        dave = User.objects.create_user(username="dave")
+
+        insert_identities(
+            [
+                Identity(
+                    user=dave,
+                    image_number=1,
+                    image="faces/dave.jpg",
+                    embedding=np.asarray(unit_vector(5), dtype=np.float32),
+                )
+            ]
+        )
+
+        assert numpy_store.nearest_users(unit_vector(5), k=1)[0][0] == dave.id
+
+    def test_other_processes_are_noticed(self, gallery, numpy_store, monkeypatch):
+        """Test that a generation bump from another process reloads the matrix"""
+        loads = count_loads(numpy_store, monkeypatch)
+        numpy_store.nearest_users(unit_vector(0), k=1)
+
+        bump_generation()
+        numpy_store.nearest_users(unit_vector(0), k=1)
+
+        assert len(loads) == 2
+
+    def test_per_process_cache_is_reported(self, settings, tmp_path):
+        """Test that the numpy store warns about a cache other processes cannot see"""
+        settings.DEEPFACE_VECTOR_STORE = "numpy"
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        assert [m.id for m in check_vector_store_cache(None)] == [
+            "django_deepface.W002"
+        ]
+
+        settings.CACHES = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": str(tmp_path),
+            }
+        }
+        assert check_vector_store_cache(None) == []
+
+        settings.DEEPFACE_VECTOR_STORE = "pgvector"
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        assert check_vector_store_cache(None) == []
+
+
+@pytest.fixture
+def random_gallery(db):
+    """Forty users with one random embedding each."""
+    rng = np.random.default_rng(0)
+    for i in range(40):
+        Identity.objects.create(
+            user=User.objects.create_user(username=f"user{i}"),
+            image_number=1,
+            image=f"faces/user{i}.jpg",
+            embedding=rng.standard_normal(Identity.vector_dimensions).tolist(),
+        )
+
+
+@pytest.mark.django_db
+class TestBinaryPrefilter:
+    def test_prefilter_finds_the_nearest_user(self, random_gallery, numpy_store):
+        """Test that the reranked shortlist keeps the exact nearest users"""
+        query = np.asarray(Identity.objects.get(user__username="user7").embedding)
+        query += np.random.default_rng(1).normal(0, 0.1, len(query))
+
+        prefiltered = numpy_store.nearest_users(query, k=3, candidates=10)
+        exact = numpy_store.nearest_users(query, k=3, exact=True)
+
+        assert prefiltered[0][0] == User.objects.get(username="user7").id
+        assert prefiltered[0] == pytest.approx(exact[0])
+
+    def test_candidates_setting(self, random_gallery, numpy_store, settings):
+        """Test that DEEPFACE_RERANK_CANDIDATES bounds the reranked rows"""
+        query = np.ones(Identity.vector_dimensions)
+        assert len(numpy_store.nearest_users(query, k=5)) == 5
+
+        settings.DEEPFACE_BINARY_PREFILTER = True
+        settings.DEEPFACE_RERANK_CANDIDATES = 2
+
+        assert len(numpy_store.nearest_users(query, k=5)) == 2
+        assert len(numpy_store.nearest_users(query, k=5, exact=True)) == 5
+
+    def test_recall_report(self, random_gallery, numpy_store):
+        """Test that recall is measured against exact search"""
+        report = measure_recall([1, 40], k=5, queries=10)
+
+        assert report["queries"] == 10
+        assert report["candidates"][40]["recall"] == 1.0
+        assert report["candidates"][1]["recall"] <= 0.2
+        assert report["exact"]["count"] == 10
+
+    @pytest.mark.postgres
+    def test_pgvector_prefilter(self, random_gallery, settings):
+        """Test that pgvector shortlists by Hamming distance, then reranks"""
+        if pgvector_version(connection) < (0, 7):
+            pytest.skip("binary_quantize requires pgvector 0.7")
+        settings.DEEPFACE_VECTOR_STORE = "pgvector"
+        query = Identity.objects.get(user__username="user7").embedding
+
+        candidates = get_vector_store().nearest_users(query, k=3, candidates=10)
+
+        assert candidates[0][0] == User.objects.get(username="user7").id
+        assert candidates[0][1] == pytest.approx(0.0, abs=1e-6)
@@ -0,0 +1,34 @@
+"""Wall-clock timing of the stages of login and enrollment."""
+
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Collects how long each named stage of one operation took.
+
+    Example::
+
+        timer = StageTimer()
+        with timer.stage("detection"):
+            face = embedder.extract_face(img)
+        timer.timings  # {"detection": 0.041}
+    """
+
+    def __init__(self):
+        self.timings: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (
+                self.timings.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    @property
+    def total(self) -> float:
+        return sum(self.timings.values())
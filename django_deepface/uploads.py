@@ -0,0 +1,143 @@
+"""Streaming upload handling for face images, within byte and pixel budgets.
+
+Django buffers an upload completely, and the views then decode it in full,
+before anything looks at its size. A 40 MP photo costs hundreds of MB to
+decode and far more once the detector runs on it. ``FaceUploadHandler``
+checks each file while the request body streams in:
+
+- bytes are counted chunk by chunk, and a file over
+  ``DEEPFACE_MAX_UPLOAD_BYTES`` stops being buffered
+- the image header is parsed as soon as it has arrived, and an image over
+  ``DEEPFACE_MAX_UPLOAD_PIXELS`` stops being buffered without its pixels
+  ever being decoded
+
+A refused file reaches the form as a ``RejectedUpload``, which the face
+image fields turn into a validation error.
+"""
+
+import io
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.middleware.csrf import CsrfViewMiddleware
+from PIL import Image
+
+from .timing import StageTimer
+from .utils import (
+    ImageTooLargeError,
+    check_image_size,
+    get_max_upload_bytes,
+    get_max_upload_pixels,
+)
+
+# Give up looking for the image size after this much of the file; JPEG
+# headers carrying large EXIF or ICC segments can take up to ~128 KiB
+MAX_HEADER_BYTES = 256 * 1024
+
+
+class RejectedUpload(InMemoryUploadedFile):
+    """An empty stand-in for an upload refused by ``FaceUploadHandler``."""
+
+    def __init__(self, error: str, field_name, name, content_type, charset):
+        super().__init__(io.BytesIO(), field_name, name, content_type, 0, charset, None)
+        self.error = error
+
+
+class FaceUploadHandler(FileUploadHandler):
+    """
+    Enforces the face image byte and pixel budgets while uploads stream in.
+
+    Install it ahead of Django's handlers, before the request body is read,
+    with the ``face_upload_view`` decorator. Accepted chunks pass through to
+    the next handler unchanged; after a refusal the rest of the file is
+    read from the socket and dropped.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = get_max_upload_bytes()
+        self.max_pixels = get_max_upload_pixels()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.error: str | None = None
+        # Collected until the header yields the image size, then dropped
+        self.header: bytearray | None = bytearray()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error is not None:
+            return None
+        self.received += len(raw_data)
+        if self.max_bytes and self.received > self.max_bytes:
+            self.error = f"Image is larger than {self.max_bytes / 1024 / 1024:.1f} MB"
+            return None
+        if self.header is not None:
+            self.inspect_header(raw_data)
+        return None if self.error is not None else raw_data
+
+    def inspect_header(self, raw_data: bytes) -> None:
+        """Refuse the file as soon as its header shows too many pixels."""
+        self.header += raw_data
+        try:
+            # Only reads the header; nothing is decoded
+            with Image.open(io.BytesIO(self.header)) as image:
+                size = image.size
+        except Image.DecompressionBombError as e:
+            self.error = str(e)
+            return
+        except Exception:
+            if len(self.header) >= MAX_HEADER_BYTES:
+                # Not an image Pillow recognizes; the form field says so
+                self.header = None
+            return
+        self.header = None
+        try:
+            check_image_size(size, self.max_pixels)
+        except ImageTooLargeError as e:
+            self.error = str(e)
+
+    def file_complete(self, file_size):
+        if self.error is None:
+            return None
+        return RejectedUpload(
+            self.error,
+            self.field_name,
+            self.file_name,
+            self.content_type,
+            self.charset,
+        )
+
+
+def face_upload_view(view):
+    """
+    Stream a view's uploads through ``FaceUploadHandler``.
+
+    Upload handlers must be installed before anything reads the request
+    body, and ``CsrfViewMiddleware`` reads it to find the CSRF token. So the
+    view is exempted from the middleware and checked here instead, after the
+    handler is in place, as Django documents for custom upload handlers.
+    Must be the outermost decorator of an async view.
+
+    The body of a POST is read and parsed here, off the event loop, and the
+    time it took is the ``upload`` stage of ``request.deepface_timer``, the
+    ``StageTimer`` the view records its other stages in.
+    """
+    csrf = CsrfViewMiddleware(lambda request: None)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, FaceUploadHandler(request))
+        request.deepface_timer = StageTimer()
+        if request.method == "POST":
+            with request.deepface_timer.stage("upload"):
+                await sync_to_async(lambda: request.FILES)()
+        rejected = await sync_to_async(csrf.process_view)(request, view, args, kwargs)
+        if rejected is not None:
+            return rejected
+        return await view(request, *args, **kwargs)
+
+    wrapper.csrf_exempt = True
+    return wrapper
@@ -8,6 +8,9 @@ urlpatterns = [
     path("login/", views.face_login, name="login"),
     path("logout/", views.logout_view, name="logout"),
     path("profile/", views.profile_view, name="profile"),
+    path("profile/status/", views.enrollment_status, name="enrollment_status"),
     path("profile/delete/<int:identity_id>/", views.delete_face, name="delete_face"),
+    path("health/ready/", views.readiness, name="readiness"),
+    path("metrics/", views.metrics, name="metrics"),
     path("", views.index, name="index"),
 ]
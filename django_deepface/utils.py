@@ -1,15 +1,34 @@
 """Utility functions for django-deepface."""
 
+import io
 import logging
+import math
 import os
-from typing import Any
+import warnings
+from typing import IO, Any
 
-from deepface import DeepFace
+import numpy as np
 from django.conf import settings
 from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
 
 logger = logging.getLogger(__name__)
 
+# Length of the embeddings each DeepFace recognition model produces
+MODEL_DIMENSIONS = {
+    "VGG-Face": 4096,
+    "OpenFace": 128,
+    "Facenet": 128,
+    "Facenet512": 512,
+    "DeepFace": 4096,
+    "DeepID": 160,
+    "Dlib": 128,
+    "ArcFace": 512,
+    "SFace": 128,
+    "GhostFaceNet": 512,
+    "Buffalo_L": 512,
+}
+
 
 def get_deepface_settings() -> dict[str, Any]:
     """Get DeepFace settings from Django settings."""
@@ -22,35 +41,220 @@ def get_deepface_settings() -> dict[str, Any]:
     }
 
 
-def process_face_image(image_path: str) -> list | None:
+def get_detector_cascade() -> list[tuple[str, float]] | None:
+    """
+    Get the detector cascade from Django settings.
+
+    Returns:
+        ``(backend, min_confidence)`` stages, cheapest first, or None to use
+        ``DEEPFACE_DETECTOR`` alone. The last stage is always accepted.
+    """
+    cascade = getattr(settings, "DEEPFACE_DETECTOR_CASCADE", None)
+    if not cascade:
+        return None
+    min_confidence = getattr(settings, "DEEPFACE_CASCADE_MIN_CONFIDENCE", 0.9)
+    if isinstance(min_confidence, dict):
+        return [(backend, min_confidence.get(backend, 0.9)) for backend in cascade]
+    return [(backend, min_confidence) for backend in cascade]
+
+
+def get_embedding_version(
+    model_name: str | None = None,
+    detector: str | None = None,
+    normalization: str | None = None,
+) -> str:
+    """
+    Name the configuration embeddings are computed with.
+
+    Embeddings are only comparable when their versions are equal. Arguments
+    override the current settings; ``detector`` replaces the cascade.
+
+    Returns:
+        e.g. ``VGG-Face/retinaface/base/aligned``
+    """
+    options = get_deepface_settings()
+    if detector is None:
+        cascade = get_detector_cascade()
+        detector = (
+            "+".join(backend for backend, _ in cascade)
+            if cascade
+            else options["detector_backend"]
+        )
+    return "/".join(
+        (
+            model_name or options["model_name"],
+            detector,
+            normalization or options["normalization"],
+            "aligned" if options["align"] else "unaligned",
+        )
+    )
+
+
+def get_embedding_dimensions(model_name: str | None = None) -> int:
+    """
+    Get the length of the embeddings of a recognition model.
+
+    ``DEEPFACE_EMBEDDING_DIMENSIONS`` overrides the built-in table for the
+    configured model, e.g. one DeepFace added after this release.
+
+    Args:
+        model_name: DeepFace model name; defaults to ``DEEPFACE_MODEL``
+
+    Raises:
+        ValueError: If the model's dimensions are unknown
+    """
+    configured = get_deepface_settings()["model_name"]
+    if model_name is None or model_name == configured:
+        dimensions = getattr(settings, "DEEPFACE_EMBEDDING_DIMENSIONS", None)
+        if dimensions:
+            return int(dimensions)
+        model_name = configured
+    if model_name not in MODEL_DIMENSIONS:
+        raise ValueError(
+            f"Unknown embedding dimensions for {model_name!r}; set "
+            "DEEPFACE_EMBEDDING_DIMENSIONS"
+        )
+    return MODEL_DIMENSIONS[model_name]
+
+
+def process_face_image(image_path: str | np.ndarray) -> list | None:
     """
     Process a face image and return embeddings.
 
     Args:
-        image_path: Path to the image file
+        image_path: Path to the image file, or a decoded BGR image array
 
     Returns:
         List of embeddings or None if processing fails
     """
+    from .embedder import get_embedder
+
     try:
-        deepface_settings = get_deepface_settings()
-        embeddings = DeepFace.represent(image_path, **deepface_settings)
-        return embeddings[0]["embedding"] if embeddings else None
+        return get_embedder().represent(image_path)
     except Exception as e:
         logger.error(f"Error processing face image: {e!s}")
         return None
 
 
+def get_max_image_edge() -> int | None:
+    """Get the longest image edge passed to the detector (None keeps full size)."""
+    return getattr(settings, "DEEPFACE_MAX_IMAGE_EDGE", 1280)
+
+
+def get_max_upload_bytes() -> int | None:
+    """Get the largest face image upload accepted, in bytes (None: no limit)."""
+    return getattr(settings, "DEEPFACE_MAX_UPLOAD_BYTES", 10 * 1024 * 1024)
+
+
+def get_max_upload_pixels() -> int | None:
+    """Get the most pixels a face image upload may have (None: no limit)."""
+    return getattr(settings, "DEEPFACE_MAX_UPLOAD_PIXELS", 25_000_000)
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an image exceeds the upload byte or pixel budget."""
+
+
+def check_image_size(size: tuple[int, int], max_pixels: int | None) -> None:
+    """
+    Refuse image dimensions over a pixel budget, before anything is decoded.
+
+    Raises:
+        ImageTooLargeError: If ``width * height`` exceeds ``max_pixels``
+    """
+    width, height = size
+    if max_pixels and width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Image is {width}x{height} ({width * height / 1e6:.1f} MP); "
+            f"the limit is {max_pixels / 1e6:.1f} MP"
+        )
+
+
+def decode_image(
+    source: bytes | str | IO[bytes], max_pixels: int | None = None
+) -> np.ndarray:
+    """
+    Decode an image for detection: upright, downscaled and in BGR order.
+
+    Detection cost grows with pixel count, so the long edge is capped at
+    ``DEEPFACE_MAX_IMAGE_EDGE``. Large JPEGs are decoded at a reduced scale
+    straight away with Pillow's draft mode instead of at full resolution.
+    EXIF orientation is applied here, once, so phone photos are not fed to
+    the detector sideways.
+
+    Args:
+        source: Encoded image bytes (JPEG, PNG, WebP, ...), a path or a
+            binary file object
+        max_pixels: Refuse larger images from their header alone
+
+    Returns:
+        Image as a BGR uint8 array
+
+    Raises:
+        ImageTooLargeError: If the image has more than ``max_pixels`` pixels
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    max_edge = get_max_image_edge()
+    with Image.open(source) as image:
+        # Image.open only reads the header; pixels are decoded below
+        check_image_size(image.size, max_pixels)
+        if max_edge and image.format == "JPEG":
+            scale = max_edge / max(image.size)
+            if scale < 1:
+                # libjpeg picks the smallest 1/2, 1/4 or 1/8 scale that still
+                # covers the requested size
+                image.draft(
+                    "RGB",
+                    (math.ceil(image.width * scale), math.ceil(image.height * scale)),
+                )
+        upright = ImageOps.exif_transpose(image).convert("RGB")
+    if max_edge and max(upright.size) > max_edge:
+        upright.thumbnail((max_edge, max_edge), Image.Resampling.BILINEAR)
+    return np.ascontiguousarray(np.asarray(upright)[:, :, ::-1])
+
+
+def load_upload(uploaded_file) -> np.ndarray:
+    """
+    Decode an uploaded image for embedding without copying it to disk.
+
+    Uploads Django already spooled to disk are read in place; in-memory
+    uploads are decoded straight from their buffer, without a copy. Images
+    over ``DEEPFACE_MAX_UPLOAD_PIXELS`` are refused before decoding.
+
+    Args:
+        uploaded_file: Django UploadedFile instance
+
+    Returns:
+        The decoded BGR image array (see ``decode_image``)
+
+    Raises:
+        ImageTooLargeError: If the image has too many pixels
+    """
+    max_pixels = get_max_upload_pixels()
+    if hasattr(uploaded_file, "temporary_file_path"):
+        return decode_image(uploaded_file.temporary_file_path(), max_pixels)
+    uploaded_file.seek(0)
+    return decode_image(uploaded_file, max_pixels)
+
+
 def save_temp_file(uploaded_file) -> str:
     """
     Save uploaded file to temporary location.
 
+    Deprecated: decode uploads in memory with ``load_upload`` instead.
+
     Args:
         uploaded_file: Django UploadedFile instance
 
     Returns:
         Path to saved temporary file
     """
+    warnings.warn(
+        "save_temp_file is deprecated; decode uploads with load_upload instead",
+        DeprecationWarning,
+        stacklevel=2,
+    )
     temp_path = os.path.join(settings.MEDIA_ROOT, "temp", uploaded_file.name)
     os.makedirs(os.path.dirname(temp_path), exist_ok=True)
 
@@ -65,9 +269,16 @@ def cleanup_temp_file(file_path: str) -> None:
     """
     Remove temporary file.
 
+    Deprecated along with ``save_temp_file``.
+
     Args:
         file_path: Path to file to remove
     """
+    warnings.warn(
+        "cleanup_temp_file is deprecated along with save_temp_file",
+        DeprecationWarning,
+        stacklevel=2,
+    )
     try:
         if os.path.exists(file_path):
             os.remove(file_path)
@@ -83,3 +294,8 @@ def get_max_faces_per_user() -> int:
 def get_similarity_threshold() -> float:
     """Get similarity threshold for face matching."""
     return getattr(settings, "DEEPFACE_THRESHOLD", 0.3)
+
+
+def is_identification_enabled() -> bool:
+    """Whether face login may search every user when no username is given."""
+    return getattr(settings, "DEEPFACE_IDENTIFICATION", False)
@@ -0,0 +1,358 @@
+"""Vector stores: where login and identification compare embeddings.
+
+``pgvector`` ranks rows inside PostgreSQL with the distance operators the ANN
+index is built for. ``numpy`` reads the packed float32 embeddings and ranks
+them in NumPy, so the app runs on any database Django supports (SQLite for
+development and CI, for example):
+
+- 1:1 verification fetches the claimed user's few rows and compares them
+- 1:N identification searches an in-memory matrix of the whole gallery,
+  loaded on first use and reloaded after Identity rows change
+
+Only embeddings computed with the configuration in settings are compared.
+They are read from ``Identity.embedding`` or, while the ``reembed`` command
+is switching configurations, from ``Identity.next_embedding``.
+
+Each process holds its own matrix. Changes made in another process are
+noticed through a generation counter in Django's cache, so configure a
+shared cache (not the per-process default) when several processes serve
+logins; check ``django_deepface.W002`` reports a per-process one.
+"""
+
+import threading
+from typing import Any, NamedTuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Case, F, Q, When
+
+from .models import Identity
+from .search import (
+    distance_expression,
+    get_binary_prefilter,
+    hamming_distances,
+    hamming_expression,
+    numpy_distances,
+    pack_signs,
+    search_parameters,
+)
+from .utils import get_embedding_version, get_max_faces_per_user
+
+VECTOR_STORES = ("pgvector", "numpy")
+
+# Cache key of the counter bumped whenever Identity embeddings change
+GENERATION_KEY = "django_deepface:vector_store_generation"
+
+
+def get_vector_store_name(using: str = "default") -> str:
+    """Get the configured vector store, defaulting by database vendor."""
+    name = getattr(settings, "DEEPFACE_VECTOR_STORE", None)
+    if name is None:
+        return "pgvector" if connections[using].vendor == "postgresql" else "numpy"
+    if name not in VECTOR_STORES:
+        raise ValueError(
+            f"DEEPFACE_VECTOR_STORE must be None or one of {', '.join(VECTOR_STORES)}, not {name!r}"
+        )
+    return name
+
+
+def has_current_embedding() -> Q:
+    """Filter Identity rows with an embedding of the current configuration."""
+    version = get_embedding_version()
+    return Q(embedding_version=version, embedding__isnull=False) | Q(
+        next_embedding_version=version, next_embedding__isnull=False
+    )
+
+
+def current_embedding() -> Case:
+    """The Identity column holding the embedding of the current configuration."""
+    return Case(
+        When(
+            embedding_version=get_embedding_version(),
+            embedding__isnull=False,
+            then=F("embedding"),
+        ),
+        default=F("next_embedding"),
+    )
+
+
+class PgVectorStore:
+    """Ranks embeddings in PostgreSQL with pgvector."""
+
+    def closest(
+        self, queryset, embedding, field="embedding"
+    ) -> tuple[Any, float] | None:
+        """
+        Find the row of a queryset closest to an embedding.
+
+        Args:
+            queryset: Rows to compare
+            embedding: Query embedding
+            field: Column (or expression) holding the rows' embeddings
+
+        Returns:
+            ``(row, distance)``, or None if the queryset is empty
+        """
+        match_query = queryset.annotate(
+            distance=distance_expression(embedding, field)
+        ).order_by("distance")
+        with search_parameters():
+            match = match_query.first()
+        if match is None:
+            return None
+        return match, match.distance
+
+    def nearest_users(
+        self, embedding, k: int, exact: bool = False, candidates: int | None = None
+    ) -> list[tuple[int, float]]:
+        """
+        Rank users by their closest image.
+
+        Enough rows are fetched from the ANN index for ``k`` distinct users.
+        With the binary prefilter, the candidates come from the index on
+        binary-quantized embeddings instead, and only they are ranked by the
+        full-precision distance. Rows whose current embedding is still
+        staged in ``next_embedding`` are searched without an index.
+
+        Args:
+            embedding: Query embedding
+            k: Number of users to return
+            exact: Compare every row without an index, e.g. to measure recall
+            candidates: Rerank this many binary-quantized candidates,
+                whatever the settings say
+
+        Returns:
+            ``(user_id, distance)`` pairs, nearest first
+        """
+        version = get_embedding_version()
+        limit = k * get_max_faces_per_user()
+        if exact:
+            candidates = None
+        elif candidates is None:
+            candidates = get_binary_prefilter()
+        live = Identity.objects.filter(
+            embedding_version=version, embedding__isnull=False
+        )
+        staged = Identity.objects.filter(
+            next_embedding_version=version, next_embedding__isnull=False
+        )
+        with search_parameters(limit=max(limit, candidates or 0)):
+            if candidates:
+                shortlist = list(
+                    live.annotate(hamming=hamming_expression(embedding))
+                    .order_by("hamming")
+                    .values_list("pk", flat=True)[:candidates]
+                )
+                live = Identity.objects.filter(pk__in=shortlist)
+            if exact or candidates:
+                # Without index scans the full-precision ANN index cannot
+                # answer the ORDER BY; the shortlist is fetched by primary key
+                # with a bitmap scan
+                with connections["default"].cursor() as cursor:
+                    cursor.execute("SELECT set_config('enable_indexscan', 'off', true)")
+            rows = sorted(
+                (
+                    row
+                    for queryset, field in (
+                        (live, "embedding"),
+                        (staged, "next_embedding"),
+                    )
+                    for row in queryset.annotate(
+                        distance=distance_expression(embedding, field)
+                    )
+                    .order_by("distance")
+                    .values_list("user_id", "distance")[:limit]
+                ),
+                key=lambda row: row[1],
+            )
+
+        best: dict[int, float] = {}
+        for user_id, distance in rows:
+            best.setdefault(user_id, distance)
+        return list(best.items())[:k]
+
+    def invalidate(self) -> None:
+        """Nothing is cached; PostgreSQL always searches the current rows."""
+
+
+class Gallery(NamedTuple):
+    """Embeddings of the current configuration, grouped by user."""
+
+    matrix: np.ndarray
+    norms: np.ndarray
+    # Sign bits of each row, packed as binary_quantize does
+    bits: np.ndarray
+    # User of each row
+    row_users: np.ndarray
+    # Each user once, and the index of their first row
+    user_ids: np.ndarray
+    starts: np.ndarray
+
+
+class NumpyVectorStore:
+    """Ranks embeddings in NumPy over rows read from any database."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation: int | None = None
+        self._gallery: Gallery | None = None
+
+    def closest(
+        self, queryset, embedding, field="embedding"
+    ) -> tuple[Any, float] | None:
+        """
+        Find the row of a queryset closest to an embedding.
+
+        Meant for small querysets, such as one user's images or template.
+
+        Returns:
+            ``(row, distance)``, or None if the queryset is empty
+        """
+        if isinstance(field, str):
+            field = F(field)
+        rows = list(queryset.annotate(match_embedding=field))
+        if not rows:
+            return None
+        distances = numpy_distances(
+            np.stack([row.match_embedding for row in rows]), embedding
+        )
+        best = int(np.argmin(distances))
+        return rows[best], float(distances[best])
+
+    def load(self) -> Gallery:
+        """
+        Read every embedding into the in-memory matrix.
+
+        Rows are grouped by user, so the closest image of each user is found
+        with a single ``minimum.reduceat`` over the distances.
+
+        Returns:
+            The loaded gallery
+        """
+        # Read before the rows, so a change made during the load triggers
+        # another one
+        generation = cache.get(GENERATION_KEY, 0)
+        user_ids, embeddings = [], []
+        for user_id, embedding in (
+            Identity.objects.filter(has_current_embedding())
+            .order_by("user_id", "pk")
+            .values_list("user_id", current_embedding())
+            .iterator(chunk_size=2000)
+        ):
+            user_ids.append(user_id)
+            embeddings.append(np.asarray(embedding, dtype=np.float32))
+        row_users = np.asarray(user_ids, dtype=np.int64)
+        if embeddings:
+            matrix = np.stack(embeddings)
+        else:
+            matrix = np.empty((0, Identity.vector_dimensions), dtype=np.float32)
+        # Index of the first row of each user
+        if len(row_users):
+            starts = np.flatnonzero(np.r_[True, row_users[1:] != row_users[:-1]])
+        else:
+            starts = np.empty(0, dtype=np.intp)
+        self._gallery = Gallery(
+            matrix=matrix,
+            norms=np.linalg.norm(matrix, axis=1),
+            bits=pack_signs(matrix),
+            row_users=row_users,
+            user_ids=row_users[starts],
+            starts=starts,
+        )
+        self._generation = generation
+        return self._gallery
+
+    def gallery(self) -> Gallery:
+        """The in-memory gallery, (re)loaded if it is missing or stale."""
+        with self._lock:
+            if self._gallery is None or self._generation != cache.get(
+                GENERATION_KEY, 0
+            ):
+                return self.load()
+            return self._gallery
+
+    def nearest_users(
+        self, embedding, k: int, exact: bool = False, candidates: int | None = None
+    ) -> list[tuple[int, float]]:
+        """
+        Rank users by their closest image with one matrix-vector product.
+
+        With the binary prefilter, rows are shortlisted by the Hamming
+        distance of their packed sign bits (32 times less memory to scan)
+        and only the shortlist is compared at full precision.
+
+        Args:
+            embedding: Query embedding
+            k: Number of users to return
+            exact: Compare every row at full precision, e.g. to measure recall
+            candidates: Rerank this many binary-quantized candidates,
+                whatever the settings say
+
+        Returns:
+            ``(user_id, distance)`` pairs, nearest first
+        """
+        gallery = self.gallery()
+        if not len(gallery.matrix):
+            return []
+        if exact:
+            candidates = None
+        elif candidates is None:
+            candidates = get_binary_prefilter()
+        if candidates and candidates < len(gallery.matrix):
+            hamming = hamming_distances(gallery.bits, pack_signs(embedding))
+            shortlist = np.argpartition(hamming, candidates - 1)[:candidates]
+            distances = numpy_distances(
+                gallery.matrix[shortlist], embedding, gallery.norms[shortlist]
+            )
+            best: dict[int, float] = {}
+            for i in np.argsort(distances, kind="stable"):
+                best.setdefault(
+                    int(gallery.row_users[shortlist[i]]), float(distances[i])
+                )
+            return list(best.items())[:k]
+
+        best_rows = np.minimum.reduceat(
+            numpy_distances(gallery.matrix, embedding, gallery.norms), gallery.starts
+        )
+        k = min(k, len(best_rows))
+        top = np.argpartition(best_rows, k - 1)[:k]
+        top = top[np.argsort(best_rows[top], kind="stable")]
+        return [(int(gallery.user_ids[i]), float(best_rows[i])) for i in top]
+
+    def invalidate(self) -> None:
+        """Drop the matrix here now, and in every process once committed."""
+        with self._lock:
+            self._gallery = None
+        transaction.on_commit(bump_generation)
+
+
+def bump_generation() -> None:
+    """Tell every process sharing the cache that the embeddings changed."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+STORE_CLASSES = {"pgvector": PgVectorStore, "numpy": NumpyVectorStore}
+
+_stores: dict[str, Any] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store():
+    """Return this process's instance of the configured vector store."""
+    name = get_vector_store_name()
+    store = _stores.get(name)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(name, STORE_CLASSES[name]())
+    return store
+
+
+def reset_vector_store() -> None:
+    """Forget the stores and their in-memory matrices, e.g. between tests."""
+    with _stores_lock:
+        _stores.clear()
@@ -1,150 +1,225 @@
-import os
+from functools import wraps
 
-from deepface import DeepFace
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth import login, logout
+from django.contrib.auth import get_user_model, login, logout
 from django.contrib.auth.decorators import login_required
-from django.core.files.storage import default_storage
-from django.http import HttpResponse
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from pgvector.django import CosineDistance
 
 from django_deepface.signals import face_image_processed
 
+from .embedder import InferenceUnavailableError, get_embedder
+from .enrollment import enqueue_enrollment, is_async_enrollment_enabled
+from .face_templates import verify
 from .forms import FaceImageUploadForm, FaceLoginForm
+from .inference import InferenceOverloadedError, embed_upload, get_inference_executor
+from .metrics import is_metrics_enabled, render_metrics
 from .models import Identity
+from .search import identify
+from .timing import StageTimer
+from .uploads import face_upload_view
+from .utils import is_identification_enabled
 
 
-def face_login(request):
+def async_login_required(view):
+    """``login_required`` for async views (Django < 5.1 only wraps sync views)."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+@face_upload_view
+async def face_login(request):
     if request.method == "POST":
+        timer = request.deepface_timer
         form = FaceLoginForm(request, data=request.POST, files=request.FILES)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             if form.cleaned_data.get("use_face_login") and request.FILES.get(
                 "face_image"
             ):
                 # Process face login
                 face_image = request.FILES["face_image"]
                 username = form.cleaned_data.get("username")  # Get the entered username
-                temp_path = os.path.join(settings.MEDIA_ROOT, "temp", face_image.name)
-                os.makedirs(os.path.dirname(temp_path), exist_ok=True)
-
-                with default_storage.open(temp_path, "wb+") as destination:
-                    for chunk in face_image.chunks():
-                        destination.write(chunk)
 
                 try:
-                    # Get face embedding using DeepFace
-                    login_embedding = DeepFace.represent(
-                        temp_path,
-                        model_name=settings.DEEPFACE_MODEL,
-                        enforce_detection=settings.DEEPFACE_ENFORCE_DETECTION,
-                        detector_backend=settings.DEEPFACE_DETECTOR,
-                        align=settings.DEEPFACE_ALIGN,
-                        normalization=settings.DEEPFACE_NORMALIZATION,
-                    )[0]["embedding"]
-
-                    # Query using pgvector's cosine distance - ONLY for the specified username
-                    matches = (
-                        Identity.objects.filter(
-                            user__username=username  # Only match faces for the entered username
-                        )
-                        .annotate(distance=CosineDistance("embedding", login_embedding))
-                        .order_by("distance")
+                    # Decode and embed on the inference executor, off the event
+                    # loop and the request thread, with no temp file needed
+                    login_embedding = await get_inference_executor().run(
+                        embed_upload, face_image, timer
+                    )
+                    response = await sync_to_async(match_face_login)(
+                        request, username, login_embedding, timer
+                    )
+                    if response is not None:
+                        return response
+                except InferenceOverloadedError:
+                    messages.error(
+                        request,
+                        "Face login is busy right now. Please use password login.",
+                    )
+                    await sync_to_async(send_login_processed)(
+                        request, False, timer, reason="shed"
+                    )
+                except InferenceUnavailableError:
+                    messages.error(
+                        request,
+                        "Face login is not available right now. Please use password "
+                        "login.",
+                    )
+                    await sync_to_async(send_login_processed)(
+                        request, False, timer, reason="unavailable"
                     )
-
-                    best_match = matches.first()
-                    if best_match:
-                        # threshold for cosine similarity (lower is more similar)
-                        if best_match.distance < settings.DEEPFACE_THRESHOLD:
-                            user = best_match.user
-                            login(request, user)
-                            face_image_processed.send(
-                                "face_login",
-                                request=request,
-                                stage="login",
-                                was_successful=True,
-                            )
-                            messages.success(request, "Face recognition successful!")
-                            # Clean up temp file
-                            os.remove(temp_path)
-                            return redirect(settings.DEEPFACE_LOGIN_REDIRECT_URL)
-                        else:
-                            messages.error(
-                                request,
-                                f"Face not recognized for user '{username}'. Please try again or use password login.",
-                            )
-                            face_image_processed.send(
-                                "face_login",
-                                request=request,
-                                stage="login",
-                                was_successful=False,
-                            )
-                    else:
-                        messages.error(
-                            request,
-                            f"No face images found for user '{username}'. Please register your face first or use password login.",
-                        )
-                        face_image_processed.send(
-                            "face_login",
-                            request=request,
-                            stage="login",
-                            was_successful=False,
-                        )
-                    # Clean up temp file
-                    os.remove(temp_path)
-
                 except Exception as e:
                     messages.error(request, f"Error processing face: {e!s}")
-                    # Clean up temp file
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
+                    await sync_to_async(send_login_processed)(request, False, timer)
 
             else:
                 # Regular password login
                 user = form.get_user()
-                login(request, user)
+                await sync_to_async(login)(request, user)
                 return redirect(settings.DEEPFACE_LOGIN_REDIRECT_URL)
     else:
         form = FaceLoginForm()
 
-    return render(request, "django_deepface/login.html", {"form": form})
+    return await sync_to_async(render)(
+        request,
+        "django_deepface/login.html",
+        {"form": form, "identification_enabled": is_identification_enabled()},
+    )
+
 
+def send_login_processed(request, was_successful, timer, distance=None, reason=None):
+    """
+    Send ``face_image_processed`` for a face login with its stage timings.
 
-@login_required
-def profile_view(request):
+    ``reason`` tells failures that never reached the model apart: ``"shed"``
+    when the inference queue was full, ``"unavailable"`` when this process
+    cannot embed faces.
+    """
+    face_image_processed.send(
+        "face_login",
+        request=request,
+        stage="login",
+        was_successful=was_successful,
+        timings=dict(timer.timings),
+        distance=distance,
+        reason=reason,
+    )
+
+
+def match_face_login(request, username, login_embedding, timer=None):
+    """Match a login embedding and log the user in, or add an error message.
+
+    Returns:
+        A redirect on success, otherwise None
+    """
+    timer = timer if timer is not None else StageTimer()
+    if not username:
+        # No username: identify the face against the whole gallery
+        with timer.stage("vector_query"):
+            user_id, candidates = identify(login_embedding)
+        distance = candidates[0][1] if candidates else None
+        if user_id is not None:
+            user = get_user_model().objects.get(pk=user_id)
+            with timer.stage("session_login"):
+                login(request, user)
+            send_login_processed(request, True, timer, distance)
+            messages.success(request, "Face recognition successful!")
+            return redirect(settings.DEEPFACE_LOGIN_REDIRECT_URL)
+        messages.error(
+            request,
+            "Face not recognized. Please try again or use password login.",
+        )
+        send_login_processed(request, False, timer, distance)
+        return None
+
+    # Compare ONLY against the faces of the entered username
+    with timer.stage("vector_query"):
+        match = verify(username, login_embedding)
+    if match:
+        user, distance = match
+        # threshold for cosine similarity (lower is more similar)
+        if distance < settings.DEEPFACE_THRESHOLD:
+            with timer.stage("session_login"):
+                login(request, user)
+            send_login_processed(request, True, timer, distance)
+            messages.success(request, "Face recognition successful!")
+            return redirect(settings.DEEPFACE_LOGIN_REDIRECT_URL)
+        else:
+            messages.error(
+                request,
+                f"Face not recognized for user '{username}'. Please try again or use password login.",
+            )
+            send_login_processed(request, False, timer, distance)
+    else:
+        messages.error(
+            request,
+            f"No face images found for user '{username}'. Please register your face first or use password login.",
+        )
+        send_login_processed(request, False, timer)
+    return None
+
+
+@face_upload_view
+@async_login_required
+async def profile_view(request):
     if request.method == "POST":
+        timer = request.deepface_timer
         form = FaceImageUploadForm(request.POST, request.FILES)
-        if form.is_valid():
+        if await sync_to_async(form.is_valid)():
             # Get the next available image number
-            next_number = Identity.objects.filter(user=request.user).count() + 1
+            next_number = await Identity.objects.filter(user=request.user).acount() + 1
             if next_number <= settings.DEEPFACE_MAX_FACES:
                 try:
-                    # Create Identity record with the uploaded image
                     identity = form.save(commit=False)
                     identity.user = request.user
                     identity.image_number = next_number
-                    identity.save()
-
-                    # Generate face embedding using DeepFace
-                    embedding = DeepFace.represent(
-                        identity.image.path,
-                        model_name=settings.DEEPFACE_MODEL,
-                        enforce_detection=settings.DEEPFACE_ENFORCE_DETECTION,
-                        detector_backend=settings.DEEPFACE_DETECTOR,
-                        align=settings.DEEPFACE_ALIGN,
-                        normalization=settings.DEEPFACE_NORMALIZATION,
-                    )[0]["embedding"]
-
-                    identity.embedding = embedding
-
-                    identity.save(update_fields=["embedding"])
-                    face_image_processed.send(
-                        "profile_view", request=request, stage="register"
+                    queued = is_async_enrollment_enabled()
+                    if not queued:
+                        # Embed the upload straight from memory before it is
+                        # stored, so the image is not read back from disk
+                        try:
+                            identity.embedding = await get_inference_executor().run(
+                                embed_upload, form.cleaned_data["image"], timer
+                            )
+                        except InferenceUnavailableError:
+                            # This process cannot embed faces; leave the image
+                            # for deepface_worker instead of refusing it
+                            queued = True
+                    if queued:
+                        # Store the image now; deepface_worker embeds it later
+                        with timer.stage("save"):
+                            await sync_to_async(enqueue_enrollment)(identity)
+                        success_message = (
+                            "Face image uploaded. It will be ready for face login "
+                            "in a moment."
+                        )
+                    else:
+                        with timer.stage("save"):
+                            await identity.asave()
+                        success_message = "Face image uploaded successfully!"
+                    await sync_to_async(send_register_processed)(request, True, timer)
+                    messages.success(request, success_message)
+                except InferenceOverloadedError:
+                    messages.error(
+                        request,
+                        "Face processing is busy right now. Please try again in a moment.",
+                    )
+                    await sync_to_async(send_register_processed)(
+                        request, False, timer, reason="shed"
                     )
-                    messages.success(request, "Face image uploaded successfully!")
                 except Exception as e:
                     messages.error(request, f"Error processing face: {e!s}")
+                    await sync_to_async(send_register_processed)(request, False, timer)
             else:
                 messages.error(
                     request,
@@ -156,25 +231,61 @@ def profile_view(request):
         form = FaceImageUploadForm()
 
     # Get existing face images
-    face_images = Identity.objects.filter(user=request.user)
+    face_images = Identity.objects.filter(user=request.user).select_related(
+        "enrollment_job"
+    )
 
-    return render(
+    return await sync_to_async(render)(
         request,
         "django_deepface/profile.html",
         {"form": form, "face_images": face_images},
     )
 
 
+def send_register_processed(request, was_successful, timer, reason=None):
+    """Send ``face_image_processed`` for a profile upload with its stage timings."""
+    face_image_processed.send(
+        "profile_view",
+        request=request,
+        stage="register",
+        was_successful=was_successful,
+        timings=dict(timer.timings),
+        reason=reason,
+    )
+
+
+@login_required
+def enrollment_status(request):
+    """Report the enrollment status of the user's face images for polling."""
+    face_images = Identity.objects.filter(user=request.user).select_related(
+        "enrollment_job"
+    )
+    images = []
+    for identity in face_images:
+        job = getattr(identity, "enrollment_job", None)
+        images.append(
+            {
+                "id": identity.id,
+                "image_number": identity.image_number,
+                "status": identity.enrollment_status,
+                "error": job.error if job else "",
+            }
+        )
+    pending = sum(image["status"] in ("pending", "processing") for image in images)
+    return JsonResponse({"pending": pending, "images": images})
+
+
 @login_required
 def delete_face(request, identity_id):
     """Delete a face image and reorder remaining images"""
     identity = get_object_or_404(Identity, id=identity_id, user=request.user)
 
-    # Delete the image file
+    # Delete the image file without re-saving the row that is about to go
     if identity.image:
-        identity.image.delete()
+        identity.image.delete(save=False)
 
-    # Delete the identity record
+    # Delete the identity record; the post_delete receiver rebuilds the
+    # user's face template, and renumbering below leaves it untouched
     identity.delete()
 
     # Reorder remaining images
@@ -201,3 +312,27 @@ def index(request):
     return HttpResponse(
         "Django DeepFace App Index - check settings.DEEPFACE_LOGIN_REDIRECT_URL"
     )
+
+
+def readiness(request):
+    """Report whether this process has the face model loaded.
+
+    Returns 200 once warm and 503 otherwise, so a load balancer can hold
+    traffic back from workers that are still loading the model. Inference
+    queue depth and wait times are included for monitoring.
+    """
+    state = get_embedder().readiness()
+    state["inference"] = get_inference_executor().stats()
+    return JsonResponse(state, status=200 if state["ready"] else 503)
+
+
+def metrics(request):
+    """Expose this process's face metrics in the Prometheus text format.
+
+    Only served when ``DEEPFACE_METRICS`` is enabled.
+    """
+    if not is_metrics_enabled():
+        raise Http404("Metrics are disabled")
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )